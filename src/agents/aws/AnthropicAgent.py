@@ -1,10 +1,40 @@
-from typing import Any, Dict, List, Optional
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
+import contextlib
+import contextvars
 import json
+import threading
+import time
 import anthropic
 
-from src.core.agent import Agent
+from src.core.agent import Agent, agent_scope
+from src.core.budget import MIN_THINKING_TOKENS, Budget, BudgetController
+from src.core.cascade import CascadePolicy
+from src.core.deadline import (
+    CancellationToken,
+    Cancelled,
+    Deadline,
+    DeadlineExceeded,
+    current_deadline,
+    deadline_scope,
+    resolved_deadline,
+)
+from src.core.loop_guard import ToolCallGuard
+from src.core.conversation import Conversation, intern_prefix, intern_tools
+from src.core.delegation import record_usage
 from src.core.tool import Tool
+from src.core.router import TeamRouter
+from src.core.serialization import ResultSerializer
+from src.core.tokens import MIN_OUTPUT_TOKENS, ContextWindowExceeded, TokenEstimator
+from src.tools.program import ToolProgramTool
+from src.tools.selection import BM25ToolSelector, ToolSearchTool
+from src.tools.registry import RegistrySnapshot
+
+if TYPE_CHECKING:
+    from src.agents.aws.backends import BackendPool
+    from src.memory import VectorMemory
+    from src.tracing import TraceRecorder
 
 from pydantic import BaseModel
 class AnthropicAgent(Agent):
@@ -24,6 +54,18 @@ class AnthropicAgent(Agent):
         max_tokens: int = 4096,
         temperature: float = None,
         betas: List[str] = [],
+        stream: bool = True,
+        tool_selector: Optional[BM25ToolSelector] = None,
+        router: Optional[TeamRouter] = None,
+        budget_controller: Optional[BudgetController] = None,
+        max_repeated_tool_calls: Optional[int] = 2,
+        result_serializer: Optional[ResultSerializer] = None,
+        memory: Optional["VectorMemory"] = None,
+        cascade: Optional[CascadePolicy] = None,
+        backend_pool: Optional["BackendPool"] = None,
+        tracer: Optional["TraceRecorder"] = None,
+        tool_programs: bool = False,
+        token_estimator: Optional[TokenEstimator] = None,
     ):
         """
         Initialize Anthropic Bedrock agent with tools
@@ -37,6 +79,19 @@ class AnthropicAgent(Agent):
             max_iterations: Maximum number of iterations
             max_tokens: Maximum number of tokens
             temperature: Temperature
+            stream: Whether to stream responses and start each tool call as soon as its input is complete
+            tool_selector: Optional selector sending only the top-k relevant tools per iteration
+            router: Optional local router that hands obvious requests straight to a team member
+            budget_controller: Optional controller choosing max_tokens and thinking budgets per call
+            max_repeated_tool_calls: Repeats of an identical tool call tolerated before the run stops; calls to
+                side-effecting tools only count when repeated back to back (None disables)
+            result_serializer: Serializer turning tool results into tool_result content
+            memory: Optional memory recalled before each request and updated with answers and tool results
+            cascade: Optional policy trying a smaller model first and escalating to model_id
+            backend_pool: Optional pool of providers used instead of a single client, with hedging and failover
+            tracer: Optional recorder of requests, responses, tool calls and their timings
+            tool_programs: Whether the model can run dependent tool calls in one turn with run_tool_program
+            token_estimator: Optional estimator checking each request against the context window before it is sent
         """
         super().__init__(
             agent_name=agent_name,
@@ -46,8 +101,12 @@ class AnthropicAgent(Agent):
             team=team,
             verbose=verbose,
             tools=tools,
+            tool_selector=tool_selector,
+            router=router,
+            memory=memory,
+            tool_programs=tool_programs,
         )
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = backend_pool or anthropic.Anthropic(api_key=api_key)
         self.model = model_id
         self.model_id = model_id 
         self.thinking = thinking
@@ -55,6 +114,16 @@ class AnthropicAgent(Agent):
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.betas = betas
+        self.stream = stream
+        self.budget_controller = budget_controller
+        self.max_repeated_tool_calls = max_repeated_tool_calls
+        self.result_serializer = result_serializer or ResultSerializer()
+        self.cascade = cascade
+        self.tracer = tracer
+        self.token_estimator = token_estimator
+        # Registry version, prefix and tool payload of the latest compile; the version is None
+        # when an AgentTemplate fixed them
+        self._compiled: Optional[Tuple[Optional[int], Tuple[Any, ...], List[Dict[str, Any]]]] = None
 
         if thinking:
             if "claude-3-7" in model_id or "claude-3-5-sonnet" in model_id:
@@ -75,68 +144,101 @@ class AnthropicAgent(Agent):
         if self.temperature is None:
             self.temperature = 0.5
 
-    def invoke(self, prompt: str, max_iterations: int = 10) -> Dict[str, Any]:
+    def invoke(
+        self,
+        prompt: str,
+        max_iterations: int = 10,
+        deadline: Optional[float | Deadline] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Dict[str, Any]:
         """
         Invoke the agent with a prompt, handling the full cycle of tool uses
 
+        The remaining time is passed on to every model call, tool and team
+        member, and cancelling the token aborts in-flight work.
+
         Args:
             prompt: The user prompt
             max_iterations: Maximum number of tool use iterations
-            system_prompt: Optional system prompt
+            deadline: Seconds (or a Deadline) within which the invocation must finish
+            cancel_token: Token aborting the invocation when cancelled
 
         Returns:
             Final response from the model
-        """
-        # Initial messages
-        messages = []
-
-        if self.system_prompt:
-            messages.append({"role": "user", "content": f"<system>{self.system_prompt}</system>"})
-
-        if self.instructions:
-            messages.append({"role": "user", "content": f"<instructions>{self.instructions}</instructions>"})
-
-        if self.output_format:
-            if isinstance(self.output_format, BaseModel) or \
-                (isinstance(self.output_format, type) and issubclass(self.output_format, BaseModel)):
-                if isinstance(self.output_format, type):
-                    schema_json = self.output_format.model_json_schema()
-                    schema_str = json.dumps(schema_json)
-                else:
-                    schema_str = self.output_format.model_dump_json()
-                
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": f"<output_format>{schema_str}</output_format>",
-                    }
-                )
-            else:
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": f"<output_format>{self.output_format}</output_format>",
-                    }
-                )
-
-        messages.append({"role": "user", "content": f"{prompt}"})
 
-        custom_tools = self.registry.get_all_tools()
+        Raises:
+            DeadlineExceeded: If the deadline passes before the final response
+            Cancelled: If the token is cancelled
+        """
+        with resolved_deadline(deadline, cancel_token) as deadline, deadline_scope(deadline), agent_scope(self, prompt), \
+                self._traced_run(prompt) as trace:
+            try:
+                return self._run(prompt, deadline)
+            except Cancelled:
+                self.last_stop_reason = "cancelled"
+                raise
+            except DeadlineExceeded:
+                self.last_stop_reason = "deadline_exceeded"
+                raise
+            finally:
+                trace["stop_reason"] = self.last_stop_reason
+
+    def _traced_run(self, prompt: str):
+        """Trace a run when a tracer is set"""
+        if self.tracer is None:
+            return contextlib.nullcontext({})
+        return self.tracer.run(self.agent_name, prompt=prompt, model=self.model)
+
+    def _run(self, prompt: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Run the tool use loop for a prompt within the deadline"""
+        # Obvious delegations skip the manager model entirely
+        agent_idx = self.route_to_team(prompt)
+        if agent_idx is not None:
+            delegation = self.delegate_to_team(prompt, agent_idx, include_raw=True)
+            if delegation.status != "error":
+                response = delegation.raw
+                if self.output_format:
+                    response = self.output_parser_model(response)
+                return response
 
-        seen_tool_names = set()
-        all_tools = []
+        # Agents created from a template reuse its precompiled prefix and tool payload
+        prefix, all_tools = self._compiled_payload()
 
-        for tool in custom_tools:
-            tool_name = tool["name"]
-            if tool_name not in seen_tool_names:
-                seen_tool_names.add(tool_name)
-                all_tools.append(tool)
+        # Initial messages, sharing the prefix turns with other runs of the same configuration
+        conversation = Conversation(prefix=prefix)
+        # Earlier answers and tool results can save a round of tool calls
+        recalled = self.recall_memory(prompt)
+        conversation.add_user(f"{recalled}\n\n{prompt}" if recalled else f"{prompt}")
 
         iterations = 0
+        response = None
         final_response = None
+        # Tools the model used or pulled in through the search meta-tool stay selected
+        activated_tools = set()
+        if self.tool_search_tool:
+            activated_tools.add(self.tool_search_tool.name)
+        if self.tool_program_tool:
+            activated_tools.add(self.tool_program_tool.name)
+        guard = None
+        if self.max_repeated_tool_calls is not None:
+            guard = ToolCallGuard(self.max_repeated_tool_calls)
+        self.last_stop_reason = None
+        escalated = False
 
         while iterations < self.max_iterations:
             iterations += 1
+            if deadline:
+                deadline.check()
+
+            request_tools = all_tools
+            if self.tool_selector:
+                request_tools = self.tool_selector.select(
+                    self._selection_query(prompt, conversation), all_tools, include=activated_tools
+                )
+                if self.verbose:
+                    print(f"Selected tools: {[tool['name'] for tool in request_tools]}")
+
+            messages = conversation.to_messages()
 
             if self.verbose:
                 print(f"\n--- Iteration {iterations} ---")
@@ -150,16 +252,92 @@ class AnthropicAgent(Agent):
                     print(f"Message type: {type(messages[-1])}")
                     print("Continuing with request...")
 
-            response = self.client.beta.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                tools=all_tools,
-                messages=messages,
-                betas=self.betas,
-                thinking= self.thinking if self.thinking else {"type": "disabled"},
-                temperature=self.temperature,
+            request = {
+                "model": self.model,
+                "max_tokens": self.max_tokens,
+                "tools": request_tools,
+                "messages": messages,
+                "betas": self.betas,
+                "thinking": self.thinking if self.thinking else {"type": "disabled"},
+                "temperature": self.temperature,
+            }
+
+            budget = None
+            if self.budget_controller:
+                budget = self.budget_controller.plan(
+                    iterations, bool(request_tools), bool(self.thinking), limit=self.max_tokens
+                )
+                self._apply_budget(request, budget)
+
+            estimated_tokens = None
+            if self.token_estimator:
+                estimated_tokens = self.token_estimator.raw(request)
+                if not self._fit_context(request, estimated_tokens):
+                    if response is None:
+                        raise ContextWindowExceeded(
+                            f"The prompt needs about {self.token_estimator.upper_bound(request, estimated_tokens)} "
+                            f"tokens, more than the context window of {self.token_estimator.context_window}"
+                        )
+                    final_response = response
+                    self.last_stop_reason = "context_window"
+                    if self.verbose:
+                        print("\n--- Context window exhausted, using last response as final ---")
+                    break
+
+            primary_request = request
+            cascading = (
+                self.cascade is not None
+                and not escalated
+                and self.cascade.use_small_model(iterations, bool(request_tools))
+            )
+            if cascading:
+                request = self.cascade.prepare(request)
+
+            # Tool calls of the small model only run once its response is accepted
+            response, pending_results = self._request_response(
+                request, guard=guard, deadline=deadline, iteration=iterations, speculative=not cascading
             )
 
+            # A tight budget that truncated the response is retried once with the full budget
+            while budget is not None and response.stop_reason == "max_tokens":
+                self.budget_controller.observe(iterations, response, budget)
+                budget = self.budget_controller.escalate(budget, bool(self.thinking), limit=self.max_tokens)
+                if budget is None:
+                    break
+                if self.verbose:
+                    print(f"Response hit max_tokens, retrying with {budget}")
+                self._apply_budget(request, budget)
+                if estimated_tokens is not None:
+                    self._fit_context(request, estimated_tokens)
+                if cascading:
+                    request = self.cascade.prepare(request)
+                response, pending_results = self._request_response(
+                    request,
+                    reuse=pending_results,
+                    guard=guard,
+                    deadline=deadline,
+                    iteration=iterations,
+                    speculative=not cascading,
+                )
+
+            if cascading:
+                escalation = self.cascade.check(response, request_tools)
+                self.cascade.observe(iterations, escalation)
+                if escalation:
+                    if self.verbose:
+                        print(f"Small model response escalated ({escalation}), retrying with {self.model}")
+                    escalated = self.cascade.sticky
+                    # Tool calls the primary model repeats are not run again
+                    response, pending_results = self._request_response(
+                        primary_request, reuse=pending_results, guard=guard, deadline=deadline, iteration=iterations
+                    )
+
+            if self.budget_controller:
+                self.budget_controller.observe(iterations, response, budget)
+            if estimated_tokens is not None:
+                # Every attempt of the turn sends the same messages and tools
+                self.token_estimator.observe(request["model"], estimated_tokens, response.usage)
+
             if self.verbose and any(
                 block.type == "thinking" for block in response.content
             ):
@@ -169,82 +347,79 @@ class AnthropicAgent(Agent):
                         print(content_block.thinking)
 
             if response.stop_reason == "tool_use":
-                tool_use_found = False
+                tool_results = []
 
                 for content_block in response.content:
-                    if content_block.type == "tool_use":
-                        tool_use_found = True
-                        tool_name = content_block.name
-                        tool_input = content_block.input
-                        tool_use_id = content_block.id
-
-                        if self.verbose:
-                            print(f"\n--- Tool Use Requested ---")
-                            print(f"Tool: {tool_name}")
-                            print(f"Input: {json.dumps(tool_input, indent=2)}")
-
-                        try:
-                            tool_result = self.registry.execute_tool(
-                                tool_name, **tool_input
-                            )
-                        except Exception as e:
-                            tool_result = {
-                                "error": f"Error executing tool {tool_name}: {str(e)}"
-                            }
-
-                        if self.verbose:
-                            print("\n--- Tool Result ---")
-                            print(
-                                json.dumps(tool_result, indent=2)
-                                if isinstance(tool_result, dict)
-                                else tool_result
-                            )
-
-                        messages.append(
-                            {"role": "assistant", "content": response.content}
-                        )
+                    if content_block.type != "tool_use":
+                        continue
 
-                        if isinstance(tool_result, dict):
-                            tool_result_content = json.dumps(tool_result)
-                        elif isinstance(tool_result, (str, int, float, bool)):
-                            tool_result_content = str(tool_result)
-                        else:
-                            try:
-                                if hasattr(tool_result, "model_dump"):
-                                    tool_result_content = json.dumps(tool_result.model_dump())
-                                elif hasattr(tool_result, "__dict__"):
-                                    tool_result_content = json.dumps(vars(tool_result))
-                                else:
-                                    tool_result_content = str(tool_result)
-                            except Exception as e:
-                                tool_result_content = f"Error serializing result: {str(e)}"
-
-                        if self.verbose:
-                            print(f"Tool result type: {type(tool_result)}")
-                            print(f"Serialized content type: {type(tool_result_content)}")
-
-                        messages.append(
-                            {
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "tool_result",
-                                        "tool_use_id": tool_use_id,
-                                        "content": tool_result_content,
-                                    }
-                                ],
-                            }
+                    repeated, tool_result = False, None
+                    if guard:
+                        repeated, tool_result = guard.lookup(
+                            content_block.name, content_block.input, reuse=self._is_idempotent(content_block.name)
                         )
+                        if repeated and self.verbose:
+                            print(f"\n--- Repeated call to {content_block.name}, answering from the earlier result ---")
+
+                    if not repeated:
+                        # Streamed calls were already dispatched while the response was generated
+                        pending = pending_results.get(content_block.id)
+                        if pending is not None:
+                            tool_result = deadline.result(pending) if deadline else pending.result()
+                        else:
+                            tool_result = self._execute_tool(content_block.name, content_block.input)
+                        if guard:
+                            guard.record(content_block.name, content_block.input, tool_result)
+
+                    activated_tools.add(content_block.name)
+                    if (
+                        self.tool_search_tool
+                        and content_block.name == self.tool_search_tool.name
+                        and isinstance(tool_result, dict)
+                    ):
+                        activated_tools.update(tool["name"] for tool in tool_result.get("tools", []))
+
+                    tool_result_content = self._serialize_tool_result(tool_result)
+                    if repeated:
+                        tool_result_content = self._with_note(tool_result_content, guard.repeat_hint(content_block.name))
+                    else:
+                        self.remember_tool_result(content_block.name, content_block.input, tool_result_content)
 
-                        break
-
-                if not tool_use_found:
+                    if self.verbose:
+                        print(f"Tool result type: {type(tool_result)}")
+                        print(f"Serialized content type: {type(tool_result_content)}")
+
+                    tool_results.append(
+                        {
+                            "type": "tool_result",
+                            "tool_use_id": content_block.id,
+                            "content": tool_result_content,
+                        }
+                    )
+
+                if not tool_results:
                     if self.verbose:
                         print("Expected tool use but none found in response")
                     break
+
+                if guard and guard.exceeded:
+                    final_response = response
+                    self.last_stop_reason = guard.stop_reason
+                    if self.verbose:
+                        print(f"\n--- {guard.stop_reason} ---")
+                    break
+
+                conversation.add_assistant(response.content)
+                conversation.add_user(tool_results)
             else:
                 # Final response from model
                 final_response = response
+                self.last_stop_reason = response.stop_reason
+                if response.stop_reason == "end_turn":
+                    self.remember_answer(
+                        prompt,
+                        "".join(block.text for block in response.content if block.type == "text"),
+                    )
 
                 if self.output_format:
                     final_response = self.output_parser_model(response)
@@ -259,11 +434,408 @@ class AnthropicAgent(Agent):
 
         if final_response is None:
             final_response = response
+            self.last_stop_reason = "max_iterations"
             if self.verbose:
                 print("\n--- Reached maximum iterations ---")
                 print("Using last response as final")
 
         return final_response
+
+    def compile(self, snapshot: Optional[RegistrySnapshot] = None) -> Tuple[Tuple[Any, ...], List[Dict[str, Any]]]:
+        """
+        Build the prompt prefix turns and the tool payload sent with every request
+
+        Args:
+            snapshot: Registry snapshot to take the tools from (defaults to the current one)
+
+        Returns:
+            The interned prefix turns and tool definitions
+        """
+        prefix = intern_prefix(self._prefix_texts())
+
+        custom_tools = (snapshot or self.registry.snapshot()).get_all_tools()
+
+        seen_tool_names = set()
+        all_tools = []
+
+        # The shared meta-tools are only offered to agents created with them
+        if self.tool_program_tool is None:
+            seen_tool_names.add(ToolProgramTool.NAME)
+        if self.tool_search_tool is None:
+            seen_tool_names.add(ToolSearchTool.NAME)
+
+        for tool in custom_tools:
+            tool_name = tool["name"]
+            if tool_name not in seen_tool_names:
+                seen_tool_names.add(tool_name)
+                all_tools.append(tool)
+        return prefix, intern_tools(all_tools)
+
+    def tool_catalog(self) -> List[Dict[str, Any]]:
+        """Get the definitions of all tools this agent may use"""
+        return self._compiled_payload()[1]
+
+    def _compiled_payload(self) -> Tuple[Tuple[Any, ...], List[Dict[str, Any]]]:
+        """Get the compiled prefix and tool payload, compiling again after the registry changed"""
+        compiled = self._compiled
+        if compiled is None or compiled[0] is not None:
+            snapshot = self.registry.snapshot()
+            if compiled is None or compiled[0] != snapshot.version:
+                compiled = self._compiled = (snapshot.version, *self.compile(snapshot))
+        return compiled[1], compiled[2]
+
+    def _prefix_texts(self) -> List[str]:
+        """Build the leading user turns carrying the system prompt, instructions and output format"""
+        texts = []
+
+        if self.system_prompt:
+            texts.append(f"<system>{self.system_prompt}</system>")
+
+        if self.instructions:
+            texts.append(f"<instructions>{self.instructions}</instructions>")
+
+        if self.output_format:
+            if isinstance(self.output_format, BaseModel) or \
+                (isinstance(self.output_format, type) and issubclass(self.output_format, BaseModel)):
+                if isinstance(self.output_format, type):
+                    schema_json = self.output_format.model_json_schema()
+                    schema_str = json.dumps(schema_json)
+                else:
+                    schema_str = self.output_format.model_dump_json()
+
+                texts.append(f"<output_format>{schema_str}</output_format>")
+            else:
+                texts.append(f"<output_format>{self.output_format}</output_format>")
+
+        return texts
+
+    def _selection_query(self, prompt: str, conversation: Conversation) -> str:
+        """Build the tool selection query from the prompt and the latest model output"""
+        turn = conversation.last("assistant")
+        if turn is None:
+            return prompt
+        return " ".join([prompt, *(block.data["text"] for block in turn.blocks("text"))])
+
+    def _apply_budget(self, request: Dict[str, Any], budget: Budget) -> None:
+        """Set the token limits of a request from a budget"""
+        request["max_tokens"] = budget.max_tokens
+        thinking = budget.thinking_config()
+        if thinking:
+            request["thinking"] = thinking
+
+    def _fit_context(self, request: Dict[str, Any], estimated_tokens: int) -> bool:
+        """
+        Lower the output limits of a request to what the context window has left
+
+        Args:
+            request: Keyword arguments for the messages API
+            estimated_tokens: Raw input token estimate of the request
+
+        Returns:
+            False if too little room is left for a useful response
+        """
+        available = self.token_estimator.available_output(request, estimated_tokens)
+        if available < MIN_OUTPUT_TOKENS:
+            return False
+        if request["max_tokens"] > available:
+            request["max_tokens"] = available
+            thinking = request.get("thinking") or {}
+            if thinking.get("type") == "enabled" and thinking["budget_tokens"] >= available:
+                # The API requires max_tokens to exceed the thinking budget
+                budget_tokens = available - MIN_OUTPUT_TOKENS
+                if budget_tokens < MIN_THINKING_TOKENS:
+                    return False
+                request["thinking"] = {**thinking, "budget_tokens": budget_tokens}
+            if self.verbose:
+                print(f"Output limited to {available} tokens by the context window")
+        return True
+
+    def _request_response(
+        self,
+        request: Dict[str, Any],
+        reuse: Optional[Dict[str, Future]] = None,
+        guard: Optional[ToolCallGuard] = None,
+        deadline: Optional[Deadline] = None,
+        iteration: Optional[int] = None,
+        speculative: bool = True,
+    ) -> Tuple[Any, Dict[str, Future]]:
+        """
+        Send a request, streaming it when enabled
+
+        Args:
+            request: Keyword arguments for the messages API
+            reuse: Results of a previous attempt of the same turn, by tool_use id
+            guard: Loop guard of the run; idempotent calls it has already seen are not dispatched
+            deadline: Deadline of the run, bounding the request
+            iteration: Iteration of the run, recorded in traces
+            speculative: Whether streamed tool calls may start before the caller has seen the response
+
+        Returns:
+            The final message and a mapping of tool_use id to the future of its result
+        """
+        if deadline:
+            timeout = deadline.timeout()
+            # An explicit None would switch off the client's own timeout
+            if timeout is not None:
+                request = {**request, "timeout": timeout}
+        if self.tracer is None:
+            if self._streams():
+                response, pending_results = self._stream_response(request, reuse, guard, deadline, speculative)
+            else:
+                response, pending_results = self._create(request, deadline), {}
+            record_usage(response.usage)
+            return response, pending_results
+
+        messages = request["messages"]
+        self.tracer.record(
+            "request",
+            iteration=iteration,
+            model=request["model"],
+            max_tokens=request["max_tokens"],
+            tools=[tool["name"] for tool in request["tools"] if "name" in tool],
+            messages=len(messages),
+            message=messages[-1] if messages else None,
+        )
+        started = time.perf_counter()
+        try:
+            if self._streams():
+                response, pending_results = self._stream_response(request, reuse, guard, deadline, speculative)
+            else:
+                response, pending_results = self._create(request, deadline), {}
+        except Exception as e:
+            self.tracer.record(
+                "response",
+                iteration=iteration,
+                model=request["model"],
+                duration=time.perf_counter() - started,
+                error=f"{type(e).__name__}: {e}",
+            )
+            raise
+        self.tracer.record(
+            "response",
+            iteration=iteration,
+            model=request["model"],
+            duration=time.perf_counter() - started,
+            stop_reason=response.stop_reason,
+            usage=response.usage,
+            content=response.content,
+        )
+        record_usage(response.usage)
+        return response, pending_results
+
+    def _create(self, request: Dict[str, Any], deadline: Optional[Deadline] = None) -> Any:
+        """
+        Create a message without streaming
+
+        With a deadline the request runs on its own thread, so that cancelling
+        the token releases the caller at once; the abandoned request still ends
+        with its timeout.
+        """
+        if deadline is None:
+            return self.client.beta.messages.create(**request)
+
+        future: Future = Future()
+
+        def run():
+            try:
+                future.set_result(self.client.beta.messages.create(**request))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="create", daemon=True).start()
+        return deadline.result(future)
+
+    def _streams(self) -> bool:
+        """Whether responses are streamed; clients without a beta stream method, such as Bedrock's, are not"""
+        return self.stream and callable(getattr(self.client.beta.messages, "stream", None))
+
+    def _stream_response(
+        self,
+        request: Dict[str, Any],
+        reuse: Optional[Dict[str, Future]] = None,
+        guard: Optional[ToolCallGuard] = None,
+        deadline: Optional[Deadline] = None,
+        speculative: bool = True,
+    ) -> Tuple[Any, Dict[str, Future]]:
+        """
+        Stream a model response, dispatching each tool call once its input JSON is complete
+
+        Calls to idempotent tools start while the response is still streaming;
+        the others only start once the response has ended in tool_use. Without
+        speculative dispatch no call is started, leaving them to the caller.
+
+        Args:
+            request: Keyword arguments for the messages API
+            reuse: Results of a previous attempt of the same turn; identical calls are not run twice
+            guard: Loop guard of the run; idempotent calls it has already seen are not dispatched
+            deadline: Deadline of the run; the stream is closed when it ends or is cancelled
+            speculative: Whether tool calls are started here at all
+
+        Returns:
+            The final message and a mapping of tool_use id to the future of its result
+        """
+        reusable = {
+            getattr(future, "fingerprint", None): future for future in (reuse or {}).values()
+        }
+        with self.client.beta.messages.stream(**request) as stream:
+            # The request timeout only bounds each read, so the stream is closed at the deadline
+            remove_abort = deadline.on_abort(stream.close) if deadline else None
+            try:
+                pending_results, deferred = self._consume_stream(stream, reusable, guard, speculative)
+            except Exception:
+                if deadline:
+                    deadline.check()
+                raise
+            finally:
+                if remove_abort:
+                    remove_abort()
+            if deadline:
+                deadline.check()
+
+            response = stream.get_final_message()
+
+        if speculative and response.stop_reason == "tool_use":
+            for tool_use_id, tool_name, raw_input in deferred:
+                pending_results[tool_use_id] = self._dispatch_once(tool_name, raw_input, reusable, guard)
+        return response, pending_results
+
+    def _consume_stream(
+        self,
+        stream: Any,
+        reusable: Dict[str, Future],
+        guard: Optional[ToolCallGuard] = None,
+        speculative: bool = True,
+    ) -> Tuple[Dict[str, Future], List[Tuple[str, str, str]]]:
+        """
+        Read stream events, dispatching calls to idempotent tools as their input completes
+
+        Returns:
+            Futures of the dispatched calls by tool_use id, and the id, name and raw input of the held back calls
+        """
+        pending_results: Dict[str, Future] = {}
+        deferred: List[Tuple[str, str, str]] = []
+        # Tool use blocks still receiving input, keyed by content block index
+        open_blocks: Dict[int, Dict[str, Any]] = {}
+
+        for event in stream:
+            if event.type == "content_block_start":
+                if event.content_block.type == "tool_use":
+                    open_blocks[event.index] = {
+                        "id": event.content_block.id,
+                        "name": event.content_block.name,
+                        "partial_json": [],
+                    }
+            elif event.type == "content_block_delta":
+                if event.delta.type == "input_json_delta" and event.index in open_blocks:
+                    open_blocks[event.index]["partial_json"].append(event.delta.partial_json)
+            elif event.type == "content_block_stop" and event.index in open_blocks:
+                block = open_blocks.pop(event.index)
+                raw_input = "".join(block["partial_json"])
+                if speculative and self._is_idempotent(block["name"]):
+                    pending_results[block["id"]] = self._dispatch_once(block["name"], raw_input, reusable, guard)
+                else:
+                    deferred.append((block["id"], block["name"], raw_input))
+
+        return pending_results, deferred
+
+    def _is_idempotent(self, tool_name: str) -> bool:
+        try:
+            return self.registry.get_tool(tool_name).idempotent
+        except ValueError:
+            return False
+
+    def _dispatch_once(
+        self,
+        tool_name: str,
+        raw_input: str,
+        reusable: Dict[str, Future],
+        guard: Optional[ToolCallGuard] = None,
+    ) -> Future:
+        """Dispatch a tool call unless an earlier attempt of the turn already made the same call"""
+        fingerprint = f"{tool_name}:{raw_input}"
+        future = reusable.pop(fingerprint, None)
+        if future is None:
+            future = self._dispatch_tool(tool_name, raw_input, guard)
+            future.fingerprint = fingerprint
+        return future
+
+    def _dispatch_tool(self, tool_name: str, raw_input: str, guard: Optional[ToolCallGuard] = None) -> Future:
+        """
+        Start a tool call in the background
+
+        A dedicated thread is used per call so that nested agents dispatching their own
+        tools can never exhaust a shared pool and deadlock.
+        """
+        future: Future = Future()
+
+        def run():
+            try:
+                tool_input = json.loads(raw_input) if raw_input else {}
+            except json.JSONDecodeError as e:
+                future.set_result({"error": f"Invalid input for tool {tool_name}: {str(e)}"})
+                return
+            if guard and self._is_idempotent(tool_name) and guard.seen(tool_name, tool_input):
+                # Answered from the earlier result by the run loop
+                future.set_result(None)
+                return
+            try:
+                future.set_result(self._execute_tool(tool_name, tool_input))
+            except BaseException as e:
+                future.set_exception(e)
+
+        # The copied context carries the run's deadline into the tool
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name=f"tool-{tool_name}", daemon=True).start()
+        return future
+
+    def _execute_tool(self, tool_name: str, tool_input: Dict[str, Any]) -> Any:
+        """Execute a tool, turning failures into an error result for the model"""
+        if self.verbose:
+            print(f"\n--- Tool Use Requested ---")
+            print(f"Tool: {tool_name}")
+            print(f"Input: {json.dumps(tool_input, indent=2)}")
+
+        started = time.perf_counter()
+        try:
+            tool_result = self.registry.execute_tool(tool_name, **tool_input)
+        except (DeadlineExceeded, Cancelled):
+            # The whole run is over, not just this call
+            raise
+        except Exception as e:
+            tool_result = {
+                "error": f"Error executing tool {tool_name}: {str(e)}"
+            }
+
+        if self.tracer is not None:
+            self.tracer.record(
+                "tool",
+                name=tool_name,
+                input=tool_input,
+                duration=time.perf_counter() - started,
+                error=isinstance(tool_result, dict) and "error" in tool_result,
+                output=tool_result,
+            )
+
+        if self.verbose:
+            print("\n--- Tool Result ---")
+            print(
+                json.dumps(tool_result, indent=2)
+                if isinstance(tool_result, dict)
+                else tool_result
+            )
+
+        return tool_result
+
+    def _serialize_tool_result(self, tool_result: Any) -> str | List[Dict[str, Any]]:
+        """Convert a tool result into tool_result content"""
+        return self.result_serializer.serialize(tool_result)
+
+    @staticmethod
+    def _with_note(content: str | List[Dict[str, Any]], note: str) -> str | List[Dict[str, Any]]:
+        """Append a note to tool_result content, keeping image blocks native"""
+        if isinstance(content, str):
+            return f"{content}\n\n{note}"
+        return [*content, {"type": "text", "text": note}]
     
     def __standalone_call(self, prompt: str) -> Dict[str, Any]:
         """
@@ -273,12 +845,24 @@ class AnthropicAgent(Agent):
             prompt: The prompt to invoke the agent with
         """
 
-        response = self.client.beta.messages.create(
-            model=self.model,
-            max_tokens=self.max_tokens,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=self.temperature,
+        options = {}
+        deadline = current_deadline()
+        if deadline:
+            timeout = deadline.timeout()
+            if timeout is not None:
+                options["timeout"] = timeout
+
+        response = self._create(
+            {
+                "model": self.model,
+                "max_tokens": self.max_tokens,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": self.temperature,
+                **options,
+            },
+            deadline,
         )
+        record_usage(response.usage)
         return response
     
     def output_parser_model(self, response: Dict[str, Any]) -> Dict[str, Any]:
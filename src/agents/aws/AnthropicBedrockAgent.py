@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 import json
 import anthropic
@@ -6,6 +6,17 @@ import anthropic
 from src.core.agent import Agent
 from src.core.tool import Tool
 from src.agents.aws.AnthropicAgent import AnthropicAgent
+from src.core.budget import BudgetController
+from src.core.cascade import CascadePolicy
+from src.core.router import TeamRouter
+from src.core.serialization import ResultSerializer
+from src.core.tokens import TokenEstimator
+from src.tools.selection import BM25ToolSelector
+
+if TYPE_CHECKING:
+    from src.agents.aws.backends import BackendPool
+    from src.memory import VectorMemory
+    from src.tracing import TraceRecorder
 
 from pydantic import BaseModel
 class AnthropicBedrockAgent(AnthropicAgent):
@@ -25,6 +36,18 @@ class AnthropicBedrockAgent(AnthropicAgent):
         max_tokens: int = 4096,
         temperature: float = None,
         betas: List[str] = [],
+        stream: bool = True,
+        tool_selector: Optional[BM25ToolSelector] = None,
+        router: Optional[TeamRouter] = None,
+        budget_controller: Optional[BudgetController] = None,
+        max_repeated_tool_calls: Optional[int] = 2,
+        result_serializer: Optional[ResultSerializer] = None,
+        memory: Optional["VectorMemory"] = None,
+        cascade: Optional[CascadePolicy] = None,
+        backend_pool: Optional["BackendPool"] = None,
+        tracer: Optional["TraceRecorder"] = None,
+        tool_programs: bool = False,
+        token_estimator: Optional[TokenEstimator] = None,
     ):
         """
         Initialize Anthropic Bedrock agent with tools
@@ -38,6 +61,18 @@ class AnthropicBedrockAgent(AnthropicAgent):
             max_iterations: Maximum number of iterations
             max_tokens: Maximum number of tokens
             temperature: Temperature
+            stream: Whether to stream responses and start each tool call as soon as its input is complete
+            tool_selector: Optional selector sending only the top-k relevant tools per iteration
+            router: Optional local router that hands obvious requests straight to a team member
+            budget_controller: Optional controller choosing max_tokens and thinking budgets per call
+            max_repeated_tool_calls: Repeats of an identical tool call tolerated before the run stops (None disables)
+            result_serializer: Serializer turning tool results into tool_result content
+            memory: Optional memory recalled before each request and updated with answers and tool results
+            cascade: Optional policy trying a smaller model first and escalating to model_id
+            backend_pool: Optional pool of providers used instead of a single client, with hedging and failover
+            tracer: Optional recorder of requests, responses, tool calls and their timings
+            tool_programs: Whether the model can run dependent tool calls in one turn with run_tool_program
+            token_estimator: Optional estimator checking each request against the context window before it is sent
         """
         super().__init__(
             agent_name=agent_name,
@@ -52,6 +87,18 @@ class AnthropicBedrockAgent(AnthropicAgent):
             max_tokens=max_tokens,
             temperature=temperature,
             betas=betas,
-            model_id=model_id
+            model_id=model_id,
+            stream=stream,
+            tool_selector=tool_selector,
+            router=router,
+            budget_controller=budget_controller,
+            max_repeated_tool_calls=max_repeated_tool_calls,
+            result_serializer=result_serializer,
+            memory=memory,
+            cascade=cascade,
+            backend_pool=backend_pool,
+            tracer=tracer,
+            tool_programs=tool_programs,
+            token_estimator=token_estimator,
         )
-        self.client = anthropic.AnthropicBedrock(aws_region=aws_region)
\ No newline at end of file
+        self.client = backend_pool or anthropic.AnthropicBedrock(aws_region=aws_region)
\ No newline at end of file
@@ -1,4 +1,6 @@
 from .AnthropicAgent import AnthropicAgent
 from .AnthropicBedrockAgent import AnthropicBedrockAgent
+from .backends import Backend, BackendPool
+from .template import AgentTemplate
 
-__all__ = ["AnthropicBedrockAgent", "AnthropicAgent"]
+__all__ = ["AnthropicBedrockAgent", "AnthropicAgent", "AgentTemplate", "Backend", "BackendPool"]
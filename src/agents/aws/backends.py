@@ -0,0 +1,439 @@
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import anthropic
+
+
+# Errors worth retrying on another backend; request errors would fail everywhere
+_FAILOVER_ERRORS = (
+    anthropic.APIConnectionError,
+    anthropic.RateLimitError,
+    anthropic.InternalServerError,
+)
+
+
+def _should_fail_over(error: BaseException) -> bool:
+    if isinstance(error, _FAILOVER_ERRORS):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and error.status_code >= 500
+
+
+class Backend:
+    """
+    One provider endpoint of a BackendPool with its health record
+
+    Health is a moving average of call outcomes: 1 for a success, 0 for a
+    failure worth failing over and 0.5 for losing a hedged race. Without new
+    outcomes it recovers towards 1 over time, so a backend that once failed
+    is tried again. Consecutive failures put the backend in a cooldown that
+    doubles with each further failure, after which a single call probes it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        client: Any,
+        models: Optional[Dict[str, str]] = None,
+        failure_threshold: int = 3,
+        cooldown: float = 10.0,
+        max_cooldown: float = 300.0,
+        smoothing: float = 0.2,
+        recovery: float = 60.0,
+        window: int = 200,
+    ):
+        """
+        Initialize the backend
+
+        Args:
+            name: Name used in statistics and verbose output
+            client: Anthropic or AnthropicBedrock client (best created with max_retries=0)
+            models: Model IDs of this provider keyed by the agent's model ID
+            failure_threshold: Consecutive failures before the backend cools down
+            cooldown: First cooldown in seconds
+            max_cooldown: Longest cooldown in seconds
+            smoothing: Weight of the latest outcome in the health average
+            recovery: Seconds in which an idle backend recovers half of its lost health
+            window: Number of recent latencies kept for hedging
+        """
+        self.name = name
+        self.client = client
+        self.models = dict(models or {})
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.smoothing = smoothing
+        self.recovery = recovery
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._health = 1.0
+        self._updated = time.monotonic()
+        self.consecutive_failures = 0
+        self.cooling_until = 0.0
+        self.calls = 0
+        self.failures = 0
+
+    def __repr__(self) -> str:
+        return f"Backend({self.name!r}, health={self.health:.2f})"
+
+    @classmethod
+    def api(cls, name: str = "anthropic", max_retries: int = 0, **options: Any) -> "Backend":
+        """
+        Create a backend for the Anthropic API
+
+        Args:
+            name: Backend name
+            max_retries: Client retries before the pool fails over
+            **options: Further client options (api_key, base_url, timeout) and Backend options
+        """
+        backend_options = {key: options.pop(key) for key in _BACKEND_OPTIONS if key in options}
+        client = anthropic.Anthropic(max_retries=max_retries, **options)
+        return cls(name, client, **backend_options)
+
+    @classmethod
+    def bedrock(
+        cls, aws_region: str = "us-east-1", name: Optional[str] = None, max_retries: int = 0, **options: Any
+    ) -> "Backend":
+        """
+        Create a backend for Anthropic models on Amazon Bedrock
+
+        Args:
+            aws_region: AWS region
+            name: Backend name (defaults to "bedrock-<region>")
+            max_retries: Client retries before the pool fails over
+            **options: Further client options and Backend options such as models
+        """
+        backend_options = {key: options.pop(key) for key in _BACKEND_OPTIONS if key in options}
+        client = anthropic.AnthropicBedrock(aws_region=aws_region, max_retries=max_retries, **options)
+        return cls(name or f"bedrock-{aws_region}", client, **backend_options)
+
+    @property
+    def health(self) -> float:
+        """Health score between 0 and 1"""
+        idle = time.monotonic() - self._updated
+        return 1.0 - (1.0 - self._health) * 0.5 ** (idle / self.recovery)
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.cooling_until
+
+    def model(self, model_id: str) -> str:
+        """Translate the agent's model ID into this provider's"""
+        return self.models.get(model_id, model_id)
+
+    def latency_percentile(self, q: float, min_samples: int) -> Optional[float]:
+        """Get a percentile of recent latencies, or None before min_samples calls"""
+        with self._lock:
+            if len(self._latencies) < min_samples:
+                return None
+            observed = sorted(self._latencies)
+        return observed[min(len(observed) - 1, max(0, math.ceil(q * len(observed)) - 1))]
+
+    def _observe(self, outcome: float) -> None:
+        self._health = self.health + self.smoothing * (outcome - self.health)
+        self._updated = time.monotonic()
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self._latencies.append(latency)
+            self._observe(1.0)
+            self.consecutive_failures = 0
+            self.cooling_until = 0.0
+
+    def record_slow(self) -> None:
+        """Record that a hedged duplicate on another backend answered first"""
+        with self._lock:
+            self._observe(0.5)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self._observe(0.0)
+            self.consecutive_failures += 1
+            excess = self.consecutive_failures - self.failure_threshold
+            if excess >= 0:
+                self.cooling_until = time.monotonic() + min(self.max_cooldown, self.cooldown * 2 ** excess)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        return {
+            "health": round(self.health, 3),
+            "available": self.available,
+            "calls": self.calls,
+            "failures": self.failures,
+            "p50_latency": latencies[len(latencies) // 2] if latencies else None,
+        }
+
+
+_BACKEND_OPTIONS = ("models", "failure_threshold", "cooldown", "max_cooldown", "smoothing", "recovery", "window")
+
+
+class _Messages:
+    """Messages resource of a BackendPool, mirroring client.messages and client.beta.messages"""
+
+    def __init__(self, pool: "BackendPool", beta: bool):
+        self._pool = pool
+        self._beta = beta
+
+    def create(self, **request: Any) -> Any:
+        return self._pool.create(request, beta=self._beta)
+
+    def stream(self, **request: Any) -> "_PooledStream":
+        return _PooledStream(self._pool, request, self._beta)
+
+
+class _Beta:
+    def __init__(self, pool: "BackendPool"):
+        self.messages = _Messages(pool, beta=True)
+
+
+class _PooledStream:
+    """Stream context manager opening the stream on the pool's backends"""
+
+    def __init__(self, pool: "BackendPool", request: Dict[str, Any], beta: bool):
+        self._pool = pool
+        self._request = request
+        self._beta = beta
+        self._manager = None
+        self._backend: Optional[Backend] = None
+
+    def __enter__(self) -> Any:
+        (self._manager, stream), self._backend = self._pool.open_stream(self._request, beta=self._beta)
+        return stream
+
+    def __exit__(self, exc_type, exc, exc_tb) -> None:
+        if exc is not None and _should_fail_over(exc):
+            # Failures after the stream opened cannot fail over, but still count against the backend
+            self._backend.record_failure()
+        self._manager.__exit__(exc_type, exc, exc_tb)
+
+
+class _CreatedStream:
+    """Stream stand-in for a backend that cannot stream, holding a message created in one request"""
+
+    def __init__(self, message: Any):
+        self._message = message
+
+    def __enter__(self) -> "_CreatedStream":
+        return self
+
+    def __exit__(self, exc_type, exc, exc_tb) -> None:
+        pass
+
+    def __iter__(self):
+        # No events, so the agent runs the message's tool calls once it is complete
+        return iter(())
+
+    def close(self) -> None:
+        pass
+
+    def get_final_message(self) -> Any:
+        return self._message
+
+
+class BackendPool:
+    """
+    Client spreading Messages API calls over several providers
+
+    Used in place of an agent's client, it sends each call to the healthiest
+    backend (ties broken by the order given), fails over to the next one on
+    connection errors, throttling and server errors, and sends a hedged
+    duplicate to another backend when the first has not answered within a
+    percentile of its recent latency. The first answer wins; for streams,
+    only the stream that opened first is read, so tool calls are never
+    dispatched twice.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Backend],
+        hedge_percentile: Optional[float] = 0.95,
+        min_hedge_delay: float = 0.05,
+        min_samples: int = 20,
+        max_hedges: int = 1,
+        verbose: bool = False,
+    ):
+        """
+        Initialize the pool
+
+        Args:
+            backends: Backends in order of preference
+            hedge_percentile: Latency percentile of a backend after which a hedged request is sent (None disables)
+            min_hedge_delay: Shortest wait before hedging in seconds
+            min_samples: Calls a backend needs before its requests are hedged
+            max_hedges: Maximum hedged duplicates per call
+            verbose: Whether to print failovers and hedges
+        """
+        if not backends:
+            raise ValueError("A backend pool needs at least one backend")
+        self.backends = list(backends)
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.verbose = verbose
+        self.messages = _Messages(self, beta=False)
+        self.beta = _Beta(self)
+        self._lock = threading.Lock()
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def ranked(self) -> List[Backend]:
+        """Get the backends in the order calls try them"""
+        order = {id(backend): index for index, backend in enumerate(self.backends)}
+        available = [backend for backend in self.backends if backend.available]
+        if not available:
+            # Everything is cooling down, so probe whichever recovers first
+            return sorted(self.backends, key=lambda backend: backend.cooling_until)
+        return sorted(available, key=lambda backend: (-round(backend.health, 1), order[id(backend)]))
+
+    def create(self, request: Dict[str, Any], beta: bool = True) -> Any:
+        """Create a message on the pool's backends"""
+
+        def call(backend: Backend) -> Any:
+            messages = backend.client.beta.messages if beta else backend.client.messages
+            return messages.create(**{**request, "model": backend.model(request["model"])})
+
+        return self._race(call)[0]
+
+    def open_stream(self, request: Dict[str, Any], beta: bool = True) -> Tuple[Tuple[Any, Any], Backend]:
+        """
+        Open a message stream on the pool's backends
+
+        Backends whose client cannot stream create the message in one request
+        and return it as a stream without events.
+
+        Returns:
+            The winning (stream manager, stream) pair and its backend
+        """
+
+        def call(backend: Backend) -> Tuple[Any, Any]:
+            messages = backend.client.beta.messages if beta else backend.client.messages
+            request_for_backend = {**request, "model": backend.model(request["model"])}
+            if not callable(getattr(messages, "stream", None)):
+                # Bedrock's beta messages cannot stream, so the whole message is created at once
+                created = _CreatedStream(messages.create(**request_for_backend))
+                return created, created
+            manager = messages.stream(**request_for_backend)
+            return manager, manager.__enter__()
+
+        def discard(opened: Tuple[Any, Any]) -> None:
+            opened[0].__exit__(None, None, None)
+
+        return self._race(call, discard)
+
+    def _race(
+        self, call: Callable[[Backend], Any], discard: Optional[Callable[[Any], None]] = None
+    ) -> Tuple[Any, Backend]:
+        """
+        Run a call on the ranked backends with failover and hedging
+
+        Args:
+            call: Performs the call on one backend
+            discard: Releases the result of a call that lost the race
+
+        Returns:
+            The first successful result and the backend that produced it
+        """
+        candidates = self.ranked()
+        first = candidates[0]
+        running: Dict[Future, Backend] = {}
+        # Guards deciding the race against late results, so each losing result is released exactly once
+        race_lock = threading.Lock()
+        decided = False
+        hedges = 0
+        last_error: Optional[BaseException] = None
+
+        def launch(backend: Backend) -> None:
+            future: Future = Future()
+            started = time.monotonic()
+
+            def run():
+                try:
+                    result = call(backend)
+                except BaseException as e:
+                    if _should_fail_over(e):
+                        backend.record_failure()
+                    future.set_exception(e)
+                    return
+                backend.record_success(time.monotonic() - started)
+                with race_lock:
+                    future.set_result(result)
+                    late = decided
+                if late and discard is not None:
+                    discard(result)
+
+            running[future] = backend
+            # The copied context carries the caller's deadline into the call
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(run,), name=f"backend-{backend.name}", daemon=True).start()
+
+        def decide() -> None:
+            nonlocal decided
+            with race_lock:
+                decided = True
+                losers = [future.result() for future in running if future.done() and future.exception() is None]
+            if discard is not None:
+                for result in losers:
+                    discard(result)
+
+        launch(candidates.pop(0))
+        while running:
+            hedge_delay = None
+            if candidates and hedges < self.max_hedges and self.hedge_percentile is not None:
+                hedge_delay = self._hedge_delay(first)
+
+            done, _ = wait(list(running), timeout=hedge_delay, return_when=FIRST_COMPLETED)
+            if not done:
+                hedges += 1
+                backend = candidates.pop(0)
+                with self._lock:
+                    self.hedges += 1
+                if self.verbose:
+                    print(f"No response from {first.name} within {hedge_delay:.3f}s, hedging on {backend.name}")
+                launch(backend)
+                continue
+
+            for future in done:
+                backend = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    decide()
+                    if hedges and backend is not first:
+                        first.record_slow()
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result(), backend
+                last_error = error
+                if not _should_fail_over(error):
+                    decide()
+                    raise error
+                if candidates and not running:
+                    with self._lock:
+                        self.failovers += 1
+                    if self.verbose:
+                        print(f"{backend.name} failed ({type(error).__name__}), failing over to {candidates[0].name}")
+                    launch(candidates.pop(0))
+
+        raise last_error
+
+    def _hedge_delay(self, backend: Backend) -> Optional[float]:
+        delay = backend.latency_percentile(self.hedge_percentile, self.min_samples)
+        if delay is None:
+            return None
+        return max(self.min_hedge_delay, delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hedges, failovers and the health of each backend"""
+        with self._lock:
+            stats = {"hedges": self.hedges, "hedge_wins": self.hedge_wins, "failovers": self.failovers}
+        stats["backends"] = {backend.name: backend.stats() for backend in self.backends}
+        return stats
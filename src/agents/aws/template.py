@@ -0,0 +1,80 @@
+from types import MappingProxyType
+from typing import Any, Type
+
+from src.agents.aws.AnthropicAgent import AnthropicAgent
+
+
+class AgentTemplate:
+    """
+    Immutable, precompiled agent configuration for creating agents per request
+
+    The template builds one prototype agent, which creates the client,
+    registers the tools and team delegation tool and validates the thinking
+    configuration, and compiles its prompt prefix and tool payload. Agents
+    created from it are copy-on-write views: they share the prototype's
+    client, tools, team and compiled payload, and assigning an attribute on a
+    view (or passing an override) only changes that view. Each run keeps its
+    conversation in its own state, so views can serve concurrent requests.
+    """
+
+    # Options that can differ per created agent without recompiling the template
+    OVERRIDABLE = frozenset(
+        {
+            "agent_name",
+            "verbose",
+            "max_iterations",
+            "max_tokens",
+            "stream",
+            "memory",
+            "tracer",
+            "budget_controller",
+            "cascade",
+            "result_serializer",
+            "max_repeated_tool_calls",
+            "token_estimator",
+        }
+    )
+
+    def __init__(self, agent_class: Type[AnthropicAgent] = AnthropicAgent, client: Any = None, **options: Any):
+        """
+        Build the template
+
+        Args:
+            agent_class: AnthropicAgent or a subclass such as AnthropicBedrockAgent
+            client: Client shared with other templates, used instead of the one the agent class creates
+            **options: Constructor arguments of the agent class
+        """
+        prototype = agent_class(**options)
+        if client is not None:
+            prototype.client = client
+        # Views keep this payload even if other agents register tools later
+        prototype._compiled = (None, *prototype.compile())
+        # Views must not be able to change the team of every other view
+        prototype.team = tuple(prototype.team)
+        self.agent_class = agent_class
+        self._state = MappingProxyType(dict(vars(prototype)))
+
+    @property
+    def client(self) -> Any:
+        """The client shared by all agents created from the template"""
+        return self._state["client"]
+
+    def create(self, **overrides: Any) -> AnthropicAgent:
+        """
+        Create an agent from the template
+
+        Args:
+            **overrides: Per-agent values of the options in OVERRIDABLE
+
+        Returns:
+            A new agent sharing the template's configuration
+        """
+        unknown = set(overrides) - self.OVERRIDABLE
+        if unknown:
+            raise ValueError(f"Options cannot be overridden per agent: {sorted(unknown)}")
+        agent = self.agent_class.__new__(self.agent_class)
+        state = vars(agent)
+        state.update(self._state)
+        state.update(overrides)
+        state["last_stop_reason"] = None
+        return agent
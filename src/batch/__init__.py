@@ -0,0 +1,3 @@
+from .runner import BatchItem, BatchRunner, JsonlWriter, completed_ids, read_items
+
+__all__ = ["BatchItem", "BatchRunner", "JsonlWriter", "completed_ids", "read_items"]
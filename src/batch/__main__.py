@@ -0,0 +1,88 @@
+import argparse
+import importlib
+import json
+import sys
+
+from src.batch.runner import BatchRunner, JsonlWriter, completed_ids, read_items
+from src.core.agent import Agent
+
+
+def load_agent(spec: str):
+    """
+    Resolve a MODULE:ATTRIBUTE reference to an agent or agent template
+
+    The attribute can be an agent, an AgentTemplate or a function building
+    one, which is called once without arguments.
+    """
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"Expected MODULE:ATTRIBUTE, got {spec}")
+    target = importlib.import_module(module_name)
+    for name in attribute.split("."):
+        target = getattr(target, name)
+    if callable(target) and not isinstance(target, Agent) and not hasattr(target, "create"):
+        target = target()
+    return target
+
+
+def main(argv=None) -> None:
+    """
+    Batch command line
+
+    Usage:
+        python -m src.batch prompts.jsonl -o results.jsonl --agent src.main:build_team \
+            --concurrency 16 --resume
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch", description="Run prompts from a JSONL file through an agent"
+    )
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of prompts (stdin by default)")
+    parser.add_argument("-o", "--output", help="JSONL file to write results to (stdout by default)")
+    parser.add_argument(
+        "--agent", default="src.main:build_team",
+        help="MODULE:ATTRIBUTE of an agent, an AgentTemplate or a function building one",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ordered", action="store_true", help="Write results in input order")
+    parser.add_argument("--window", type=int, help="Most items in flight or awaiting output (4x concurrency by default)")
+    parser.add_argument("--timeout", type=float, help="Seconds each prompt may take")
+    parser.add_argument("--resume", action="store_true", help="Skip items already answered in the output file")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--prompt-field", default="prompt")
+    parser.add_argument("--progress", type=float, default=None, help="Seconds between progress lines on stderr")
+    args = parser.parse_args(argv)
+
+    if args.resume and not args.output:
+        parser.error("--resume needs --output")
+
+    skip = completed_ids(args.output) if args.resume else set()
+    runner = BatchRunner(
+        load_agent(args.agent),
+        concurrency=args.concurrency,
+        ordered=args.ordered,
+        window=args.window,
+        timeout=args.timeout,
+        progress_interval=args.progress,
+    )
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output = sys.stdout if not args.output else open(args.output, "a" if args.resume else "w", encoding="utf-8")
+    writer = JsonlWriter(output)
+    try:
+        stats = runner.run(read_items(source, args.id_field, args.prompt_field), writer.write, skip=skip)
+    except KeyboardInterrupt:
+        print(f"Interrupted, {writer.written} results written; rerun with --resume to continue", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps(stats), file=sys.stderr)
+    if stats["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
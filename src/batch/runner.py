@@ -0,0 +1,330 @@
+import contextvars
+import copy
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, IO, Iterable, Iterator, Optional, Set, Union
+
+from src.core.agent import Agent
+from src.core.deadline import CancellationToken, Cancelled
+from src.core.delegation import DelegationResult, usage_scope
+
+
+class BatchItem:
+    """One prompt of a batch"""
+
+    __slots__ = ("id", "prompt", "metadata", "error")
+
+    def __init__(self, id: str, prompt: Optional[str], metadata: Any = None, error: Optional[str] = None):
+        self.id = id
+        self.prompt = prompt
+        # Passed through to the output record unchanged
+        self.metadata = metadata
+        # Why the input line could not be read, if it could not
+        self.error = error
+
+
+def read_items(lines: Iterable[str], id_field: str = "id", prompt_field: str = "prompt") -> Iterator[BatchItem]:
+    """
+    Parse JSONL input lazily
+
+    Each line is an object with a prompt and an optional id and metadata, or
+    a bare JSON string; lines without an id are identified by their line
+    number, which keeps resuming possible as long as the input is unchanged.
+
+    Args:
+        lines: Input lines, e.g. an open file
+        id_field: Field holding the item ID
+        prompt_field: Field holding the prompt
+
+    Yields:
+        The items in input order, with an error for lines that cannot be used
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield BatchItem(str(number), None, error=f"Invalid JSON on line {number}: {e}")
+            continue
+
+        if isinstance(record, str):
+            yield BatchItem(str(number), record)
+            continue
+        if not isinstance(record, dict):
+            yield BatchItem(str(number), None, error=f"Line {number} is neither an object nor a string")
+            continue
+
+        item_id = str(record[id_field]) if record.get(id_field) is not None else str(number)
+        prompt = record.get(prompt_field)
+        if not isinstance(prompt, str) or not prompt.strip():
+            yield BatchItem(item_id, None, record.get("metadata"), f"Line {number} has no {prompt_field}")
+            continue
+        yield BatchItem(item_id, prompt, record.get("metadata"))
+
+
+def completed_ids(path: Union[str, os.PathLike]) -> Set[str]:
+    """
+    Get the IDs an earlier run of a batch already answered
+
+    A line cut short by an interrupted run is removed from the file so that
+    appending to it continues with whole records. Failed items are not
+    counted as completed and run again, except for input lines that could
+    not be read, which would fail the same way every time.
+
+    Args:
+        path: Output file of the earlier run
+
+    Returns:
+        The IDs of the items with a result or an input error
+    """
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, "r+b") as f:
+        end = f.seek(0, 2)
+        position = end
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            f.truncate(position)
+
+    done = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict) or "id" not in record:
+                continue
+            if record.get("status") != "error" or record.get("input_error"):
+                done.add(str(record["id"]))
+    return done
+
+
+class JsonlWriter:
+    """Writes records as JSON lines, flushing each one so results survive an interruption"""
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+        self.written = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
+        self.written += 1
+
+
+class BatchRunner:
+    """
+    Runs a stream of prompts through an agent with bounded concurrency
+
+    Items are read from the input only as workers free up, and at most
+    `window` results are held at any time, so memory stays constant however
+    large the batch is. Every item runs on its own agent: agents created from
+    an AgentTemplate, or shallow copies of a plain agent, share the client,
+    tools and team while keeping per-run state apart. With `ordered`, results
+    are written in input order; otherwise as soon as they are ready, which
+    keeps all workers busy when some prompts take much longer than others.
+    """
+
+    def __init__(
+        self,
+        agent: Any,
+        concurrency: int = 8,
+        ordered: bool = False,
+        window: Optional[int] = None,
+        timeout: Optional[float] = None,
+        progress_interval: Optional[float] = None,
+    ):
+        """
+        Initialize the runner
+
+        Args:
+            agent: Agent, AgentTemplate or callable returning a fresh agent for each item
+            concurrency: Number of prompts run at the same time
+            ordered: Whether to write results in input order
+            window: Maximum number of submitted items without a written result (4x concurrency by default)
+            timeout: Seconds each prompt may take
+            progress_interval: Seconds between progress lines on stderr (None disables them)
+        """
+        self._new_agent = self._agent_factory(agent)
+        self.concurrency = concurrency
+        self.ordered = ordered
+        self.window = max(window or concurrency * 4, concurrency)
+        self.timeout = timeout
+        self.progress_interval = progress_interval
+        self.cancel_token = CancellationToken()
+        self.counts: Counter = Counter()
+        self._last_progress = 0.0
+
+    @staticmethod
+    def _agent_factory(agent: Any) -> Callable[[], Agent]:
+        if isinstance(agent, Agent):
+            return lambda: copy.copy(agent)
+        if hasattr(agent, "create"):
+            return agent.create
+        if callable(agent):
+            return agent
+        raise TypeError(f"Expected an agent, an agent template or an agent factory, got {type(agent).__name__}")
+
+    def cancel(self) -> None:
+        """Stop reading input and abort the prompts in flight; their results are not written"""
+        self.cancel_token.cancel("batch cancelled")
+
+    def run(
+        self,
+        items: Iterable[BatchItem],
+        write: Callable[[Dict[str, Any]], None],
+        skip: Optional[Set[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a batch
+
+        Args:
+            items: Items to run, read lazily
+            write: Called with each result record, from the calling thread
+            skip: IDs of items to leave out, e.g. from completed_ids
+
+        Returns:
+            Counts of written, failed and skipped items, the duration and the throughput
+        """
+        skip = skip or set()
+        started = time.perf_counter()
+        self._last_progress = started
+
+        def emit(future: Future) -> None:
+            record = future.result()
+            if record is None:
+                # Cancelled before it finished; a resumed run picks it up again
+                return
+            write(record)
+            self.counts["error" if record.get("status") == "error" else "ok"] += 1
+            self._report_progress(started)
+
+        pending: Union[Deque[Future], Set[Future]] = deque() if self.ordered else set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as pool:
+            try:
+                for item in items:
+                    if self.cancel_token.cancelled:
+                        break
+                    if item.id in skip:
+                        self.counts["skipped"] += 1
+                        continue
+
+                    if item.error is not None:
+                        future: Future = Future()
+                        future.set_result(self._record(item, status="error", error=item.error, input_error=True))
+                    else:
+                        # The copied context carries the caller's deadline and trace run
+                        context = contextvars.copy_context()
+                        future = pool.submit(context.run, self._process, item)
+                    if self.ordered:
+                        pending.append(future)
+                    else:
+                        pending.add(future)
+
+                    while len(pending) >= self.window:
+                        if self.ordered:
+                            emit(pending.popleft())
+                        else:
+                            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                pending.discard(future)
+                                emit(future)
+
+                while pending:
+                    if self.ordered:
+                        emit(pending.popleft())
+                    else:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            pending.discard(future)
+                            emit(future)
+            except BaseException:
+                self.cancel()
+                for future in pending:
+                    future.cancel()
+                raise
+
+        return self.stats(time.perf_counter() - started)
+
+    def _process(self, item: BatchItem) -> Optional[Dict[str, Any]]:
+        """Run one item and build its result record"""
+        if self.cancel_token.cancelled:
+            return None
+        started = time.perf_counter()
+        agent = self._new_agent()
+        with usage_scope() as usage:
+            try:
+                response = agent.invoke(item.prompt, deadline=self.timeout, cancel_token=self.cancel_token)
+            except Cancelled:
+                if self.cancel_token.cancelled:
+                    return None
+                return self._record(item, status="error", error="Cancelled", started=started, agent=agent)
+            except Exception as e:
+                return self._record(item, status="error", error=f"{type(e).__name__}: {e}", started=started, agent=agent)
+
+        result = DelegationResult.from_response(
+            agent.agent_name, response, structured=bool(agent.output_format), usage=usage
+        )
+        return self._record(
+            item,
+            started=started,
+            agent=agent,
+            **result.model_dump(exclude={"agent_name"}, exclude_none=True),
+        )
+
+    @staticmethod
+    def _record(
+        item: BatchItem,
+        started: Optional[float] = None,
+        agent: Optional[Agent] = None,
+        **fields: Any,
+    ) -> Dict[str, Any]:
+        record: Dict[str, Any] = {"id": item.id, **fields}
+        if agent is not None:
+            record["stop_reason"] = agent.last_stop_reason
+        if started is not None:
+            record["duration"] = round(time.perf_counter() - started, 3)
+        if item.metadata is not None:
+            record["metadata"] = item.metadata
+        return record
+
+    def _report_progress(self, started: float) -> None:
+        if self.progress_interval is None:
+            return
+        now = time.perf_counter()
+        if now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        done = self.counts["ok"] + self.counts["error"]
+        print(
+            f"{done} done ({self.counts['error']} failed, {self.counts['skipped']} skipped), "
+            f"{done / max(now - started, 1e-9):.1f}/s",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    def stats(self, duration: float) -> Dict[str, Any]:
+        """Get the counts of a run that took the given number of seconds"""
+        done = self.counts["ok"] + self.counts["error"]
+        return {
+            "completed": self.counts["ok"],
+            "failed": self.counts["error"],
+            "skipped": self.counts["skipped"],
+            "duration": round(duration, 3),
+            "throughput": round(done / duration, 2) if duration > 0 else 0.0,
+        }
@@ -1,12 +1,82 @@
+import contextlib
+import contextvars
 import json
 import sys
+import time
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
 from pydantic import BaseModel
 
+from src.core.deadline import CancellationToken, Cancelled, Deadline, DeadlineExceeded, current_deadline
+from src.core.delegation import DelegationResult, usage_scope
+from src.core.router import TeamRouter
 from src.core.tool import Tool
+from src.tools.program import ToolProgramTool
 from src.tools.registry import ToolRegistry
+from src.tools.selection import BM25ToolSelector, ToolSearchTool
+
+if TYPE_CHECKING:
+    # Memory needs NumPy, so it is only imported by callers that use it
+    from src.memory import VectorMemory
+
+# Tools whose results are never written to memory
+_UNREMEMBERED_TOOLS = frozenset({"find_tools", "search_memory", "computer"})
+# Longest remembered text shown in a recalled note
+_MAX_RECALLED_CHARS = 1500
+
+# Agent whose run is executing in the current context
+_current_agent: contextvars.ContextVar[Optional["Agent"]] = contextvars.ContextVar("current_agent", default=None)
+# Prompt of that run
+_current_prompt: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_prompt", default=None)
+
+
+def current_agent() -> Optional["Agent"]:
+    """Get the agent whose run is executing, if any"""
+    return _current_agent.get()
+
+
+def current_prompt() -> Optional[str]:
+    """Get the prompt of the run that is executing, if any"""
+    return _current_prompt.get()
+
+
+@contextlib.contextmanager
+def agent_scope(agent: "Agent", prompt: Optional[str] = None) -> Iterator["Agent"]:
+    """Make an agent and its prompt current for the enclosed code (and contexts copied from it)"""
+    reset = _current_agent.set(agent)
+    reset_prompt = _current_prompt.set(prompt)
+    try:
+        yield agent
+    finally:
+        _current_prompt.reset(reset_prompt)
+        _current_agent.reset(reset)
+
+
+def _execute_program_step(tool_name: str, tool_input: Dict[str, Any]) -> Any:
+    """
+    Run a step of a tool program with the agent running the program
+
+    The program tool is shared through the registry, so the agent is looked
+    up per call rather than bound to whichever agent registered it last.
+    """
+    agent = current_agent()
+    if agent is None:
+        return ToolRegistry().execute_tool(tool_name, **tool_input)
+    return agent._execute_tool(tool_name, tool_input)
+
+def _rank_tools_for_current_agent(query: str) -> Optional[List[Tuple[float, Dict[str, Any]]]]:
+    """
+    Rank the tool catalog of the agent running the search with its own selector
+
+    Like the program tool, the search tool is shared through the registry,
+    so the selector is looked up per call.
+    """
+    agent = current_agent()
+    if agent is None or agent.tool_selector is None:
+        return None
+    return agent.tool_selector.rank(query, agent.tool_catalog())
+
 
 class Agent:
     """Agent that invokes Claude with tools and handles the full conversation cycle"""
@@ -20,6 +90,10 @@ class Agent:
         tools: List[Tool] = None,
         team: Optional[List["Agent"]] = None,
         agent_name: Optional[str] = None,
+        tool_selector: Optional[BM25ToolSelector] = None,
+        router: Optional[TeamRouter] = None,
+        memory: Optional["VectorMemory"] = None,
+        tool_programs: bool = False,
     ):
         """
         Initialize the agent with optional tools
@@ -32,6 +106,10 @@ class Agent:
             tools: List of Tool objects to register automatically
             team: List of Agent objects that this agent can delegate tasks to
             agent_name: Name of this agent (helps with team identification)
+            tool_selector: Optional selector sending only the tools relevant to each request
+            router: Optional local router delegating obvious requests without a manager model call
+            memory: Optional memory recalled before each request and updated with answers and tool results
+            tool_programs: Whether the model can run dependent tool calls in one turn with run_tool_program
         """
         self.system_prompt = system_prompt
         self.instructions = instructions
@@ -40,16 +118,38 @@ class Agent:
         self.team = team or []
         self.agent_name = agent_name or str(uuid.uuid4())
         self.registry = ToolRegistry()
+        self.tool_selector = tool_selector
+        self.tool_search_tool = None
+        self.tool_program_tool = None
+        self.router = router
+        self.memory = memory
+        # Why the latest invoke stopped (e.g. "end_turn", "max_iterations" or a loop guard reason)
+        self.last_stop_reason: Optional[str] = None
 
-        # Register tools if provided
+        # Register tools if provided, as one change so other agents never see part of them
         if tools:
-            for tool in tools:
-                self.registry.register(tool)
+            self.registry.register_all(tools)
                 
         # Register team delegation tool if team is provided
         if self.team:
             self.register_team_tool()
 
+        # Register the tool search meta-tool so the model can pull in unselected tools
+        if self.tool_selector:
+            self.tool_search_tool = ToolSearchTool(
+                self.tool_selector, self.registry, rank=_rank_tools_for_current_agent
+            )
+            self.registry.register(self.tool_search_tool)
+
+        # Register the tool program meta-tool so dependent tool calls can share one turn
+        if tool_programs:
+            self.tool_program_tool = ToolProgramTool(self.registry, execute=_execute_program_step)
+            self.registry.register(self.tool_program_tool)
+
+    def tool_catalog(self) -> List[Dict[str, Any]]:
+        """Get the definitions of all tools this agent may use"""
+        return self.registry.get_all_tools()
+
     def register_team_tool(self) -> None:
         """Register a tool for team delegation"""
         
@@ -75,16 +175,118 @@ class Agent:
             
         return "\n".join(capabilities)
         
-    def delegate_to_team(self, task: str, agent_idx: int) -> Dict[str, Any]:
+    def route_to_team(self, prompt: str) -> Optional[int]:
+        """
+        Ask the local router for a team member that can take the prompt directly
+
+        Args:
+            prompt: The user prompt
+
+        Returns:
+            Index of the team member, or None if the manager model should decide
+        """
+        if not self.team or not self.router:
+            return None
+
+        agent_idx = self.router.route(prompt, self)
+        if self.verbose and agent_idx is not None:
+            name = getattr(self.team[agent_idx], 'agent_name', f"Agent {agent_idx}")
+            print(f"\n--- Router selected {name} without a manager call ---")
+        return agent_idx
+
+    def recall_memory(self, prompt: str) -> Optional[str]:
+        """
+        Look up earlier answers and tool results relevant to a prompt
+
+        Args:
+            prompt: The user prompt
+
+        Returns:
+            A <memory> block to put in front of the prompt, or None if nothing relevant is remembered
+        """
+        if self.memory is None:
+            return None
+
+        hits = self.memory.search(prompt)
+        if not hits:
+            return None
+
+        now = time.time()
+        notes = []
+        for score, entry in hits:
+            text = entry.text
+            if len(text) > _MAX_RECALLED_CHARS:
+                text = text[:_MAX_RECALLED_CHARS] + "..."
+            notes.append(f"- [{entry.kind}, {_format_age(now - entry.created_at)} ago] {text}")
+
+        if self.verbose:
+            print(f"\n--- Recalled {len(notes)} memory entries ---")
+
+        return (
+            "<memory>\nNotes from earlier requests. Use them instead of calling tools again "
+            "when they already answer the request.\n" + "\n".join(notes) + "\n</memory>"
+        )
+
+    def remember_tool_result(self, tool_name: str, tool_input: Dict[str, Any], content: Any) -> None:
+        """
+        Write a serialized tool result to memory
+
+        Args:
+            tool_name: Name of the tool
+            tool_input: Input the tool was called with
+            content: The tool_result content sent to the model
+        """
+        if self.memory is None or tool_name in _UNREMEMBERED_TOOLS or not isinstance(content, str):
+            return
+        if not content.strip() or content.startswith(("Error", '{"error"')):
+            return
+        call = json.dumps(tool_input, sort_keys=True, default=str)
+        self.memory.add(
+            f"{tool_name}({call}): {content}",
+            kind="tool_result",
+            metadata={"agent": self.agent_name, "tool": tool_name},
+        )
+
+    def remember_answer(self, prompt: str, answer: Optional[str]) -> None:
+        """
+        Write a final answer to memory
+
+        Args:
+            prompt: The user prompt
+            answer: Text of the final response
+        """
+        if self.memory is None or not answer or not answer.strip():
+            return
+        self.memory.add(
+            f"Q: {prompt}\nA: {answer}",
+            kind="answer",
+            metadata={"agent": self.agent_name},
+        )
+
+    def _execute_tool(self, tool_name: str, tool_input: Dict[str, Any]) -> Any:
+        """Execute a tool, turning failures into an error result for the model"""
+        try:
+            return self.registry.execute_tool(tool_name, **tool_input)
+        except (DeadlineExceeded, Cancelled):
+            raise
+        except Exception as e:
+            return {"error": f"Error executing tool {tool_name}: {str(e)}"}
+
+    def delegate_to_team(self, task: str, agent_idx: int, include_raw: bool = False) -> DelegationResult:
         """
         Delegate a task to a specific team member
         
         Args:
             task: The task to delegate
             agent_idx: Index of the team member in the team list
+            include_raw: Whether to attach the team member's full response as `raw`
             
         Returns:
-            The response from the team member
+            A compact result with the team member's answer, status and the usage of its whole run
+
+        Raises:
+            DeadlineExceeded: If the caller's deadline passes during the delegation
+            Cancelled: If the caller's work is cancelled
         """
         if not self.team:
             raise ValueError("No team members available")
@@ -94,33 +296,54 @@ class Agent:
         
         # Get the appropriate team member
         team_member = self.team[agent_idx]
+        name = getattr(team_member, 'agent_name', f"Agent {agent_idx}")
         
         if self.verbose:
-            name = getattr(team_member, 'agent_name', f"Agent {agent_idx}")
             print(f"\n--- Delegating task to {name} ---")
             print(f"Task: {task}")
         
-        # Invoke the team member with the task
-        response = team_member.invoke(task)
+        # Invoke the team member with the task, within whatever time the caller has left
+        with usage_scope() as usage:
+            try:
+                deadline = current_deadline()
+                if deadline is not None:
+                    deadline.check()
+                    response = team_member.invoke(task, deadline=deadline)
+                else:
+                    response = team_member.invoke(task)
+            except (DeadlineExceeded, Cancelled):
+                # The caller ran out of time as well, so there is nobody to report the error to
+                raise
+            except Exception as e:
+                result = DelegationResult(agent_name=name, status="error", error=str(e), usage=usage.summary())
+            else:
+                result = DelegationResult.from_response(
+                    name,
+                    response,
+                    structured=bool(team_member.output_format),
+                    include_raw=include_raw,
+                    usage=usage,
+                )
         
         if self.verbose:
-            print(f"\n--- Response from team member {agent_idx} ---")
-            # Handle response format differences
-            if hasattr(response, 'content'):
-                for block in response.content:
-                    if hasattr(block, 'text'):
-                        print(block.text)
-            else:
-                print(str(response))
+            print(f"\n--- Response from team member {agent_idx} ({result.status}) ---")
+            print(result.error or result.text or result.output)
         
-        return response
+        return result
 
-    def invoke(self, prompt: str) -> Dict[str, Any]:
+    def invoke(
+        self,
+        prompt: str,
+        deadline: Optional[float | Deadline] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Dict[str, Any]:
         """
         Invoke the agent with a prompt, handling the full conversation cycle
 
         Args:
             prompt: The prompt to invoke the agent with
+            deadline: Seconds (or a Deadline) within which the invocation must finish
+            cancel_token: Token aborting the invocation when cancelled
         """
         pass
 
@@ -134,6 +357,14 @@ class Agent:
         pass
 
 
+def _format_age(seconds: float) -> str:
+    """Format an age as a short human-readable duration"""
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)}{unit}"
+    return f"{int(seconds)}s"
+
+
 class TeamDelegationTool(Tool):
     """Tool for delegating tasks to team members"""
     
@@ -169,4 +400,8 @@ class TeamDelegationTool(Tool):
     
     def execute(self, task: str, agent_idx: int) -> Any:
         """Execute the delegation to a team member"""
+        if self.parent_agent.router:
+            # The router classifies user prompts, not the manager's rewritten tasks
+            prompt = current_prompt() if current_agent() is self.parent_agent else None
+            self.parent_agent.router.observe(prompt or task, agent_idx)
         return self.parent_agent.delegate_to_team(task, agent_idx)
\ No newline at end of file
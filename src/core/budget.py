@@ -0,0 +1,216 @@
+import math
+import threading
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional
+
+
+# Smallest thinking budget accepted by the API
+MIN_THINKING_TOKENS = 1024
+
+# Full output budget when neither the controller nor the caller sets one
+DEFAULT_MAX_TOKENS = 4096
+
+
+class Budget:
+    """Token limits for a single model call"""
+
+    __slots__ = ("max_tokens", "thinking_tokens", "tight")
+
+    def __init__(self, max_tokens: int, thinking_tokens: Optional[int] = None, tight: bool = False):
+        self.max_tokens = max_tokens
+        self.thinking_tokens = thinking_tokens
+        self.tight = tight
+
+    def thinking_config(self) -> Optional[Dict[str, Any]]:
+        """Get the thinking parameter for this budget, if thinking is enabled"""
+        if self.thinking_tokens is None:
+            return None
+        return {"type": "enabled", "budget_tokens": self.thinking_tokens}
+
+    def __repr__(self) -> str:
+        return f"Budget(max_tokens={self.max_tokens}, thinking_tokens={self.thinking_tokens}, tight={self.tight})"
+
+
+class BudgetController:
+    """
+    Picks max_tokens and thinking budgets per model call from observed usage
+
+    Calls are grouped by position in the run ("initial" or "after_tool"). When
+    the calls at a position have mostly ended in tool use, the next one gets a
+    tight budget sized from the observed output tokens of tool turns; otherwise
+    the full budget is used so final answers are not truncated. A tight call that
+    stops on max_tokens is retried with the full budget, and its output tokens
+    are kept as a lower bound so later tight budgets grow.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_thinking_tokens: int = MIN_THINKING_TOKENS,
+        min_tokens: int = 256,
+        quantile: float = 0.95,
+        headroom: float = 1.25,
+        tool_turn_probability: float = 0.8,
+        min_samples: int = 5,
+        window: int = 200,
+    ):
+        """
+        Initialize the controller
+
+        Args:
+            max_tokens: Full output budget, used for likely final answers and retries.
+                None uses the max_tokens of the calling agent
+            max_thinking_tokens: Thinking budget on full-budget calls
+            min_tokens: Lower bound for tight budgets
+            quantile: Quantile of observed tool-turn output tokens used for tight budgets
+            headroom: Multiplier applied on top of the quantile
+            tool_turn_probability: Share of tool turns at a position needed for a tight budget
+            min_samples: Observations needed at a position before budgets are tightened
+            window: Number of recent observations kept per position
+        """
+        self.max_tokens = max_tokens
+        self.max_thinking_tokens = max_thinking_tokens
+        self.min_tokens = min_tokens
+        self.quantile = quantile
+        self.headroom = headroom
+        self.tool_turn_probability = tool_turn_probability
+        self.min_samples = min_samples
+        self.window = window
+        self._lock = threading.Lock()
+        self._outcomes: Dict[str, Deque[bool]] = {}
+        self._tool_turn_tokens: Deque[int] = deque(maxlen=window)
+        self.retries = 0
+        self.truncations = 0
+        self.calls: Counter = Counter()
+
+    @staticmethod
+    def position(iteration: int) -> str:
+        """Classify a call by its position in the run"""
+        return "initial" if iteration <= 1 else "after_tool"
+
+    def ceiling(self, limit: Optional[int] = None) -> int:
+        """
+        Get the full output budget
+
+        Args:
+            limit: max_tokens of the calling agent, never exceeded
+
+        Returns:
+            The smaller of the controller's and the caller's limits
+        """
+        if self.max_tokens is None:
+            return limit or DEFAULT_MAX_TOKENS
+        if limit is None:
+            return self.max_tokens
+        return min(self.max_tokens, limit)
+
+    def plan(
+        self, iteration: int, tools_available: bool = True, thinking: bool = False, limit: Optional[int] = None
+    ) -> Budget:
+        """
+        Choose the budget for a call
+
+        Args:
+            iteration: 1-based iteration number within the run
+            tools_available: Whether tools are sent with the call
+            thinking: Whether extended thinking is enabled
+            limit: max_tokens of the calling agent
+
+        Returns:
+            The budget to use
+        """
+        max_tokens = self.ceiling(limit)
+        tight_tokens = self._tight_tokens(self.position(iteration), max_tokens) if tools_available else None
+
+        with self._lock:
+            self.calls["tight" if tight_tokens else "full"] += 1
+
+        if tight_tokens is None:
+            return self.full(thinking, limit)
+
+        if thinking:
+            # The API requires max_tokens to exceed the thinking budget
+            return Budget(
+                min(max(tight_tokens, MIN_THINKING_TOKENS + self.min_tokens), max_tokens),
+                MIN_THINKING_TOKENS,
+                tight=True,
+            )
+        return Budget(tight_tokens, tight=True)
+
+    def full(self, thinking: bool = False, limit: Optional[int] = None) -> Budget:
+        """Get the full budget, capped at the caller's limit"""
+        max_tokens = self.ceiling(limit)
+        thinking_tokens = None
+        if thinking:
+            thinking_tokens = max(MIN_THINKING_TOKENS, min(self.max_thinking_tokens, max_tokens - self.min_tokens))
+        return Budget(max_tokens, thinking_tokens)
+
+    def escalate(self, budget: Budget, thinking: bool = False, limit: Optional[int] = None) -> Optional[Budget]:
+        """
+        Get the budget for retrying a call that stopped on max_tokens
+
+        Returns:
+            The full budget, or None if the call already had it
+        """
+        if budget.max_tokens >= self.ceiling(limit):
+            return None
+        with self._lock:
+            self.retries += 1
+        return self.full(thinking, limit)
+
+    def observe(self, iteration: int, response: Any, budget: Optional[Budget] = None) -> None:
+        """
+        Record the outcome of a call
+
+        Args:
+            iteration: 1-based iteration number within the run
+            response: Response of the call
+            budget: Budget the call was made with. A tight call truncated on
+                max_tokens is retried, so only its output tokens are recorded
+        """
+        stop_reason = getattr(response, "stop_reason", None)
+        tool_turn = stop_reason == "tool_use"
+        usage = getattr(response, "usage", None)
+        output_tokens = getattr(usage, "output_tokens", None)
+
+        if budget is not None and budget.tight and stop_reason == "max_tokens":
+            with self._lock:
+                self.truncations += 1
+                # The turn needed at least this many tokens
+                self._tool_turn_tokens.append(output_tokens or budget.max_tokens)
+            return
+
+        with self._lock:
+            outcomes = self._outcomes.setdefault(self.position(iteration), deque(maxlen=self.window))
+            outcomes.append(tool_turn)
+            if tool_turn and output_tokens:
+                self._tool_turn_tokens.append(output_tokens)
+
+    def _tight_tokens(self, position: str, max_tokens: int) -> Optional[int]:
+        with self._lock:
+            outcomes = self._outcomes.get(position)
+            if not outcomes or len(outcomes) < self.min_samples:
+                return None
+            if sum(outcomes) / len(outcomes) < self.tool_turn_probability:
+                return None
+            if len(self._tool_turn_tokens) < self.min_samples:
+                return None
+            observed = sorted(self._tool_turn_tokens)
+
+        index = min(len(observed) - 1, math.ceil(self.quantile * len(observed)) - 1)
+        tokens = math.ceil(observed[index] * self.headroom)
+        return max(self.min_tokens, min(tokens, max_tokens))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get call counts, retries and the observed tool-turn share per position"""
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "retries": self.retries,
+                "truncations": self.truncations,
+                "tool_turn_share": {
+                    position: sum(outcomes) / len(outcomes)
+                    for position, outcomes in self._outcomes.items()
+                    if outcomes
+                },
+            }
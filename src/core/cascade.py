@@ -0,0 +1,208 @@
+import re
+import threading
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+from src.core.budget import BudgetController
+
+
+# Phrases in a final answer suggesting the model was not sure of it
+_LOW_CONFIDENCE_PATTERN = re.compile(
+    r"\b(i'?m not (sure|certain)|i am not (sure|certain)|i don'?t know|i do not know|i cannot (determine|answer)|"
+    r"i can'?t (determine|answer)|unable to (determine|answer)|it'?s unclear|it is unclear|i'?m unsure)\b",
+    re.IGNORECASE,
+)
+
+# Stop reasons of a small model response that are never accepted
+_ESCALATING_STOP_REASONS = {"max_tokens", "refusal"}
+
+# An escalation criterion returns a reason to escalate, or None to accept the response
+Criterion = Callable[[Any], Optional[str]]
+
+
+class CascadePolicy:
+    """
+    Sends calls to a smaller, faster model first and escalates to the agent's model
+
+    Calls offering tools (tool selection and routing turns such as the
+    manager's delegation choice) or, with scope "all", every call are first
+    sent to the small model. Its response is checked and the call repeated
+    with the primary model when a tool call fails validation against the
+    offered tools, the response was truncated or refused, a final answer
+    hedges, or a custom criterion objects. Once a run has escalated, its
+    remaining calls go to the primary model, and positions whose recent
+    escalation rate is too high skip the small model, except for a periodic
+    probe that lets the rate recover. The small model's tool calls are only
+    run once its response has been accepted.
+    """
+
+    SCOPES = ("tool_turns", "all")
+
+    def __init__(
+        self,
+        small_model: str,
+        scope: str = "tool_turns",
+        escalate_final_answers: bool = False,
+        criteria: Optional[Sequence[Criterion]] = None,
+        detect_low_confidence: bool = True,
+        sticky: bool = True,
+        max_escalation_rate: float = 0.5,
+        min_samples: int = 20,
+        window: int = 200,
+        probe_interval: int = 20,
+    ):
+        """
+        Initialize the policy
+
+        Args:
+            small_model: Model ID of the small model tried first
+            scope: "tool_turns" to try the small model on calls offering tools, "all" for every call
+            escalate_final_answers: Whether final answers of the small model are always rewritten
+                by the primary model, leaving it only tool selection and routing
+            criteria: Extra checks receiving the small model's response and returning a reason to escalate
+            detect_low_confidence: Whether hedging final answers are escalated
+            sticky: Whether a run stays on the primary model after its first escalation
+            max_escalation_rate: Recent escalation rate at a position above which the small model is skipped
+            min_samples: Small model calls at a position needed before it can be skipped
+            window: Number of recent outcomes kept per position
+            probe_interval: While a position skips the small model, every probe_interval-th call
+                still tries it, so a position is not locked out for good
+        """
+        if scope not in self.SCOPES:
+            raise ValueError(f"Unknown cascade scope: {scope}")
+        self.small_model = small_model
+        self.scope = scope
+        self.escalate_final_answers = escalate_final_answers
+        self.criteria = list(criteria or [])
+        self.detect_low_confidence = detect_low_confidence
+        self.sticky = sticky
+        self.max_escalation_rate = max_escalation_rate
+        self.min_samples = min_samples
+        self.window = window
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._outcomes: Dict[str, Deque[bool]] = {}
+        self._skips: Counter = Counter()
+        self.calls: Counter = Counter()
+        self.escalations: Counter = Counter()
+
+    def use_small_model(self, iteration: int, tools_available: bool = True) -> bool:
+        """
+        Decide whether a call is first sent to the small model
+
+        Args:
+            iteration: 1-based iteration number within the run
+            tools_available: Whether tools are sent with the call
+
+        Returns:
+            True to try the small model first
+        """
+        if self.scope == "tool_turns" and not tools_available:
+            return False
+        position = BudgetController.position(iteration)
+        with self._lock:
+            outcomes = self._outcomes.get(position)
+            if outcomes and len(outcomes) >= self.min_samples:
+                if sum(outcomes) / len(outcomes) > self.max_escalation_rate:
+                    self._skips[position] += 1
+                    if self._skips[position] % self.probe_interval:
+                        self.calls["skipped"] += 1
+                        return False
+                    self.calls["probes"] += 1
+        return True
+
+    def prepare(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a request for the primary model into one for the small model"""
+        # Extended thinking is left to the primary model
+        return {**request, "model": self.small_model, "thinking": {"type": "disabled"}}
+
+    def check(self, response: Any, tools: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
+        """
+        Check a small model response
+
+        Args:
+            response: The small model's message
+            tools: Tool definitions offered with the call
+
+        Returns:
+            The reason to escalate, or None to accept the response
+        """
+        stop_reason = getattr(response, "stop_reason", None)
+        if stop_reason in _ESCALATING_STOP_REASONS:
+            return stop_reason
+
+        content = getattr(response, "content", None) or []
+        if stop_reason == "tool_use":
+            reason = self._validate_tool_calls(content, tools or [])
+            if reason:
+                return reason
+        else:
+            text = "".join(getattr(block, "text", "") for block in content if block.type == "text")
+            if self.escalate_final_answers:
+                return "final_answer"
+            if not text.strip():
+                return "empty_answer"
+            if self.detect_low_confidence and _LOW_CONFIDENCE_PATTERN.search(text):
+                return "low_confidence"
+
+        for criterion in self.criteria:
+            reason = criterion(response)
+            if reason:
+                return reason
+        return None
+
+    @staticmethod
+    def _validate_tool_calls(content: List[Any], tools: List[Dict[str, Any]]) -> Optional[str]:
+        """Check tool calls against the names and required inputs of the offered tools"""
+        schemas = {tool["name"]: tool.get("input_schema") for tool in tools if "name" in tool}
+        for block in content:
+            if block.type != "tool_use":
+                continue
+            if block.name not in schemas:
+                return "unknown_tool"
+            if not isinstance(block.input, dict):
+                return "invalid_tool_input"
+            schema = schemas[block.name] or {}
+            properties = schema.get("properties")
+            missing = [name for name in schema.get("required", []) if name not in block.input]
+            unexpected = (
+                [name for name in block.input if name not in properties]
+                if properties is not None and schema.get("additionalProperties") is False
+                else []
+            )
+            if missing or unexpected:
+                return "invalid_tool_input"
+        return None
+
+    def observe(self, iteration: int, escalation: Optional[str]) -> None:
+        """
+        Record the outcome of a small model call
+
+        Args:
+            iteration: 1-based iteration number within the run
+            escalation: Reason the call was escalated, or None if its response was accepted
+        """
+        with self._lock:
+            outcomes = self._outcomes.setdefault(BudgetController.position(iteration), deque(maxlen=self.window))
+            outcomes.append(escalation is not None)
+            self.calls["small"] += 1
+            if escalation is not None:
+                self.escalations[escalation] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get small model calls, skips, probes, escalations by reason and escalation rates"""
+        with self._lock:
+            small = self.calls["small"]
+            escalated = sum(self.escalations.values())
+            return {
+                "small_calls": small,
+                "skipped": self.calls["skipped"],
+                "probes": self.calls["probes"],
+                "escalations": dict(self.escalations),
+                "escalation_rate": escalated / small if small else 0.0,
+                "escalation_rate_by_position": {
+                    position: sum(outcomes) / len(outcomes)
+                    for position, outcomes in self._outcomes.items()
+                    if outcomes
+                },
+            }
@@ -0,0 +1,167 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Fields the messages API accepts back for each response content block type
+_BLOCK_FIELDS = {
+    "text": ("text",),
+    "tool_use": ("id", "name", "input"),
+    "thinking": ("thinking", "signature"),
+    "redacted_thinking": ("data",),
+}
+
+
+class Block:
+    """A single content block, stored in request (param) form"""
+
+    __slots__ = ("type", "data")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.type = data["type"]
+        self.data = data
+
+    @classmethod
+    def from_response(cls, block: Any) -> "Block":
+        """Convert an SDK response content block into its request form"""
+        if isinstance(block, dict):
+            return cls(block)
+        block_type = block.type
+        fields = _BLOCK_FIELDS.get(block_type)
+        if fields is None:
+            return cls(block.model_dump(exclude_none=True))
+        data = {"type": block_type}
+        for field in fields:
+            data[field] = getattr(block, field)
+        return cls(data)
+
+    def __repr__(self) -> str:
+        return f"Block({self.data!r})"
+
+
+class Turn:
+    """An immutable conversation turn whose serialized form is built once"""
+
+    __slots__ = ("role", "content", "_serialized")
+
+    def __init__(self, role: str, content: str | Tuple[Block, ...]):
+        self.role = role
+        self.content = content
+        self._serialized: Optional[Dict[str, Any]] = None
+
+    def serialize(self) -> Dict[str, Any]:
+        """Get the message dict for the API, building it on first use"""
+        if self._serialized is None:
+            content = self.content
+            if not isinstance(content, str):
+                content = [block.data for block in content]
+            self._serialized = {"role": self.role, "content": content}
+        return self._serialized
+
+    def blocks(self, block_type: str) -> List[Block]:
+        """Get the blocks of a given type"""
+        if isinstance(self.content, str):
+            return []
+        return [block for block in self.content if block.type == block_type]
+
+    def __repr__(self) -> str:
+        return f"Turn(role={self.role!r}, content={self.content!r})"
+
+
+class Conversation:
+    """
+    Message history of one agent run
+
+    Turns are appended only, so the message list sent to the API is extended in
+    place and every turn is converted from SDK objects exactly once.
+    """
+
+    __slots__ = ("prefix", "turns", "_messages")
+
+    def __init__(self, prefix: Sequence[Turn] = ()):
+        """
+        Initialize the conversation
+
+        Args:
+            prefix: Leading turns (system prompt, instructions, ...), typically shared
+                between conversations through `intern_prefix`
+        """
+        self.prefix = tuple(prefix)
+        self.turns: List[Turn] = list(self.prefix)
+        self._messages: List[Dict[str, Any]] = [turn.serialize() for turn in self.turns]
+
+    def append(self, turn: Turn) -> Turn:
+        """Append a turn and its serialized form"""
+        self.turns.append(turn)
+        self._messages.append(turn.serialize())
+        return turn
+
+    def add_user(self, content: str | Iterable[Dict[str, Any]]) -> Turn:
+        """Append a user turn from text or request-form content blocks"""
+        if not isinstance(content, str):
+            content = tuple(Block(block) for block in content)
+        return self.append(Turn("user", content))
+
+    def add_assistant(self, content: Iterable[Any]) -> Turn:
+        """Append an assistant turn from SDK response content blocks"""
+        return self.append(
+            Turn("assistant", tuple(Block.from_response(block) for block in content))
+        )
+
+    def last(self, role: Optional[str] = None) -> Optional[Turn]:
+        """Get the latest turn, optionally of a given role"""
+        for turn in reversed(self.turns):
+            if role is None or turn.role == role:
+                return turn
+        return None
+
+    def to_messages(self) -> List[Dict[str, Any]]:
+        """Get the message list for the API (shared, do not mutate)"""
+        return self._messages
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+
+_INTERN_MAX_SIZE = 1024
+_interned: "OrderedDict[str, Any]" = OrderedDict()
+_intern_lock = threading.Lock()
+
+
+def intern_payload(key: str, build) -> Any:
+    """
+    Share one instance of a payload between conversations
+
+    Args:
+        key: Canonical identity of the payload
+        build: Callable producing the payload on a miss
+
+    Returns:
+        The shared payload
+    """
+    with _intern_lock:
+        value = _interned.get(key)
+        if value is not None:
+            _interned.move_to_end(key)
+            return value
+
+    value = build()
+    with _intern_lock:
+        value = _interned.setdefault(key, value)
+        _interned.move_to_end(key)
+        while len(_interned) > _INTERN_MAX_SIZE:
+            _interned.popitem(last=False)
+    return value
+
+
+def intern_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Share identical tool definition lists between conversations"""
+    key = "tools:" + json.dumps(tools, sort_keys=True, default=str)
+    return intern_payload(key, lambda: tools)
+
+
+def intern_prefix(texts: Sequence[str]) -> Tuple[Turn, ...]:
+    """Share identical prefix turns (with their cached serialized form) between conversations"""
+    key = "prefix:" + json.dumps(list(texts))
+    return intern_payload(key, lambda: tuple(Turn("user", text) for text in texts))
@@ -0,0 +1,340 @@
+import contextvars
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work does not finish before its deadline"""
+
+
+class Cancelled(Exception):
+    """Raised when work is aborted through its cancellation token"""
+
+
+class CancellationToken:
+    """
+    Thread-safe flag used to abort in-flight work
+
+    Callbacks registered with `add_callback` run once when the token is
+    cancelled, e.g. to close a response stream or kill a subprocess.
+    """
+
+    def __init__(self, parent: Optional["CancellationToken"] = None):
+        """
+        Initialize the token
+
+        Args:
+            parent: Token whose cancellation also cancels this one
+        """
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._ids = itertools.count()
+        self.reason: Optional[str] = None
+        if parent is not None:
+            parent.add_callback(lambda: self.cancel(parent.reason))
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: Optional[str] = None) -> None:
+        """Cancel the token and run its callbacks"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason or "cancelled"
+            self._event.set()
+            callbacks, self._callbacks = list(self._callbacks.values()), {}
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run a callback when the token is cancelled (immediately if it already is)
+
+        Returns:
+            A function removing the callback again
+        """
+        with self._lock:
+            if not self._event.is_set():
+                key = next(self._ids)
+                self._callbacks[key] = callback
+                return lambda: self._callbacks.pop(key, None)
+        callback()
+        return lambda: None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the token is cancelled or the timeout elapses"""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+
+class Deadline:
+    """
+    Point in time by which a piece of work must finish, plus its cancellation token
+
+    A deadline without a time limit only carries the token. Deadlines nest:
+    a child never outlives its parent and is cancelled with it.
+    """
+
+    __slots__ = ("expires_at", "token", "_unlink")
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        token: Optional[CancellationToken] = None,
+        expires_at: Optional[float] = None,
+    ):
+        """
+        Initialize the deadline
+
+        Args:
+            timeout: Seconds from now until the deadline (None for no time limit)
+            token: Cancellation token (a new one is created when omitted)
+            expires_at: Absolute time.monotonic() deadline, instead of timeout
+        """
+        if timeout is not None:
+            expires_at = time.monotonic() + timeout
+        self.expires_at = expires_at
+        self.token = token or CancellationToken()
+        # Removers of the callbacks linking this deadline's token to others
+        self._unlink: List[Callable[[], None]] = []
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining()!r}, cancelled={self.token.cancelled!r})"
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, never negative (None when there is no time limit)"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self) -> None:
+        """
+        Raise if the work should stop
+
+        Raises:
+            Cancelled: If the token was cancelled
+            DeadlineExceeded: If the deadline has passed
+        """
+        self.token.raise_if_cancelled()
+        if self.expired:
+            raise DeadlineExceeded("Deadline exceeded")
+
+    def timeout(self, limit: Optional[float] = None) -> Optional[float]:
+        """
+        Timeout for a single blocking operation
+
+        Args:
+            limit: The operation's own timeout, if any
+
+        Returns:
+            The smaller of the limit and the remaining time (None if both are unbounded)
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return limit
+        return remaining if limit is None else min(limit, remaining)
+
+    def child(
+        self,
+        timeout: Optional[float] = None,
+        token: Optional[CancellationToken] = None,
+        expires_at: Optional[float] = None,
+    ) -> "Deadline":
+        """
+        Create a deadline that ends no later than this one and is cancelled with it
+
+        A child with its own token listens to both tokens; call `release` on it
+        once its work is done so long-lived tokens do not collect callbacks.
+        """
+        if timeout is not None:
+            expires_at = time.monotonic() + timeout
+        if self.expires_at is not None:
+            expires_at = self.expires_at if expires_at is None else min(expires_at, self.expires_at)
+        if token is None or token is self.token:
+            return Deadline(token=self.token, expires_at=expires_at)
+
+        linked = CancellationToken()
+        child = Deadline(token=linked, expires_at=expires_at)
+        for source in (self.token, token):
+            child._unlink.append(source.add_callback(lambda source=source: linked.cancel(source.reason)))
+        return child
+
+    def release(self) -> None:
+        """Stop listening to the tokens this deadline was linked to by `child`"""
+        unlink, self._unlink = self._unlink, []
+        for remove in unlink:
+            remove()
+
+    def on_abort(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run a callback when the token is cancelled or the deadline passes
+
+        Returns:
+            A function removing the callback again; call it once the work is done
+        """
+        remove = self.token.add_callback(callback)
+        timer = None
+        remaining = self.remaining()
+        if remaining is not None:
+            timer = threading.Timer(remaining, callback)
+            timer.daemon = True
+            timer.start()
+
+        def cancel() -> None:
+            remove()
+            if timer is not None:
+                timer.cancel()
+
+        return cancel
+
+    def wait(self, future: Future, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a future without outliving the deadline
+
+        Args:
+            future: The future to wait for
+            timeout: Additional limit in seconds
+
+        Returns:
+            Whether the future is done; when it is not, call `check()` to tell
+            an expired or cancelled deadline from the timeout elapsing
+        """
+        woken = threading.Event()
+        future.add_done_callback(lambda _: woken.set())
+        remove = self.token.add_callback(woken.set)
+        try:
+            remaining = self.remaining()
+            if remaining is not None:
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            woken.wait(timeout)
+        finally:
+            remove()
+        return future.done()
+
+    def result(self, future: Future):
+        """
+        Get the result of a future, aborting the wait when the deadline ends
+
+        Raises:
+            Cancelled: If the token is cancelled first
+            DeadlineExceeded: If the deadline passes first
+        """
+        if not self.wait(future):
+            self.check()
+            raise DeadlineExceeded("Deadline exceeded")
+        return future.result()
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Get the deadline of the work running in the current context"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Make a deadline current for the enclosed code (and contexts copied from it)"""
+    reset = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(reset)
+
+
+def resolve_deadline(
+    deadline: Optional[float | Deadline] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Optional[Deadline]:
+    """
+    Combine an explicit deadline and token with the deadline of the current context
+
+    Args:
+        deadline: Seconds from now, or a Deadline
+        cancel_token: Token that aborts the work when cancelled
+
+    Returns:
+        The effective deadline, or None if the work is unbounded
+    """
+    given = deadline
+    if isinstance(deadline, Deadline):
+        if cancel_token is not None:
+            deadline = deadline.child(token=cancel_token)
+    elif deadline is not None or cancel_token is not None:
+        deadline = Deadline(timeout=deadline, token=cancel_token)
+
+    parent = current_deadline()
+    if deadline is None or deadline is parent:
+        return parent
+    if parent is None:
+        return deadline
+    combined = parent.child(token=deadline.token, expires_at=deadline.expires_at)
+    if deadline is not given:
+        # The intermediate deadline only lives on through the combined one
+        combined._unlink.extend(deadline._unlink)
+    return combined
+
+
+@contextmanager
+def resolved_deadline(
+    deadline: Optional[float | Deadline] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Iterator[Optional[Deadline]]:
+    """
+    Resolve a deadline for the enclosed work and release what resolving created afterwards
+
+    Args:
+        deadline: Seconds from now, or a Deadline
+        cancel_token: Token that aborts the work when cancelled
+
+    Yields:
+        The effective deadline, as returned by resolve_deadline
+    """
+    parent = current_deadline()
+    resolved = resolve_deadline(deadline, cancel_token)
+    try:
+        yield resolved
+    finally:
+        if resolved is not None and resolved is not parent and resolved is not deadline:
+            resolved.release()
+
+
+def remaining_timeout(limit: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout for a blocking call made by a tool or client
+
+    Args:
+        limit: The call's own timeout, if any
+
+    Returns:
+        The smaller of the limit and the current deadline's remaining time
+
+    Raises:
+        Cancelled: If the current work was cancelled
+        DeadlineExceeded: If the current deadline has passed
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return limit
+    return deadline.timeout(limit)
@@ -0,0 +1,148 @@
+import contextvars
+import json
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+DelegationStatus = Literal["completed", "truncated", "incomplete", "error"]
+
+# Maps the stop reason of a team member's final response to a delegation status
+_STATUS_BY_STOP_REASON = {
+    "end_turn": "completed",
+    "stop_sequence": "completed",
+    "max_tokens": "truncated",
+    "tool_use": "incomplete",
+}
+
+_JSON_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+
+
+class UsageSummary(BaseModel):
+    """Token usage summed over all model calls of a team member's run"""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class UsageMeter:
+    """Sums the usage of the model calls made within a usage_scope, from any thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def add(self, usage: Any) -> None:
+        """Add the usage of one model response"""
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+            self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+
+    def summary(self) -> UsageSummary:
+        """Get the usage counted so far"""
+        with self._lock:
+            return UsageSummary(input_tokens=self.input_tokens, output_tokens=self.output_tokens)
+
+
+# Meters of the usage scopes enclosing the current context, innermost last
+_usage_meters: contextvars.ContextVar[Tuple[UsageMeter, ...]] = contextvars.ContextVar(
+    "usage_meters", default=()
+)
+
+
+@contextmanager
+def usage_scope() -> Iterator[UsageMeter]:
+    """
+    Count the usage of every model call made by the enclosed code
+
+    Calls made in contexts copied from it, such as tool threads and nested
+    delegations, are counted as well, and by every enclosing scope.
+    """
+    meter = UsageMeter()
+    reset = _usage_meters.set(_usage_meters.get() + (meter,))
+    try:
+        yield meter
+    finally:
+        _usage_meters.reset(reset)
+
+
+def record_usage(usage: Any) -> None:
+    """Count the usage of a model response in the usage scopes of the current context"""
+    for meter in _usage_meters.get():
+        meter.add(usage)
+
+
+class DelegationResult(BaseModel):
+    """Compact result of a task delegated to a team member"""
+
+    agent_name: str
+    status: DelegationStatus
+    text: Optional[str] = None
+    output: Optional[Any] = None
+    usage: UsageSummary = Field(default_factory=UsageSummary)
+    error: Optional[str] = None
+    # The full SDK response, kept out of serialized results sent to the manager
+    raw: Optional[Any] = Field(default=None, exclude=True)
+
+    @classmethod
+    def from_response(
+        cls,
+        agent_name: str,
+        response: Any,
+        structured: bool = False,
+        include_raw: bool = False,
+        usage: Optional[UsageMeter] = None,
+    ) -> "DelegationResult":
+        """
+        Build a delegation result from a team member's response
+
+        Args:
+            agent_name: Name of the team member
+            response: The response returned by the team member's invoke
+            structured: Whether the team member has an output format to parse
+            include_raw: Whether to keep the full response on the result
+            usage: Meter of the usage scope the team member ran in; the usage of
+                the response alone is reported when it counted no model calls
+
+        Returns:
+            The compact delegation result
+        """
+        content = getattr(response, "content", None)
+        if content is None:
+            text = str(response)
+        else:
+            text = "\n".join(
+                block.text for block in content if getattr(block, "type", None) == "text"
+            )
+
+        if usage is None or not usage.calls:
+            usage = UsageMeter()
+            usage.add(getattr(response, "usage", None))
+        status = _STATUS_BY_STOP_REASON.get(getattr(response, "stop_reason", None), "completed")
+
+        return cls(
+            agent_name=agent_name,
+            status=status,
+            text=None if structured else text,
+            output=_parse_structured(text) if structured else None,
+            usage=usage.summary(),
+            raw=response if include_raw else None,
+        )
+
+
+def _parse_structured(text: str) -> Any:
+    """Parse a JSON answer, optionally wrapped in a code fence, falling back to the text"""
+    candidate = text.strip()
+    match = _JSON_FENCE.match(candidate)
+    if match:
+        candidate = match.group(1)
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        return text
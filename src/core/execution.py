@@ -0,0 +1,374 @@
+import contextvars
+import multiprocessing
+import pickle
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Literal, Optional, Set
+
+from src.core.deadline import Deadline, current_deadline
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+ExecutionMode = Literal["inline", "thread", "process"]
+
+
+class ToolTimeoutError(TimeoutError):
+    """Raised when a tool does not finish within its execution timeout"""
+
+
+class ToolExecutionInterrupted(RuntimeError):
+    """Raised when a process worker exits or is killed while running a tool"""
+
+
+class ExecutionPolicy:
+    """Describes where and under which limits a tool is executed"""
+
+    __slots__ = ("mode", "timeout", "memory_limit_mb")
+
+    def __init__(
+        self,
+        mode: ExecutionMode = "inline",
+        timeout: Optional[float] = None,
+        memory_limit_mb: Optional[int] = None,
+    ):
+        """
+        Initialize the execution policy
+
+        Args:
+            mode: "inline" runs in the calling thread, "thread" in a shared thread pool,
+                "process" in a worker process (use it for CPU-bound or untrusted tools)
+            timeout: Maximum number of seconds to wait for the tool. A process worker
+                that times out is killed; a thread cannot be stopped, so a timed out
+                thread keeps running in the pool until the tool returns
+            memory_limit_mb: Address space limit for process workers, in megabytes
+        """
+        if mode not in ("inline", "thread", "process"):
+            raise ValueError(f"Invalid execution mode: {mode}")
+        if memory_limit_mb is not None and mode != "process":
+            raise ValueError("memory_limit_mb is only supported for process execution")
+
+        self.mode = mode
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+
+    def __repr__(self) -> str:
+        return (
+            f"ExecutionPolicy(mode={self.mode!r}, timeout={self.timeout!r}, "
+            f"memory_limit_mb={self.memory_limit_mb!r})"
+        )
+
+
+INLINE = ExecutionPolicy()
+
+
+def _limit_memory(memory_limit_mb: Optional[int]) -> None:
+    """Apply the address space limit in a worker process"""
+    if memory_limit_mb is None or resource is None:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _settle(future: Future, ok: bool, value: Any) -> None:
+    """Complete a future unless it was already failed by a pool teardown"""
+    if future.done():
+        return
+    try:
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+    except InvalidStateError:
+        pass
+
+
+def _run_pickled(payload: bytes) -> bytes:
+    """Run a pickled call and pickle its outcome"""
+    func, kwargs = pickle.loads(payload)
+    try:
+        result = (True, func(**kwargs))
+    except BaseException as e:
+        result = (False, e)
+    try:
+        return pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        return pickle.dumps(
+            (False, TypeError(f"Tool result is not picklable: {e}")),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+
+def _worker_main(connection, parent_connection, memory_limit_mb: Optional[int]) -> None:
+    """Worker process entry point: run calls received over the pipe until it closes"""
+    # A forked worker inherits the executor's end; closing it lets the pipe close when the executor exits
+    parent_connection.close()
+    _limit_memory(memory_limit_mb)
+    while True:
+        try:
+            payload = connection.recv_bytes()
+        except (EOFError, OSError):
+            return
+        connection.send_bytes(_run_pickled(payload))
+
+
+class _Worker:
+    """A worker process running one call at a time over its own pipe"""
+
+    __slots__ = ("process", "connection")
+
+    def __init__(self, memory_limit_mb: Optional[int]):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(child, self.connection, memory_limit_mb), name="tool-worker", daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def submit(self, payload: bytes) -> Future:
+        """Send a call to the worker; the future gets the pickled outcome"""
+        future: Future = Future()
+        self.connection.send_bytes(payload)
+
+        def receive():
+            try:
+                _settle(future, True, self.connection.recv_bytes())
+            except (EOFError, OSError):
+                # The process died, e.g. killed by the kernel or stopped by kill()
+                _settle(future, False, ToolExecutionInterrupted("Tool worker exited while running the tool"))
+
+        threading.Thread(target=receive, name="tool-worker-result", daemon=True).start()
+        return future
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class _WorkerPool:
+    """
+    Worker processes sharing one memory limit
+
+    Each worker runs one call at a time, so a call that times out is stopped
+    by killing only its own worker; calls running in the other workers are
+    not affected. Idle workers are reused.
+    """
+
+    def __init__(self, max_workers: int, memory_limit_mb: Optional[int]):
+        self.memory_limit_mb = memory_limit_mb
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self._idle: List[_Worker] = []
+        self._busy: Set[_Worker] = set()
+        self._closed = False
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[_Worker]:
+        """Take an idle worker, starting one if needed; None if none frees up in time"""
+        if not self._slots.acquire(timeout=timeout):
+            return None
+        with self._lock:
+            if self._closed:
+                self._slots.release()
+                raise ToolExecutionInterrupted("Tool worker was stopped because the executor shut down")
+            worker = self._idle.pop() if self._idle else None
+        if worker is None:
+            try:
+                worker = _Worker(self.memory_limit_mb)
+            except BaseException:
+                self._slots.release()
+                raise
+        with self._lock:
+            self._busy.add(worker)
+        return worker
+
+    def release(self, worker: _Worker) -> None:
+        """Return a worker that finished its call"""
+        with self._lock:
+            self._busy.discard(worker)
+            if not self._closed and worker.process.is_alive():
+                self._idle.append(worker)
+        self._slots.release()
+
+    def discard(self, worker: _Worker) -> None:
+        """Kill a worker whose call was abandoned"""
+        with self._lock:
+            self._busy.discard(worker)
+        worker.kill()
+        self._slots.release()
+
+    def close(self) -> None:
+        """Kill all workers; calls still running fail with ToolExecutionInterrupted"""
+        with self._lock:
+            self._closed = True
+            workers, self._idle = self._idle + list(self._busy), []
+            self._busy = set()
+        for worker in workers:
+            worker.kill()
+
+
+class ToolExecutor:
+    """Runs tool calls according to their execution policy"""
+
+    def __init__(self, max_threads: Optional[int] = None, max_processes: Optional[int] = None):
+        """
+        Initialize the executor
+
+        Args:
+            max_threads: Size of the shared thread pool (defaults to the executor default)
+            max_processes: Number of worker processes per memory limit (defaults to the CPU count)
+        """
+        self.max_threads = max_threads
+        self.max_processes = max_processes or multiprocessing.cpu_count()
+        self._lock = threading.Lock()
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        # One set of workers per memory limit, since the limit is applied on worker start
+        self._process_pools: Dict[Optional[int], _WorkerPool] = {}
+
+    def execute(self, func: Callable[..., Any], policy: Optional[ExecutionPolicy] = None, **kwargs) -> Any:
+        """
+        Execute a callable under the given policy
+
+        Args:
+            func: The callable to run (must be picklable for process execution)
+            policy: Execution policy, inline when omitted
+            **kwargs: Arguments passed to the callable
+
+        Returns:
+            The callable's return value
+
+        Raises:
+            ToolTimeoutError: If the call exceeds the policy timeout
+            DeadlineExceeded: If the current deadline passes first
+            Cancelled: If the current work is cancelled first
+        """
+        policy = policy or INLINE
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check()
+
+        if policy.mode == "thread":
+            # The tool sees the caller's deadline through the copied context
+            future = self._get_thread_pool().submit(contextvars.copy_context().run, func, **kwargs)
+            try:
+                return self._wait(future, policy, deadline)
+            except BaseException:
+                future.cancel()
+                raise
+
+        if policy.mode == "process":
+            return self._execute_in_process(func, policy, kwargs, deadline)
+
+        return func(**kwargs)
+
+    def _wait(
+        self,
+        future: Future,
+        policy: ExecutionPolicy,
+        deadline: Optional[Deadline],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Wait for a tool's future within its timeout and the current deadline
+
+        Args:
+            future: Future of the running call
+            policy: Execution policy of the tool
+            deadline: Deadline of the current work
+            timeout: Part of the policy timeout left, when some of it was spent waiting for a worker
+        """
+        if timeout is None:
+            timeout = policy.timeout
+        if deadline is None:
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                raise ToolTimeoutError(f"Tool execution exceeded {policy.timeout}s")
+
+        if not deadline.wait(future, timeout):
+            deadline.check()
+            raise ToolTimeoutError(f"Tool execution exceeded {policy.timeout}s")
+        return future.result()
+
+    def _execute_in_process(
+        self,
+        func: Callable[..., Any],
+        policy: ExecutionPolicy,
+        kwargs: Dict[str, Any],
+        deadline: Optional[Deadline] = None,
+    ) -> Any:
+        """Run a callable in a worker process and unpack its outcome"""
+        payload = pickle.dumps((func, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+        pool = self._get_process_pool(policy.memory_limit_mb)
+
+        # Waiting for a free worker counts toward the timeout, as queueing in a pool would
+        started = time.monotonic()
+        wait_timeout = policy.timeout
+        if deadline is not None:
+            wait_timeout = deadline.timeout(wait_timeout)
+        worker = pool.acquire(wait_timeout)
+        if worker is None:
+            if deadline is not None:
+                deadline.check()
+            raise ToolTimeoutError(f"Tool execution exceeded {policy.timeout}s")
+
+        remaining = None if policy.timeout is None else max(0.0, policy.timeout - (time.monotonic() - started))
+        try:
+            future = worker.submit(payload)
+            raw = self._wait(future, policy, deadline, remaining)
+        except BaseException:
+            # A running call cannot be interrupted, so only its own worker is killed
+            pool.discard(worker)
+            raise
+        pool.release(worker)
+
+        ok, value = pickle.loads(raw)
+        if not ok:
+            if isinstance(value, MemoryError):
+                raise MemoryError(f"Tool exceeded memory limit of {policy.memory_limit_mb} MB")
+            raise value
+        return value
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.max_threads, thread_name_prefix="tool"
+                )
+            return self._thread_pool
+
+    def _get_process_pool(self, memory_limit_mb: Optional[int]) -> _WorkerPool:
+        with self._lock:
+            pool = self._process_pools.get(memory_limit_mb)
+            if pool is None:
+                pool = self._process_pools[memory_limit_mb] = _WorkerPool(self.max_processes, memory_limit_mb)
+            return pool
+
+    def shutdown(self) -> None:
+        """Stop all worker threads and processes"""
+        with self._lock:
+            thread_pool, self._thread_pool = self._thread_pool, None
+            process_pools, self._process_pools = self._process_pools, {}
+
+        if thread_pool is not None:
+            thread_pool.shutdown(wait=False, cancel_futures=True)
+        for pool in process_pools.values():
+            pool.close()
+
+
+_default_executor: Optional[ToolExecutor] = None
+_default_executor_lock = threading.Lock()
+
+
+def get_default_executor() -> ToolExecutor:
+    """Get the process-wide tool executor"""
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = ToolExecutor()
+        return _default_executor
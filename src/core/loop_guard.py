@@ -0,0 +1,131 @@
+import hashlib
+import json
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+
+_MISSING = object()
+
+
+def tool_call_fingerprint(tool_name: str, tool_input: Dict[str, Any]) -> str:
+    """Canonical identity of a tool call"""
+    return f"{tool_name}:{json.dumps(tool_input, sort_keys=True, default=str)}"
+
+
+def _result_fingerprint(tool_name: str, tool_result: Any) -> str:
+    try:
+        encoded = json.dumps(tool_result, sort_keys=True, default=str)
+    except (TypeError, ValueError):
+        encoded = repr(tool_result)
+    return f"{tool_name}:{hashlib.sha1(encoded.encode()).hexdigest()}"
+
+
+class ToolCallGuard:
+    """
+    Detects degenerate tool-use loops within a single agent run
+
+    An exact repeat of an earlier call to an idempotent tool is answered from
+    the earlier result instead of being executed again. Calls to other tools
+    (clicks, shell commands, screenshots) always run, since their result can
+    change between calls; their repeats only count toward stopping when they
+    follow each other directly. Once a call has been repeated more than
+    `max_repeats` times the run should stop. Optionally a tool that keeps
+    returning the same result for different inputs stops the run as well;
+    this is off by default, since many tools legitimately give the same
+    answer to different calls (bash printing nothing after mkdir).
+    """
+
+    def __init__(self, max_repeats: int = 2, max_result_repeats: Optional[int] = None):
+        """
+        Initialize the guard
+
+        Args:
+            max_repeats: Repeats of the same call tolerated before stopping
+            max_result_repeats: Repeats of the same result for different inputs of a tool
+                tolerated before stopping (None disables the check)
+        """
+        self.max_repeats = max_repeats
+        self.max_result_repeats = max_result_repeats
+        self._lock = threading.Lock()
+        self._results: Dict[str, Any] = {}
+        self._call_repeats: Counter = Counter()
+        self._result_counts: Counter = Counter()
+        self._last_call: Optional[str] = None
+        self._streak = 0
+        self.stop_reason: Optional[str] = None
+
+    def seen(self, tool_name: str, tool_input: Dict[str, Any]) -> bool:
+        """Check whether the exact call already has a result in this run"""
+        with self._lock:
+            return tool_call_fingerprint(tool_name, tool_input) in self._results
+
+    def lookup(self, tool_name: str, tool_input: Dict[str, Any], reuse: bool = False) -> Tuple[bool, Any]:
+        """
+        Count a call and answer it from the earlier result where allowed
+
+        Every call of the run passes through here in order, whether it is
+        answered from memory or executed.
+
+        Args:
+            tool_name: Name of the called tool
+            tool_input: Input of the call
+            reuse: Whether the tool is idempotent, so a repeat may get the earlier result
+
+        Returns:
+            (True, earlier result) for a reusable repeat, (False, None) when the call must run
+        """
+        fingerprint = tool_call_fingerprint(tool_name, tool_input)
+        with self._lock:
+            self._streak = self._streak + 1 if fingerprint == self._last_call else 0
+            self._last_call = fingerprint
+            previous = self._results.get(fingerprint, _MISSING)
+            if previous is _MISSING:
+                return False, None
+            if reuse:
+                self._call_repeats[fingerprint] += 1
+                repeats = self._call_repeats[fingerprint]
+            else:
+                repeats = self._streak
+            if repeats > self.max_repeats and self.stop_reason is None:
+                self.stop_reason = (
+                    f"Stopped after {repeats} repeats of the same {tool_name} call "
+                    f"with input {json.dumps(tool_input, sort_keys=True, default=str)}"
+                )
+        if not reuse:
+            return False, None
+        return True, previous
+
+    @staticmethod
+    def repeat_hint(tool_name: str) -> str:
+        """Note sent along with a result answered from an earlier call"""
+        return (
+            f"You already called {tool_name} with exactly this input and the result is unchanged. "
+            "Use the result above or try a different approach instead of repeating the call."
+        )
+
+    def record(self, tool_name: str, tool_input: Dict[str, Any], tool_result: Any) -> None:
+        """Remember the result of an executed call"""
+        fingerprint = tool_call_fingerprint(tool_name, tool_input)
+        with self._lock:
+            if fingerprint in self._results:
+                # Repeats of the same call are counted by lookup
+                self._results[fingerprint] = tool_result
+                return
+            self._results[fingerprint] = tool_result
+        if self.max_result_repeats is None:
+            return
+
+        result_fingerprint = _result_fingerprint(tool_name, tool_result)
+        with self._lock:
+            self._result_counts[result_fingerprint] += 1
+            repeats = self._result_counts[result_fingerprint] - 1
+            if repeats > self.max_result_repeats and self.stop_reason is None:
+                self.stop_reason = (
+                    f"Stopped after {tool_name} returned the same result {repeats + 1} times"
+                )
+
+    @property
+    def exceeded(self) -> bool:
+        """Whether the run should stop"""
+        return self.stop_reason is not None
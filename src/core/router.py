@@ -0,0 +1,153 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Union
+
+from src.tools.selection.bm25_selector import tokenize
+
+if TYPE_CHECKING:
+    from src.core.agent import Agent
+
+
+class TeamRouter:
+    """
+    Local router that picks a team member for a prompt without a model call
+
+    Routing is decided by keyword rules first and then by a naive Bayes classifier
+    trained on the team capabilities and on past delegations made by the manager.
+    When neither is confident the router abstains and the manager model decides.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[Dict[Union[int, str], Iterable[str]]] = None,
+        threshold: float = 0.8,
+        min_observations: int = 3,
+        learn: bool = True,
+    ):
+        """
+        Initialize the router
+
+        Args:
+            rules: Keywords or phrases per team member, keyed by member index or agent name,
+                matched case-insensitively as whole words
+            threshold: Minimum classifier probability to route without the manager
+            min_observations: Delegations a member needs before the classifier routes to it
+            learn: Whether delegations chosen by the manager model train the classifier
+        """
+        self.rules = {key: [keyword.lower() for keyword in keywords] for key, keywords in (rules or {}).items()}
+        # Keywords match whole words only, so "rain" does not route "train" prompts
+        self._rule_patterns = {
+            key: re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, keywords)) + r")(?!\w)")
+            for key, keywords in self.rules.items()
+            if keywords
+        }
+        self.threshold = threshold
+        self.min_observations = min_observations
+        self.learn = learn
+        self._lock = threading.Lock()
+        self._term_counts: Dict[int, Counter] = defaultdict(Counter)
+        self._observations: Counter = Counter()
+        self._seeded = False
+
+    def route(self, prompt: str, agent: "Agent") -> Optional[int]:
+        """
+        Pick a team member for the prompt
+
+        Args:
+            prompt: The user prompt
+            agent: The manager agent owning the team
+
+        Returns:
+            The team member index, or None to fall back to the manager model
+        """
+        if not agent.team:
+            return None
+
+        agent_idx = self._match_rules(prompt, agent)
+        if agent_idx is not None:
+            return agent_idx
+
+        return self._classify(prompt, agent)
+
+    def observe(self, prompt: str, agent_idx: int) -> None:
+        """
+        Record a delegation decided by the manager model
+
+        Args:
+            prompt: The user prompt the manager delegated, the same text route() classifies
+            agent_idx: Index of the team member the manager chose
+        """
+        if not self.learn:
+            return
+        with self._lock:
+            self._term_counts[agent_idx].update(tokenize(prompt))
+            self._observations[agent_idx] += 1
+
+    def _resolve_member(self, key: Union[int, str], agent: "Agent") -> Optional[int]:
+        if isinstance(key, int):
+            return key if 0 <= key < len(agent.team) else None
+        for idx, member in enumerate(agent.team):
+            if getattr(member, "agent_name", None) == key:
+                return idx
+        return None
+
+    def _match_rules(self, prompt: str, agent: "Agent") -> Optional[int]:
+        """Return the member whose keywords match, if exactly one member matches"""
+        text = prompt.lower()
+        matches = set()
+        for key, pattern in self._rule_patterns.items():
+            if pattern.search(text):
+                agent_idx = self._resolve_member(key, agent)
+                if agent_idx is not None:
+                    matches.add(agent_idx)
+        return matches.pop() if len(matches) == 1 else None
+
+    def _seed(self, agent: "Agent") -> None:
+        """Use each member's capability description as its first training example"""
+        with self._lock:
+            if self._seeded:
+                return
+            for line in agent.get_team_capabilities().splitlines():
+                idx, _, description = line.partition(":")
+                if idx.strip().isdigit():
+                    agent_idx = int(idx)
+                    self._term_counts[agent_idx].update(tokenize(description))
+                    self._observations[agent_idx] += 1
+            self._seeded = True
+
+    def _classify(self, prompt: str, agent: "Agent") -> Optional[int]:
+        self._seed(agent)
+        terms = tokenize(prompt)
+        if not terms:
+            return None
+
+        with self._lock:
+            members = [idx for idx in range(len(agent.team)) if self._observations[idx]]
+            if not members:
+                return None
+            vocabulary = set()
+            for idx in members:
+                vocabulary.update(self._term_counts[idx])
+            total_observations = sum(self._observations[idx] for idx in members)
+
+            log_scores: List[float] = []
+            for idx in members:
+                counts = self._term_counts[idx]
+                denominator = sum(counts.values()) + len(vocabulary)
+                score = math.log(self._observations[idx] / total_observations)
+                score += sum(math.log((counts[term] + 1) / denominator) for term in terms)
+                log_scores.append(score)
+
+            best = max(range(len(members)), key=log_scores.__getitem__)
+            best_idx = members[best]
+            best_observations = self._observations[best_idx]
+
+        # Softmax over the log scores gives the posterior of the best member
+        top = log_scores[best]
+        probability = 1.0 / sum(math.exp(score - top) for score in log_scores)
+
+        if probability >= self.threshold and best_observations >= self.min_observations:
+            return best_idx
+        return None
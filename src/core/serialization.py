@@ -0,0 +1,183 @@
+import base64
+import dataclasses
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, Type
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+CONTENT_BLOCK_TYPES = frozenset({"text", "image", "document"})
+
+TRUNCATION_MARKER = "... [truncated]"
+
+
+def text_block(text: str) -> Dict[str, Any]:
+    """Build a text content block"""
+    return {"type": "text", "text": text}
+
+
+def image_block(data: bytes, media_type: str = "image/png") -> Dict[str, Any]:
+    """Build a base64 image content block"""
+    return {
+        "type": "image",
+        "source": {"type": "base64", "media_type": media_type, "data": base64.b64encode(data).decode("ascii")},
+    }
+
+
+def document_block(data: bytes, media_type: str = "application/pdf", title: Optional[str] = None) -> Dict[str, Any]:
+    """Build a base64 document content block"""
+    if media_type == "text/plain":
+        source = {"type": "text", "media_type": media_type, "data": data.decode("utf-8")}
+    else:
+        source = {"type": "base64", "media_type": media_type, "data": base64.b64encode(data).decode("ascii")}
+    block = {"type": "document", "source": source}
+    if title:
+        block["title"] = title
+    return block
+
+
+def is_content_blocks(value: Any) -> bool:
+    """Check whether a value is a non-empty list of content block dicts"""
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(block, dict) and block.get("type") in CONTENT_BLOCK_TYPES for block in value)
+    )
+
+
+def _default(value: Any) -> Any:
+    """Fallback conversion for values JSON does not support natively"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        try:
+            return bytes(value).decode("utf-8")
+        except UnicodeDecodeError:
+            return base64.b64encode(bytes(value)).decode("ascii")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "__dict__"):
+        return vars(value)
+    return str(value)
+
+
+class ResultSerializer:
+    """
+    Converts tool results into tool_result content
+
+    Strings and scalars become text, lists of content blocks (text, image,
+    document) pass through natively, and everything else is encoded as JSON,
+    with orjson when it is installed. Results larger than `stream_threshold`
+    are encoded incrementally and cut off at `max_chars` so huge payloads are
+    never fully materialized. Converters for specific types can be registered.
+    """
+
+    def __init__(self, max_chars: Optional[int] = None, stream_threshold: int = 10000):
+        """
+        Initialize the serializer
+
+        Args:
+            max_chars: Maximum length of text results (None for no limit)
+            stream_threshold: Number of items or characters above which a result is encoded incrementally
+        """
+        self.max_chars = max_chars
+        self.stream_threshold = stream_threshold
+        self._converters: Dict[Type, Callable[[Any], Any]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, result_type: Type, converter: Callable[[Any], Any]) -> None:
+        """
+        Register a converter for a result type
+
+        Args:
+            result_type: The type (subclasses included) to convert
+            converter: Callable returning a string, content blocks or a JSON-serializable value
+        """
+        with self._lock:
+            self._converters = {**self._converters, result_type: converter}
+
+    def _converter_for(self, value: Any) -> Optional[Callable[[Any], Any]]:
+        converters = self._converters
+        if not converters:
+            return None
+        for cls in type(value).__mro__:
+            converter = converters.get(cls)
+            if converter is not None:
+                return converter
+        return None
+
+    def serialize(self, result: Any) -> str | List[Dict[str, Any]]:
+        """
+        Convert a tool result into tool_result content
+
+        Args:
+            result: The value returned by the tool
+
+        Returns:
+            A string, or a list of content blocks
+        """
+        converter = self._converter_for(result)
+        if converter is not None:
+            result = converter(result)
+
+        if isinstance(result, str):
+            return self._limit(result)
+        if isinstance(result, (bool, int, float)):
+            return str(result)
+        if is_content_blocks(result):
+            return result
+
+        try:
+            if self.max_chars is not None and self._is_large(result):
+                return self._encode_streaming(result)
+            return self._limit(self.dumps(result))
+        except Exception as e:
+            return f"Error serializing result: {str(e)}"
+
+    def dumps(self, value: Any) -> str:
+        """Encode a value as compact JSON"""
+        if orjson is not None:
+            try:
+                return orjson.dumps(
+                    value,
+                    default=_default,
+                    option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+                ).decode("utf-8")
+            except (TypeError, orjson.JSONEncodeError):
+                # orjson rejects some inputs json accepts (e.g. integers over 64 bits)
+                pass
+        return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+    def _is_large(self, value: Any) -> bool:
+        if hasattr(value, "model_dump") or (hasattr(value, "__dict__") and not isinstance(value, (dict, list, tuple))):
+            return False
+        if isinstance(value, (dict, list, tuple)):
+            return len(value) > self.stream_threshold
+        if hasattr(value, "size"):
+            return getattr(value, "size", 0) > self.stream_threshold
+        return False
+
+    def _encode_streaming(self, value: Any) -> str:
+        """Encode chunk by chunk, stopping as soon as the character limit is reached"""
+        encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(",", ":"))
+        chunks = []
+        size = 0
+        for chunk in encoder.iterencode(value):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > self.max_chars:
+                return "".join(chunks)[: self.max_chars] + TRUNCATION_MARKER
+        return "".join(chunks)
+
+    def _limit(self, text: str) -> str:
+        if self.max_chars is not None and len(text) > self.max_chars:
+            return text[: self.max_chars] + TRUNCATION_MARKER
+        return text
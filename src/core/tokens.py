@@ -0,0 +1,347 @@
+import base64
+import binascii
+import json
+import math
+import re
+import struct
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Optional, Sequence, Tuple
+
+
+# Words, digit runs, runs of non-Latin script characters and single symbols
+_PIECE_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\x00-\x7f\s]+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in a text without a tokenizer
+
+    Short English words are usually a single token and longer ones split into
+    pieces of about four characters; digits group in threes, symbols are a
+    token each and non-Latin scripts take roughly one token per character.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        The estimated token count
+    """
+    tokens = 0
+    for piece in _PIECE_PATTERN.findall(text):
+        first = piece[0]
+        if first.isascii() and first.isalpha():
+            tokens += math.ceil(len(piece) / 4) if len(piece) > 4 else 1
+        elif first.isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        elif first.isascii():
+            tokens += 1
+        else:
+            tokens += len(piece)
+    return tokens
+
+
+class ContextWindowExceeded(ValueError):
+    """Raised when a request cannot fit the model's context window"""
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut a text to about a number of tokens at a piece boundary
+
+    Args:
+        text: The text to cut
+        max_tokens: Estimated tokens to keep
+
+    Returns:
+        The longest prefix of the text estimated to fit, or the text itself
+    """
+    tokens = 0
+    for match in _PIECE_PATTERN.finditer(text):
+        tokens += estimate_tokens(match.group())
+        if tokens > max_tokens:
+            return text[:match.start()].rstrip()
+    return text
+
+
+# Smallest output limit worth sending a request with
+MIN_OUTPUT_TOKENS = 256
+# Tokens of the system prompt the API adds when tools are sent
+TOOL_SYSTEM_TOKENS = 346
+# Framing tokens of each message, content block and tool definition
+MESSAGE_TOKENS = 4
+BLOCK_TOKENS = 3
+TOOL_TOKENS = 8
+# Images are scaled down to fit these limits and cost about one token per 750 pixels
+MAX_IMAGE_EDGE = 1568
+MAX_IMAGE_PIXELS = 1_150_000
+IMAGE_PIXELS_PER_TOKEN = 750
+# Used for images whose size cannot be read (URLs, unknown formats)
+DEFAULT_IMAGE_TOKENS = 1600
+# Rough cost of a PDF page, its rendered image plus extracted text
+PDF_PAGE_TOKENS = 2000
+# Margin of upper bounds before a model has been calibrated
+UNCALIBRATED_HEADROOM = 1.25
+
+_PDF_PAGE = re.compile(rb"/Type\s*/Page\b")
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Read the width and height of a PNG, GIF, WebP or JPEG image from its header
+
+    Returns:
+        The size in pixels, or None for other formats or damaged data
+    """
+    try:
+        if data[:8] == b"\x89PNG\r\n\x1a\n":
+            return struct.unpack(">II", data[16:24])
+        if data[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", data[6:10])
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            chunk = data[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", data[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(data[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+            return None
+        if data[:2] == b"\xff\xd8":
+            position = 2
+            while position + 9 < len(data):
+                if data[position] != 0xFF:
+                    position += 1
+                    continue
+                marker = data[position + 1]
+                if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+                    position += 1 if marker == 0xFF else 2
+                    continue
+                (length,) = struct.unpack(">H", data[position + 2:position + 4])
+                # Start of frame markers, excluding DHT, JPG and DAC
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack(">HH", data[position + 5:position + 9])
+                    return width, height
+                position += 2 + length
+    except struct.error:
+        return None
+    return None
+
+
+def image_tokens(width: int, height: int) -> int:
+    """Estimate the tokens of an image after the API scales it down"""
+    scale = min(1.0, MAX_IMAGE_EDGE / max(width, height, 1), math.sqrt(MAX_IMAGE_PIXELS / max(width * height, 1)))
+    return max(1, math.ceil(width * scale * height * scale / IMAGE_PIXELS_PER_TOKEN))
+
+
+def _get(value: Any, key: str, default: Any = None) -> Any:
+    if isinstance(value, dict):
+        return value.get(key, default)
+    return getattr(value, key, default)
+
+
+class TokenEstimator:
+    """
+    Estimates the input tokens of a request before it is sent
+
+    Messages, tool definitions, images and documents are measured locally
+    from their content, so context limits and budgets can be checked without
+    a count_tokens round trip. Each response's reported input tokens are
+    compared with the raw estimate of its request, and the estimate is
+    scaled by the median ratio seen for that model; `upper_bound` scales by
+    a high quantile instead, for checks that must not underestimate.
+    """
+
+    def __init__(
+        self,
+        context_window: int = 200_000,
+        upper_quantile: float = 0.95,
+        min_samples: int = 5,
+        window: int = 200,
+        cache_size: int = 4096,
+    ):
+        """
+        Initialize the estimator
+
+        Args:
+            context_window: Input plus output tokens a request may use
+            upper_quantile: Quantile of observed ratios used by upper_bound
+            min_samples: Observations of a model needed before its estimates are scaled
+            window: Number of recent observations kept per model
+            cache_size: Number of messages and tool lists whose estimates are kept
+        """
+        self.context_window = context_window
+        self.upper_quantile = upper_quantile
+        self.min_samples = min_samples
+        self.window = window
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._ratios: Dict[str, Deque[float]] = {}
+        # Conversation messages and interned tool lists are immutable once sent, so each is
+        # measured once; the object is kept with its count so that its id stays unique
+        self._cache: "OrderedDict[int, Tuple[Any, int]]" = OrderedDict()
+
+    def text(self, text: str) -> int:
+        """Estimate the tokens of a text"""
+        return estimate_tokens(text)
+
+    def content(self, content: Any) -> int:
+        """Estimate the tokens of message content, a string or a list of blocks"""
+        if isinstance(content, str):
+            return estimate_tokens(content)
+        return sum(self.block(block) for block in content or ())
+
+    def block(self, block: Any) -> int:
+        """Estimate the tokens of one content block"""
+        block_type = _get(block, "type")
+        if block_type == "text":
+            tokens = estimate_tokens(_get(block, "text", ""))
+        elif block_type == "tool_use":
+            tool_input = _get(block, "input", {})
+            tokens = estimate_tokens(_get(block, "name", "")) + estimate_tokens(
+                tool_input if isinstance(tool_input, str) else json.dumps(tool_input, default=str)
+            )
+        elif block_type == "tool_result":
+            tokens = self.content(_get(block, "content", ""))
+        elif block_type == "thinking":
+            tokens = estimate_tokens(_get(block, "thinking", ""))
+        elif block_type == "image":
+            tokens = self.image(_get(block, "source", {}))
+        elif block_type == "document":
+            tokens = self.document(_get(block, "source", {}))
+        else:
+            tokens = estimate_tokens(json.dumps(block if isinstance(block, dict) else str(block), default=str))
+        return tokens + BLOCK_TOKENS
+
+    def image(self, source: Any) -> int:
+        """Estimate the tokens of an image from its source"""
+        if _get(source, "type") != "base64":
+            return DEFAULT_IMAGE_TOKENS
+        try:
+            size = image_size(base64.b64decode(_get(source, "data", "")))
+        except (binascii.Error, ValueError):
+            size = None
+        return image_tokens(*size) if size else DEFAULT_IMAGE_TOKENS
+
+    def document(self, source: Any) -> int:
+        """Estimate the tokens of a document from its source"""
+        source_type = _get(source, "type")
+        if source_type == "text":
+            return estimate_tokens(_get(source, "data", ""))
+        if source_type == "content":
+            return self.content(_get(source, "content", ()))
+        if source_type == "base64":
+            try:
+                data = base64.b64decode(_get(source, "data", ""))
+            except (binascii.Error, ValueError):
+                data = b""
+            return max(1, len(_PDF_PAGE.findall(data))) * PDF_PAGE_TOKENS
+        return PDF_PAGE_TOKENS
+
+    def messages(self, messages: Sequence[Dict[str, Any]]) -> int:
+        """Estimate the tokens of a message list"""
+        return sum(
+            self._cached(message, lambda: self.content(_get(message, "content", "")) + MESSAGE_TOKENS)
+            for message in messages
+        )
+
+    def tools(self, tools: Sequence[Dict[str, Any]]) -> int:
+        """Estimate the tokens of tool definitions, including the tool use system prompt"""
+        if not tools:
+            return 0
+        return self._cached(
+            tools,
+            lambda: TOOL_SYSTEM_TOKENS
+            + sum(estimate_tokens(json.dumps(tool, default=str)) + TOOL_TOKENS for tool in tools),
+        )
+
+    def _cached(self, value: Any, measure: Callable[[], int]) -> int:
+        key = id(value)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] is value:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        tokens = measure()
+        with self._lock:
+            self._cache[key] = (value, tokens)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def raw(self, request: Dict[str, Any]) -> int:
+        """Estimate the input tokens of a request without calibration"""
+        tokens = self.messages(request.get("messages", ())) + self.tools(request.get("tools") or ())
+        system = request.get("system")
+        if system:
+            tokens += self.content(system)
+        return tokens
+
+    def estimate(self, request: Dict[str, Any], raw: Optional[int] = None) -> int:
+        """
+        Estimate the input tokens of a request
+
+        Args:
+            request: Keyword arguments for the messages API
+            raw: Raw estimate of the request, if already computed
+
+        Returns:
+            The calibrated estimate
+        """
+        raw = self.raw(request) if raw is None else raw
+        return math.ceil(raw * self._scale(request.get("model"), 0.5, 1.0))
+
+    def upper_bound(self, request: Dict[str, Any], raw: Optional[int] = None) -> int:
+        """Estimate the input tokens of a request, erring high"""
+        raw = self.raw(request) if raw is None else raw
+        return math.ceil(raw * self._scale(request.get("model"), self.upper_quantile, UNCALIBRATED_HEADROOM))
+
+    def available_output(self, request: Dict[str, Any], raw: Optional[int] = None) -> int:
+        """Get the output tokens left in the context window after the request's input"""
+        return self.context_window - self.upper_bound(request, raw)
+
+    def observe(self, model: Optional[str], raw: int, usage: Any) -> None:
+        """
+        Calibrate against the input tokens the API reported for a request
+
+        Args:
+            model: Model that served the request
+            raw: Raw estimate of the request
+            usage: Usage of the response
+        """
+        if usage is None or raw <= 0:
+            return
+        actual = sum(
+            _get(usage, field) or 0
+            for field in ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+        )
+        if actual <= 0:
+            return
+        with self._lock:
+            ratios = self._ratios.setdefault(model or "", deque(maxlen=self.window))
+            ratios.append(actual / raw)
+
+    def _scale(self, model: Optional[str], quantile: float, default: float) -> float:
+        """Get a quantile of the observed ratios of actual to raw tokens, or the default"""
+        with self._lock:
+            ratios = self._ratios.get(model or "")
+            if not ratios or len(ratios) < self.min_samples:
+                return default
+            observed = sorted(ratios)
+        return observed[min(len(observed) - 1, max(0, math.ceil(quantile * len(observed)) - 1))]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the number of observations and the median and upper scale per model"""
+        with self._lock:
+            models = {model: len(ratios) for model, ratios in self._ratios.items()}
+        return {
+            model or "default": {
+                "samples": samples,
+                "scale": self._scale(model, 0.5, 1.0),
+                "upper_scale": self._scale(model, self.upper_quantile, UNCALIBRATED_HEADROOM),
+            }
+            for model, samples in models.items()
+        }
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
 
+from src.core.execution import INLINE, ExecutionPolicy
+
 
 class Tool(ABC):
     """Abstract base class for all tools"""
@@ -28,6 +30,22 @@ class Tool(ABC):
         """Execute the tool with the given parameters"""
         pass
 
+    @property
+    def execution_policy(self) -> ExecutionPolicy:
+        """Get the execution policy for the tool (inline by default)"""
+        return INLINE
+
+    @property
+    def idempotent(self) -> bool:
+        """
+        Whether the tool only reads state (False by default)
+
+        Streamed calls to idempotent tools start as soon as their input is
+        complete; calls to other tools wait until the response has ended in
+        tool_use, so an aborted or changed turn never has side effects.
+        """
+        return False
+
     def as_dict(self) -> Dict[str, Any]:
         """Convert the tool to a dict for Claude API"""
         return {
@@ -2,6 +2,7 @@ import inspect
 from functools import wraps
 from typing import Any, Callable, Dict, Optional, get_type_hints
 
+from src.core.execution import ExecutionMode, ExecutionPolicy
 from src.core.tool import Tool
 from src.tools.registry import ToolRegistry
 
@@ -9,7 +10,13 @@ from src.tools.registry import ToolRegistry
 class FunctionTool(Tool):
     """Tool implementation for a decorated function"""
 
-    def __init__(self, func: Callable, custom_description: Optional[str] = None):
+    def __init__(
+        self,
+        func: Callable,
+        custom_description: Optional[str] = None,
+        execution_policy: Optional[ExecutionPolicy] = None,
+        idempotent: bool = False,
+    ):
         self.func = func
         self.func_name = func.__name__
         self._description = (
@@ -17,6 +24,8 @@ class FunctionTool(Tool):
         )
         self.type_hints = get_type_hints(func)
         self.signature = inspect.signature(func)
+        self._execution_policy = execution_policy or ExecutionPolicy()
+        self._idempotent = idempotent
 
     @property
     def name(self) -> str:
@@ -26,6 +35,14 @@ class FunctionTool(Tool):
     def description(self) -> str:
         return self._description
 
+    @property
+    def execution_policy(self) -> ExecutionPolicy:
+        return self._execution_policy
+
+    @property
+    def idempotent(self) -> bool:
+        return self._idempotent
+
     @property
     def input_schema(self) -> Dict[str, Any]:
         properties = {}
@@ -114,13 +131,25 @@ class FunctionTool(Tool):
         return ""
 
 
-def tool(func: Optional[Callable] = None, *, description: Optional[str] = None):
+def tool(
+    func: Optional[Callable] = None,
+    *,
+    description: Optional[str] = None,
+    execution: ExecutionMode = "inline",
+    timeout: Optional[float] = None,
+    memory_limit_mb: Optional[int] = None,
+    idempotent: bool = False,
+):
     """
     Decorator to register a function as a Claude tool.
 
     Args:
         func: The function to decorate
         description: Optional description to override function docstring
+        execution: Where the tool runs: "inline", "thread" or "process"
+        timeout: Optional per-call timeout in seconds
+        memory_limit_mb: Optional memory limit for "process" execution
+        idempotent: Whether the function only reads state, so streamed calls may start early
 
     Usage:
         @tool
@@ -130,15 +159,21 @@ def tool(func: Optional[Callable] = None, *, description: Optional[str] = None):
         @tool(description="Custom description")
         def my_function(...):
             ...
+
+        @tool(execution="process", timeout=5, memory_limit_mb=512)
+        def cpu_heavy_function(...):
+            ...
     """
+    policy = ExecutionPolicy(execution, timeout=timeout, memory_limit_mb=memory_limit_mb)
 
     def decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
             return f(*args, **kwargs)
 
-        # Create and register the tool
-        function_tool = FunctionTool(f, description)
+        # Create and register the tool. The wrapper is what the module exposes under
+        # the function's name, so it is the object that pickles for process execution.
+        function_tool = FunctionTool(wrapper, description, policy, idempotent)
         registry = ToolRegistry()
         registry.register(function_tool)
 
@@ -0,0 +1,5 @@
+from .queue import Job, JobQueue, LeaseLostError
+from .sqlite_queue import SQLiteJobQueue
+from .worker import Worker, load_factory, run_workers
+
+__all__ = ["Job", "JobQueue", "LeaseLostError", "SQLiteJobQueue", "Worker", "load_factory", "run_workers"]
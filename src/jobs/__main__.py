@@ -0,0 +1,67 @@
+import argparse
+import functools
+import json
+import sys
+
+from src.jobs.sqlite_queue import SQLiteJobQueue
+from src.jobs.worker import run_workers
+
+
+def main(argv=None) -> None:
+    """
+    Job queue command line
+
+    Usage:
+        python -m src.jobs submit --db jobs.db "What is the weather in Paris?"
+        python -m src.jobs worker --db jobs.db --agent my_project.agents:build_agent --processes 4
+        python -m src.jobs status --db jobs.db [JOB_ID]
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.jobs", description="Durable agent job queue")
+    parser.add_argument("--db", default="jobs.db", help="SQLite queue database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Enqueue prompts (reads one per line from stdin when none given)")
+    submit.add_argument("prompts", nargs="*")
+    submit.add_argument("--max-attempts", type=int, default=3)
+
+    worker = commands.add_parser("worker", help="Start worker processes")
+    worker.add_argument("--agent", required=True, help="Agent factory as module:callable")
+    worker.add_argument("--processes", type=int, default=None, help="Worker processes (default: CPU count)")
+    worker.add_argument("--visibility-timeout", type=float, default=300.0)
+    worker.add_argument("--poll-interval", type=float, default=1.0)
+    worker.add_argument("--retry-delay", type=float, default=5.0)
+    worker.add_argument("--max-runtime", type=float, default=None, help="Seconds a job may run before it is aborted")
+    worker.add_argument("--verbose", action="store_true")
+
+    status = commands.add_parser("status", help="Show queue counts or a single job")
+    status.add_argument("job_id", nargs="?")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "submit":
+        queue = SQLiteJobQueue(args.db)
+        prompts = args.prompts or (line.rstrip("\n") for line in sys.stdin if line.strip())
+        for prompt in prompts:
+            print(queue.enqueue({"prompt": prompt}, max_attempts=args.max_attempts))
+    elif args.command == "worker":
+        run_workers(
+            functools.partial(SQLiteJobQueue, args.db),
+            args.agent,
+            processes=args.processes,
+            visibility_timeout=args.visibility_timeout,
+            poll_interval=args.poll_interval,
+            retry_delay=args.retry_delay,
+            max_runtime=args.max_runtime,
+            verbose=args.verbose,
+        )
+    elif args.command == "status":
+        queue = SQLiteJobQueue(args.db)
+        if args.job_id:
+            job = queue.get(args.job_id)
+            print(json.dumps(job.as_dict() if job else None, indent=2, default=str))
+        else:
+            print(json.dumps(queue.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Literal, Optional
+
+
+JobStatus = Literal["queued", "leased", "completed", "failed"]
+
+
+class Job:
+    """A unit of agent work tracked by a job queue"""
+
+    __slots__ = (
+        "id",
+        "payload",
+        "status",
+        "attempts",
+        "max_attempts",
+        "lease_owner",
+        "lease_expires_at",
+        "result",
+        "error",
+        "created_at",
+        "updated_at",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        payload: Dict[str, Any],
+        status: JobStatus = "queued",
+        attempts: int = 0,
+        max_attempts: int = 3,
+        lease_owner: Optional[str] = None,
+        lease_expires_at: Optional[float] = None,
+        result: Optional[Any] = None,
+        error: Optional[str] = None,
+        created_at: Optional[float] = None,
+        updated_at: Optional[float] = None,
+    ):
+        self.id = id
+        self.payload = payload
+        self.status = status
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.lease_owner = lease_owner
+        self.lease_expires_at = lease_expires_at
+        self.result = result
+        self.error = error
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Convert the job to a plain dict"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"Job(id={self.id!r}, status={self.status!r}, attempts={self.attempts})"
+
+
+class LeaseLostError(Exception):
+    """Raised when a worker acts on a job whose lease it no longer holds"""
+
+
+class JobQueue(ABC):
+    """
+    Abstract durable job queue
+
+    Workers lease jobs for a visibility timeout. A job whose lease expires
+    without being completed becomes visible again and is retried until it
+    runs out of attempts.
+    """
+
+    @abstractmethod
+    def enqueue(self, payload: Dict[str, Any], max_attempts: int = 3, job_id: Optional[str] = None) -> str:
+        """Add a job and return its id"""
+        pass
+
+    @abstractmethod
+    def lease(self, worker_id: str, visibility_timeout: float) -> Optional[Job]:
+        """Lease the next visible job, or return None if there is none"""
+        pass
+
+    @abstractmethod
+    def extend(self, job_id: str, worker_id: str, visibility_timeout: float) -> None:
+        """Extend a held lease (heartbeat)"""
+        pass
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Any) -> None:
+        """Mark a leased job as completed with its result"""
+        pass
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str, retry_delay: float = 0.0) -> None:
+        """Record a failed attempt, re-queueing the job if it has attempts left"""
+        pass
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by id"""
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Count jobs per status"""
+        pass
@@ -0,0 +1,189 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from src.jobs.queue import Job, JobQueue, LeaseLostError
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    visible_at REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_visible ON jobs (status, visible_at);
+CREATE INDEX IF NOT EXISTS jobs_lease ON jobs (status, lease_expires_at);
+"""
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Job queue stored in a local SQLite database
+
+    Safe to share between threads and between worker processes on the same
+    host (the database runs in WAL mode and leases are taken in immediate
+    transactions). For workers on several nodes, implement JobQueue on a
+    shared store instead.
+    """
+
+    def __init__(self, path: str = "jobs.db", busy_timeout: float = 30.0):
+        """
+        Initialize the queue
+
+        Args:
+            path: Database file path
+            busy_timeout: Seconds to wait for a database lock
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._connection())
+
+    def enqueue(self, payload: Dict[str, Any], max_attempts: int = 3, job_id: Optional[str] = None) -> str:
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, payload, status, max_attempts, visible_at, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), max_attempts, now, now, now),
+            )
+        return job_id
+
+    def lease(self, worker_id: str, visibility_timeout: float) -> Optional[Job]:
+        now = time.time()
+        with self._transaction() as connection:
+            # Expired leases that used up their attempts are failed rather than retried
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'Lease expired'), "
+                "lease_owner = NULL, updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires_at <= ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            row = connection.execute(
+                "SELECT id FROM jobs "
+                "WHERE (status = 'queued' AND visible_at <= ?) "
+                "OR (status = 'leased' AND lease_expires_at <= ?) "
+                "ORDER BY visible_at LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                (worker_id, now + visibility_timeout, now, row["id"]),
+            )
+            return self._fetch(connection, row["id"])
+
+    def extend(self, job_id: str, worker_id: str, visibility_timeout: float) -> None:
+        now = time.time()
+        with self._transaction() as connection:
+            self._update_leased(
+                connection,
+                job_id,
+                worker_id,
+                "lease_expires_at = ?, updated_at = ?",
+                (now + visibility_timeout, now),
+            )
+
+    def complete(self, job_id: str, worker_id: str, result: Any) -> None:
+        now = time.time()
+        with self._transaction() as connection:
+            self._update_leased(
+                connection,
+                job_id,
+                worker_id,
+                "status = 'completed', result = ?, error = NULL, lease_owner = NULL, "
+                "lease_expires_at = NULL, updated_at = ?",
+                (json.dumps(result, default=str), now),
+            )
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry_delay: float = 0.0) -> None:
+        now = time.time()
+        with self._transaction() as connection:
+            self._update_leased(
+                connection,
+                job_id,
+                worker_id,
+                "status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+                "error = ?, visible_at = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?",
+                (error, now + retry_delay, now),
+            )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._fetch(self._connection(), job_id)
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status")
+        counts = {"queued": 0, "leased": 0, "completed": 0, "failed": 0}
+        counts.update({row["status"]: row["count"] for row in rows})
+        return counts
+
+    def _update_leased(self, connection: sqlite3.Connection, job_id: str, worker_id: str, assignments: str, params: tuple) -> None:
+        cursor = connection.execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (*params, job_id, worker_id),
+        )
+        if cursor.rowcount == 0:
+            raise LeaseLostError(f"Worker {worker_id} does not hold the lease on job {job_id}")
+
+    def _fetch(self, connection: sqlite3.Connection, job_id: str) -> Optional[Job]:
+        row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return Job(
+            id=row["id"],
+            payload=json.loads(row["payload"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            lease_owner=row["lease_owner"],
+            lease_expires_at=row["lease_expires_at"],
+            result=json.loads(row["result"]) if row["result"] is not None else None,
+            error=row["error"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+
+
+class _ImmediateTransaction:
+    """Context manager running a block in a BEGIN IMMEDIATE transaction"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.connection.execute("COMMIT")
+        else:
+            self.connection.execute("ROLLBACK")
@@ -0,0 +1,234 @@
+import importlib
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+from src.core.deadline import CancellationToken
+from src.core.delegation import DelegationResult, usage_scope
+from src.jobs.queue import Job, JobQueue, LeaseLostError
+
+
+def load_factory(spec: str) -> Callable[[], Any]:
+    """
+    Load an agent factory from a "module:callable" spec
+
+    Args:
+        spec: Import path of a zero-argument callable returning an agent
+
+    Returns:
+        The factory
+    """
+    module_name, _, attribute = spec.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"Invalid factory spec {spec!r}, expected 'module:callable'")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class Worker:
+    """Pulls agent jobs from a queue, runs them and writes the results back"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        agent_factory: Callable[[], Any],
+        worker_id: Optional[str] = None,
+        visibility_timeout: float = 300.0,
+        poll_interval: float = 1.0,
+        retry_delay: float = 5.0,
+        max_runtime: Optional[float] = None,
+        verbose: bool = False,
+    ):
+        """
+        Initialize the worker
+
+        Args:
+            queue: The job queue to pull from
+            agent_factory: Zero-argument callable building the agent (called once per worker)
+            worker_id: Lease owner id (defaults to host:pid)
+            visibility_timeout: Seconds a lease lasts before the job becomes visible again
+            poll_interval: Seconds to sleep when the queue is empty
+            retry_delay: Base delay before a failed job is retried, doubled per attempt
+            max_runtime: Seconds a job may run before it is aborted and failed (None for no limit)
+            verbose: Whether to print verbose output
+        """
+        self.queue = queue
+        self.agent_factory = agent_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.max_runtime = max_runtime
+        self.verbose = verbose
+        self.stop_event = threading.Event()
+        self._agent = None
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            self._agent = self.agent_factory()
+        return self._agent
+
+    def run_job(self, job: Job, cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        Run a single job and return its JSON-serializable result, with the usage of the whole run
+
+        Args:
+            job: The leased job
+            cancel_token: Token aborting the job, e.g. when its lease cannot be kept
+
+        Raises:
+            DeadlineExceeded: If the job runs longer than max_runtime
+            Cancelled: If the token is cancelled
+        """
+        prompt = job.payload["prompt"]
+        with usage_scope() as usage:
+            response = self.agent.invoke(prompt, deadline=self.max_runtime, cancel_token=cancel_token)
+        result = DelegationResult.from_response(
+            getattr(self.agent, "agent_name", "agent"),
+            response,
+            structured=bool(getattr(self.agent, "output_format", None)),
+            usage=usage,
+        )
+        return result.model_dump()
+
+    def _heartbeat(self, job: Job, done: threading.Event, cancel_token: CancellationToken) -> None:
+        """Keep extending the lease while the job runs, aborting the job when that fails"""
+        interval = self.visibility_timeout / 3
+        while not done.wait(interval):
+            try:
+                self.queue.extend(job.id, self.worker_id, self.visibility_timeout)
+            except LeaseLostError:
+                # Another worker owns the job now, so its result would be dropped anyway
+                cancel_token.cancel(f"Lost lease on job {job.id}")
+                return
+            except Exception as e:
+                # Without a heartbeat the lease expires and the job would run twice
+                print(f"[{self.worker_id}] Heartbeat of job {job.id} failed, aborting it", file=sys.stderr)
+                traceback.print_exc()
+                cancel_token.cancel(f"Heartbeat failed: {type(e).__name__}: {e}")
+                return
+
+    def process_one(self) -> bool:
+        """
+        Lease and process one job
+
+        Returns:
+            Whether a job was processed
+        """
+        job = self.queue.lease(self.worker_id, self.visibility_timeout)
+        if job is None:
+            return False
+
+        if self.verbose:
+            print(f"[{self.worker_id}] Running job {job.id} (attempt {job.attempts})")
+
+        done = threading.Event()
+        cancel_token = CancellationToken()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, done, cancel_token), daemon=True)
+        heartbeat.start()
+        try:
+            result = self.run_job(job, cancel_token)
+        except Exception as e:
+            done.set()
+            error = f"{type(e).__name__}: {e}"
+            if self.verbose:
+                traceback.print_exc()
+            try:
+                self.queue.fail(
+                    job.id,
+                    self.worker_id,
+                    error,
+                    retry_delay=self.retry_delay * 2 ** (job.attempts - 1),
+                )
+            except LeaseLostError:
+                pass
+        else:
+            done.set()
+            try:
+                self.queue.complete(job.id, self.worker_id, result)
+            except LeaseLostError:
+                # Another worker took the job over after the lease expired
+                if self.verbose:
+                    print(f"[{self.worker_id}] Lost lease on job {job.id}, result dropped")
+        finally:
+            heartbeat.join()
+        return True
+
+    def run_forever(self, max_jobs: Optional[int] = None, exit_when_empty: bool = False) -> int:
+        """
+        Process jobs until stopped
+
+        Args:
+            max_jobs: Stop after this many jobs
+            exit_when_empty: Stop as soon as no job is visible
+
+        Returns:
+            Number of processed jobs
+        """
+        processed = 0
+        while not self.stop_event.is_set():
+            if max_jobs is not None and processed >= max_jobs:
+                break
+            if self.process_one():
+                processed += 1
+            elif exit_when_empty:
+                break
+            else:
+                self.stop_event.wait(self.poll_interval)
+        return processed
+
+    def stop(self) -> None:
+        """Ask the worker to stop after the current job"""
+        self.stop_event.set()
+
+
+def _worker_main(queue_factory: Callable[[], JobQueue], factory_spec: str, options: Dict[str, Any]) -> None:
+    """Entry point of a worker process"""
+    worker = Worker(queue_factory(), load_factory(factory_spec), **options)
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+    worker.run_forever()
+
+
+def run_workers(
+    queue_factory: Callable[[], JobQueue],
+    factory_spec: str,
+    processes: Optional[int] = None,
+    **options,
+) -> None:
+    """
+    Run worker processes until they are stopped
+
+    Args:
+        queue_factory: Picklable callable opening the queue inside each process
+        factory_spec: "module:callable" agent factory loaded inside each process
+        processes: Number of worker processes (defaults to the CPU count)
+        **options: Worker options (visibility_timeout, poll_interval, ...)
+    """
+    processes = processes or multiprocessing.cpu_count()
+    context = multiprocessing.get_context("spawn")
+    children = [
+        context.Process(target=_worker_main, args=(queue_factory, factory_spec, options), daemon=False)
+        for _ in range(processes)
+    ]
+    for child in children:
+        child.start()
+
+    def stop(signum, frame):
+        for child in children:
+            if child.is_alive():
+                child.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        # Children received the same SIGINT and finish their current job
+        for child in children:
+            child.join()
@@ -0,0 +1,15 @@
+from .fake_api import FakeMessagesAPI, LatencyModel, Script
+from .runner import LoadTestReport, percentile, run_load_test
+from .scenarios import SimulatedWeatherTool, agent_factory, default_scripts
+
+__all__ = [
+    "FakeMessagesAPI",
+    "LatencyModel",
+    "LoadTestReport",
+    "Script",
+    "SimulatedWeatherTool",
+    "agent_factory",
+    "default_scripts",
+    "percentile",
+    "run_load_test",
+]
@@ -0,0 +1,74 @@
+import argparse
+import json
+
+from src.loadtest.fake_api import FakeMessagesAPI, LatencyModel
+from src.loadtest.runner import run_load_test
+from src.loadtest.scenarios import agent_factory, default_scripts
+
+
+def _error_rate(spec: str):
+    kind, _, rate = spec.partition("=")
+    return kind, float(rate)
+
+
+def main(argv=None) -> None:
+    """
+    Offline load test command line
+
+    Usage:
+        python -m src.loadtest --conversations 500 --concurrency 50 --team \
+            --latency lognormal:0.3:0.5 --error 429=0.02 --error 529=0.01 --error timeout=0.005
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.loadtest", description="Load test agents against a local stand-in Messages API"
+    )
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--team", action="store_true", help="Run manager conversations delegating to a team member")
+    parser.add_argument("--no-stream", action="store_true", help="Use non-streaming requests")
+    parser.add_argument("--latency", default="lognormal:0.2:0.5", help="Model latency distribution")
+    parser.add_argument("--stream-interval", type=float, default=0.0, help="Delay between streamed events")
+    parser.add_argument("--tool-latency", default="fixed:0.01", help="Tool latency distribution")
+    parser.add_argument(
+        "--error", action="append", default=[], type=_error_rate,
+        help="Injected failure rate as STATUS=RATE or timeout=RATE (repeatable)",
+    )
+    parser.add_argument("--client-timeout", type=float, default=5.0)
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    api = FakeMessagesAPI(
+        scripts=default_scripts(),
+        latency=LatencyModel.parse(args.latency, seed=args.seed),
+        stream_interval=args.stream_interval,
+        error_rates=dict(args.error),
+        # Held requests outlast the client timeout so they surface as client timeouts
+        timeout_delay=args.client_timeout * 2,
+        seed=args.seed,
+    )
+    with api:
+        factory = agent_factory(
+            api.url,
+            team=args.team,
+            stream=not args.no_stream,
+            client_timeout=args.client_timeout,
+            max_retries=args.max_retries,
+            tool_latency=LatencyModel.parse(args.tool_latency, seed=args.seed),
+        )
+        report = run_load_test(
+            factory,
+            ["What is the weather in Paris?"],
+            conversations=args.conversations,
+            concurrency=args.concurrency,
+            api=api,
+            verbose=args.verbose,
+        )
+
+    print(json.dumps(report.as_dict(), indent=2) if args.json else report.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class LatencyModel:
+    """Random delay distribution used for simulated model and tool latency"""
+
+    KINDS = ("fixed", "uniform", "lognormal", "exponential")
+
+    def __init__(self, kind: str = "lognormal", median: float = 0.2, spread: float = 0.5, seed: Optional[int] = None):
+        """
+        Initialize the latency model
+
+        Args:
+            kind: "fixed", "uniform" (median..spread seconds), "lognormal" or "exponential"
+            median: Median delay in seconds (lower bound for uniform)
+            spread: Log-space sigma for lognormal, upper bound for uniform
+            seed: Random seed for reproducible runs
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.median = median
+        self.spread = spread
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"LatencyModel({self.kind!r}, median={self.median!r}, spread={self.spread!r})"
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "LatencyModel":
+        """
+        Parse a distribution spec such as "fixed:0.1", "uniform:0.05:0.3",
+        "lognormal:0.2:0.5" or "exponential:0.2"
+        """
+        kind, *params = spec.split(":")
+        values = [float(param) for param in params]
+        if kind == "fixed":
+            return cls("fixed", values[0] if values else 0.0, 0.0, seed)
+        return cls(kind, *values, seed=seed)
+
+    def sample(self) -> float:
+        """Draw a delay in seconds"""
+        with self._lock:
+            if self.kind == "fixed":
+                return self.median
+            if self.kind == "uniform":
+                return self._random.uniform(self.median, self.spread)
+            if self.kind == "exponential":
+                # The median of an exponential distribution is ln(2) / rate
+                return self._random.expovariate(0.6931471805599453 / self.median) if self.median > 0 else 0.0
+            return self._random.lognormvariate(0.0, self.spread) * self.median
+
+
+class Script:
+    """
+    Scripted tool-use conversation served by the fake API
+
+    Each turn is a list of (tool name, input) calls; once the turns are used
+    up, the final text is returned. A script applies to requests whose first
+    message contains `match` (e.g. part of the agent's system prompt) and
+    that offer all tools it requires, which lets a manager and its team
+    members follow different scripts on the same server.
+    """
+
+    def __init__(
+        self,
+        turns: Sequence[Sequence[Tuple[str, Dict[str, Any]]]],
+        final_text: str = "Done.",
+        match: Optional[str] = None,
+        requires: Optional[Sequence[str]] = None,
+    ):
+        """
+        Initialize the script
+
+        Args:
+            turns: Tool calls per assistant turn
+            final_text: Text of the final answer
+            match: Text the request's first message must contain
+            requires: Tool names a request must offer (defaults to the tools the script calls)
+        """
+        self.turns = [list(turn) for turn in turns]
+        self.final_text = final_text
+        self.match = match
+        if requires is None:
+            requires = {name for turn in self.turns for name, _ in turn}
+        self.requires = frozenset(requires)
+
+    def applies_to(self, body: Dict[str, Any]) -> bool:
+        """Check whether a request follows this script"""
+        offered = {tool.get("name") for tool in body.get("tools") or []}
+        if not self.requires <= offered:
+            return False
+        if self.match is None:
+            return True
+        messages = body.get("messages") or [{}]
+        return self.match in json.dumps(messages[0].get("content", ""))
+
+    def turn(self, index: int) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        """Get the tool calls of an assistant turn, or None for the final answer"""
+        return self.turns[index] if index < len(self.turns) else None
+
+
+_FINAL_ONLY = Script([], final_text="Done.")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients hanging up on held or slow requests is expected under load
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def _sse(event: Dict[str, Any]) -> bytes:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+class FakeMessagesAPI:
+    """
+    Local stand-in for the Messages API
+
+    Serves scripted responses (plain JSON or server-sent event streams) on
+    /v1/messages with sampled latency and injected errors, and counts
+    requests, statuses and client retries. Clients connect by pointing
+    `base_url` at `url`.
+    """
+
+    def __init__(
+        self,
+        scripts: Optional[Sequence[Script]] = None,
+        latency: Optional[LatencyModel] = None,
+        stream_interval: float = 0.0,
+        error_rates: Optional[Dict[str, float]] = None,
+        timeout_delay: float = 10.0,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        Initialize the fake API
+
+        Args:
+            scripts: Conversation scripts, the first applicable one is used per request
+            latency: Delay before the response (time to first event when streaming)
+            stream_interval: Delay between streamed events in seconds
+            error_rates: Probability per request of an injected failure, keyed by HTTP status
+                (e.g. "429", "529", "500") or "timeout"
+            timeout_delay: How long a "timeout" request is held before the connection is dropped
+            seed: Random seed for error injection
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+        """
+        self.scripts = list(scripts or [])
+        self.latency = latency or LatencyModel("fixed", 0.0)
+        self.stream_interval = stream_interval
+        self.error_rates = dict(error_rates or {})
+        self.timeout_delay = timeout_delay
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+        self._server = _Server((host, port), _Handler)
+        self._server.api = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeMessagesAPI":
+        """Start serving in a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="fake-messages-api", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeMessagesAPI":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get request counts: total, client retries and responses by status"""
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "requests": counts.pop("requests", 0),
+            "retries": counts.pop("retries", 0),
+            "responses": {key: value for key, value in sorted(counts.items())},
+        }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+    def _count(self, *keys: str) -> None:
+        with self._lock:
+            self._counts.update(keys)
+
+    def _choose_error(self) -> Optional[str]:
+        if not self.error_rates:
+            return None
+        with self._lock:
+            draw = self._random.random()
+        for error, rate in self.error_rates.items():
+            if draw < rate:
+                return error
+            draw -= rate
+        return None
+
+    def _script_for(self, body: Dict[str, Any]) -> Script:
+        for script in self.scripts:
+            if script.applies_to(body):
+                return script
+        return _FINAL_ONLY
+
+    def build_events(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Build the stream events answering a request"""
+        messages = body.get("messages") or []
+        turn_index = sum(1 for message in messages if message.get("role") == "assistant")
+        script = self._script_for(body)
+        calls = script.turn(turn_index)
+        input_tokens = max(1, len(json.dumps(messages)) // 4)
+
+        events: List[Dict[str, Any]] = [
+            {
+                "type": "message_start",
+                "message": {
+                    "id": f"msg_{uuid.uuid4().hex[:24]}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": body.get("model", "fake"),
+                    "content": [],
+                    "stop_reason": None,
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": input_tokens, "output_tokens": 1},
+                },
+            }
+        ]
+        text = script.final_text if calls is None else "Let me use a tool."
+        events += [
+            {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text}},
+            {"type": "content_block_stop", "index": 0},
+        ]
+        for index, (name, tool_input) in enumerate(calls or [], 1):
+            events += [
+                {
+                    "type": "content_block_start",
+                    "index": index,
+                    "content_block": {"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}", "name": name, "input": {}},
+                },
+                {
+                    "type": "content_block_delta",
+                    "index": index,
+                    "delta": {"type": "input_json_delta", "partial_json": json.dumps(tool_input)},
+                },
+                {"type": "content_block_stop", "index": index},
+            ]
+        events += [
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn" if calls is None else "tool_use", "stop_sequence": None},
+                "usage": {"output_tokens": 10 + 20 * len(calls or [])},
+            },
+            {"type": "message_stop"},
+        ]
+        return events
+
+    @staticmethod
+    def to_message(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Assemble stream events into a complete message"""
+        message = dict(events[0]["message"])
+        blocks: Dict[int, Dict[str, Any]] = {}
+        for event in events[1:]:
+            if event["type"] == "content_block_start":
+                blocks[event["index"]] = dict(event["content_block"])
+            elif event["type"] == "content_block_delta":
+                delta = event["delta"]
+                if delta["type"] == "text_delta":
+                    blocks[event["index"]]["text"] += delta["text"]
+                else:
+                    blocks[event["index"]]["input"] = json.loads(delta["partial_json"])
+            elif event["type"] == "message_delta":
+                message["stop_reason"] = event["delta"]["stop_reason"]
+                message["usage"] = {**message["usage"], **event["usage"]}
+        message["content"] = [blocks[index] for index in sorted(blocks)]
+        return message
+
+
+_ERROR_TYPES = {
+    "400": "invalid_request_error",
+    "429": "rate_limit_error",
+    "500": "api_error",
+    "529": "overloaded_error",
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        api: FakeMessagesAPI = self.server.api
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+
+        keys = ["requests"]
+        if int(self.headers.get("x-stainless-retry-count") or 0) > 0:
+            keys.append("retries")
+        api._count(*keys)
+
+        if not self.path.split("?")[0].endswith("/messages"):
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+            return
+
+        error = api._choose_error()
+        if error == "timeout":
+            api._count("timeout")
+            time.sleep(api.timeout_delay)
+            self.close_connection = True
+            return
+        if error is not None:
+            api._count(error)
+            self._send_json(
+                int(error),
+                {"type": "error", "error": {"type": _ERROR_TYPES.get(error, "api_error"), "message": "Injected error"}},
+                {"retry-after-ms": "20"},
+            )
+            return
+
+        events = api.build_events(body)
+        time.sleep(api.latency.sample())
+        api._count("200")
+
+        if not body.get("stream"):
+            self._send_json(200, api.to_message(events))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in events:
+            data = _sse(event)
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+            if api.stream_interval:
+                time.sleep(api.stream_interval)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
@@ -0,0 +1,212 @@
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.loadtest.fake_api import FakeMessagesAPI
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of a sorted sequence (0 when empty)"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))
+    return values[index]
+
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size, where the platform exposes it"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class _MemorySampler:
+    """Samples the resident set size in the background to find the peak of a run"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start = _rss_mb()
+        self.peak = self.start
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            current = _rss_mb()
+            if current is not None and (self.peak is None or current > self.peak):
+                self.peak = current
+
+    def __enter__(self) -> "_MemorySampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class LoadTestReport:
+    """Outcome of a load test run"""
+
+    def __init__(
+        self,
+        concurrency: int,
+        latencies: List[float],
+        errors: Counter,
+        duration: float,
+        api_stats: Optional[Dict[str, Any]] = None,
+        rss_start_mb: Optional[float] = None,
+        rss_peak_mb: Optional[float] = None,
+    ):
+        self.concurrency = concurrency
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.duration = duration
+        self.api_stats = api_stats or {}
+        self.rss_start_mb = rss_start_mb
+        self.rss_peak_mb = rss_peak_mb
+
+    @property
+    def succeeded(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def failed(self) -> int:
+        return sum(self.errors.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        latencies = self.latencies
+        process_peak = _peak_rss_mb()
+        growth = None
+        if self.rss_start_mb is not None and self.rss_peak_mb is not None:
+            growth = self.rss_peak_mb - self.rss_start_mb
+        return {
+            "concurrency": self.concurrency,
+            "conversations": self.succeeded + self.failed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "errors": dict(self.errors),
+            "duration_s": round(self.duration, 3),
+            "throughput_per_s": round(self.succeeded / self.duration, 2) if self.duration else 0.0,
+            "latency_s": {
+                "mean": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+                "p50": round(percentile(latencies, 0.50), 4),
+                "p95": round(percentile(latencies, 0.95), 4),
+                "p99": round(percentile(latencies, 0.99), 4),
+                "max": round(latencies[-1], 4) if latencies else 0.0,
+            },
+            "api": self.api_stats,
+            "memory_mb": {
+                "rss_start": round(self.rss_start_mb, 1) if self.rss_start_mb is not None else None,
+                "rss_peak": round(self.rss_peak_mb, 1) if self.rss_peak_mb is not None else None,
+                "per_concurrent_conversation": round(growth / self.concurrency, 3) if growth is not None else None,
+                "process_peak": round(process_peak, 1) if process_peak is not None else None,
+            },
+        }
+
+    def format(self) -> str:
+        """Human-readable summary"""
+        data = self.as_dict()
+        latency = data["latency_s"]
+        memory = data["memory_mb"]
+        api = data["api"]
+        lines = [
+            f"Conversations: {data['conversations']} ({data['succeeded']} ok, {data['failed']} failed) "
+            f"at concurrency {data['concurrency']}",
+            f"Duration: {data['duration_s']}s, throughput: {data['throughput_per_s']} conversations/s",
+            f"Latency: p50 {latency['p50']}s, p95 {latency['p95']}s, p99 {latency['p99']}s, max {latency['max']}s",
+        ]
+        if api:
+            lines.append(
+                f"API requests: {api.get('requests', 0)}, retries: {api.get('retries', 0)}, "
+                f"responses: {api.get('responses', {})}"
+            )
+        if data["errors"]:
+            lines.append(f"Errors: {data['errors']}")
+        lines.append(
+            f"Memory: RSS {memory['rss_start']} -> {memory['rss_peak']} MB "
+            f"({memory['per_concurrent_conversation']} MB per concurrent conversation)"
+        )
+        return "\n".join(lines)
+
+
+def run_load_test(
+    agent_factory: Callable[[], Any],
+    prompts: Sequence[str],
+    conversations: int = 100,
+    concurrency: int = 10,
+    api: Optional[FakeMessagesAPI] = None,
+    verbose: bool = False,
+) -> LoadTestReport:
+    """
+    Drive concurrent agent conversations and measure them
+
+    Args:
+        agent_factory: Callable creating the agent for one conversation
+        prompts: Prompts cycled through by the conversations
+        conversations: Total number of conversations
+        concurrency: Number of conversations in flight at once
+        api: Fake API whose request statistics are included in the report
+        verbose: Whether to print failures as they happen
+
+    Returns:
+        The load test report
+    """
+    latencies: List[float] = []
+    errors: Counter = Counter()
+    lock = threading.Lock()
+
+    def conversation(index: int) -> None:
+        started = time.perf_counter()
+        try:
+            agent_factory().invoke(prompts[index % len(prompts)])
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] += 1
+            if verbose:
+                traceback.print_exc()
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+
+    if api is not None:
+        api.reset_stats()
+
+    with _MemorySampler() as memory:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="conversation") as pool:
+            list(pool.map(conversation, range(conversations)))
+        duration = time.perf_counter() - started
+
+    return LoadTestReport(
+        concurrency=concurrency,
+        latencies=latencies,
+        errors=errors,
+        duration=duration,
+        api_stats=api.stats() if api is not None else None,
+        rss_start_mb=memory.start,
+        rss_peak_mb=memory.peak,
+    )
@@ -0,0 +1,117 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import anthropic
+
+from src.agents.aws.AnthropicAgent import AnthropicAgent
+from src.agents.aws.template import AgentTemplate
+from src.core.tool import Tool
+from src.loadtest.fake_api import LatencyModel, Script
+
+
+class SimulatedWeatherTool(Tool):
+    """Offline weather tool with simulated latency, standing in for network-bound tools"""
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel("fixed", 0.0)
+
+    @property
+    def name(self) -> str:
+        return "get_weather"
+
+    @property
+    def description(self) -> str:
+        return "Get the current weather in a given location"
+
+    @property
+    def idempotent(self) -> bool:
+        return True
+
+    @property
+    def input_schema(self) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "location": {"type": "string", "description": "The city and state, e.g. San Francisco, CA"}
+            },
+            "required": ["location"],
+        }
+
+    def execute(self, location: str) -> Dict[str, Any]:
+        time.sleep(self.latency.sample())
+        return {"weather": "sunny", "temperature": 21.0, "location": location, "unit": "celsius"}
+
+
+def default_scripts() -> List[Script]:
+    """Manager delegates to the weather expert, which calls its tool once and answers"""
+    return [
+        Script(
+            [[("delegate_to_team", {"task": "What is the weather in Paris?", "agent_idx": 0})]],
+            final_text="The weather expert reports sunny weather in Paris.",
+            match="You are a manager",
+        ),
+        Script(
+            [[("get_weather", {"location": "Paris"})]],
+            final_text="It is sunny and 21 degrees in Paris.",
+            match="You are a weather expert",
+        ),
+    ]
+
+
+def agent_factory(
+    base_url: str,
+    team: bool = False,
+    stream: bool = True,
+    model_id: str = "claude-3-5-haiku-latest",
+    client_timeout: float = 5.0,
+    max_retries: int = 2,
+    tool_latency: Optional[LatencyModel] = None,
+    **agent_options: Any,
+) -> Callable[[], AnthropicAgent]:
+    """
+    Build a factory creating one conversation's agent against a fake API
+
+    Agents are created from templates sharing one client, and therefore one
+    connection pool, as a server process would.
+
+    Args:
+        base_url: URL of the fake Messages API
+        team: Whether conversations go through a manager delegating to a weather expert
+        stream: Whether agents stream responses
+        model_id: Model ID sent in requests
+        client_timeout: Client request timeout in seconds
+        max_retries: Client retries on 429/5xx and timeouts
+        tool_latency: Simulated latency of the weather tool
+        **agent_options: Further AnthropicAgent options
+
+    Returns:
+        A callable returning a fresh agent
+    """
+    client = anthropic.Anthropic(
+        api_key="load-test", base_url=base_url, timeout=client_timeout, max_retries=max_retries
+    )
+
+    def build(name: str, **options: Any) -> AgentTemplate:
+        return AgentTemplate(
+            client=client,
+            agent_name=name,
+            model_id=model_id,
+            api_key="load-test",
+            stream=stream,
+            **agent_options,
+            **options,
+        )
+
+    template = build(
+        "Weather Expert",
+        tools=[SimulatedWeatherTool(tool_latency)],
+        system_prompt="You are a weather expert.",
+    )
+    if team:
+        template = build(
+            "Manager Agent",
+            system_prompt="You are a manager. Weather Expert is good at weather.",
+            team=[template.create()],
+        )
+
+    return template.create
@@ -18,15 +18,15 @@ class OutputFormat(BaseModel):
     answer: str
     reasoning: str
 
-def main():
-    """Main entry point"""
+def build_team(verbose: bool = False) -> AnthropicBedrockAgent:
+    """Build the manager agent and its research and weather team members"""
     basic_tools = [BashTool()]
     weather_tools = [WeatherTool()]
     web_tools = [TavilySearchTool()]
     
     research_agent = AnthropicBedrockAgent(
         model_id=os.getenv("ANTHROPIC_MODEL"),
-        verbose=True,
+        verbose=verbose,
         tools=web_tools,
         system_prompt="You are a research expert. You can use the web tool to get the information for a given topic.",
         instructions="Use the web tool to get the information for the given topic.",
@@ -35,7 +35,7 @@ def main():
     
     weather_agent = AnthropicBedrockAgent(
         model_id=os.getenv("ANTHROPIC_MODEL"),
-        verbose=True,
+        verbose=verbose,
         tools=weather_tools,
         system_prompt="You are a weather expert. You can use the weather tool to get the weather information for a given location.",
         instructions="Use the weather tool to get the weather information for the given location.",
@@ -44,7 +44,7 @@ def main():
     
     manager_agent = AnthropicBedrockAgent(
         model_id=os.getenv("ANTHROPIC_MODEL"),
-        verbose=True,
+        verbose=verbose,
         tools=basic_tools,
         system_prompt="""You are a manager. You can delegate tasks to the team members.
         Research Expert is good at research, Weather Expert is good at weather.""",
@@ -52,7 +52,13 @@ def main():
         agent_name="Manager Agent",
         team=[research_agent, weather_agent],
     )
-    
+    return manager_agent
+
+
+def main():
+    """Main entry point"""
+    manager_agent = build_team(verbose=True)
+
     # Kullanıcı sorusu
     prompt = (
         sys.argv[1]
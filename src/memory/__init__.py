@@ -0,0 +1,12 @@
+from .embedders import Embedder, FunctionEmbedder, HashingEmbedder
+from .memory_tool import MemorySearchTool
+from .vector_memory import MemoryEntry, VectorMemory
+
+__all__ = [
+    "Embedder",
+    "FunctionEmbedder",
+    "HashingEmbedder",
+    "MemoryEntry",
+    "MemorySearchTool",
+    "VectorMemory",
+]
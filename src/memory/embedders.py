@@ -0,0 +1,106 @@
+import math
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Callable, List, Sequence
+
+from src.tools.selection.bm25_selector import tokenize
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("`numpy` not installed. Please install using `pip install numpy`")
+
+
+class Embedder(ABC):
+    """Turns texts into fixed-size vectors for the memory index"""
+
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        """Get the length of the produced vectors"""
+        pass
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        """
+        Embed a batch of texts
+
+        Args:
+            texts: The texts to embed
+
+        Returns:
+            A float32 array of shape (len(texts), dimension) with L2-normalized rows
+        """
+        pass
+
+
+def normalize(vectors: "np.ndarray") -> "np.ndarray":
+    """L2-normalize the rows of a matrix, leaving zero rows untouched"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class HashingEmbedder(Embedder):
+    """
+    Offline embedder based on feature hashing
+
+    Terms and adjacent term pairs are hashed into a fixed number of signed
+    buckets with sublinear term frequency, so no vocabulary or model has to
+    be stored. Similar wording gives similar vectors; synonyms do not.
+    """
+
+    def __init__(self, dimension: int = 1024, bigrams: bool = True):
+        """
+        Initialize the embedder
+
+        Args:
+            dimension: Number of hash buckets
+            bigrams: Whether adjacent term pairs are hashed as well
+        """
+        self._dimension = dimension
+        self.bigrams = bigrams
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def _features(self, text: str) -> Counter:
+        terms = tokenize(text)
+        features = Counter(terms)
+        if self.bigrams:
+            features.update(f"{first} {second}" for first, second in zip(terms, terms[1:]))
+        return features
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        vectors = np.zeros((len(texts), self._dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self._dimension] += sign * (1.0 + math.log(count))
+        return normalize(vectors)
+
+
+class FunctionEmbedder(Embedder):
+    """Adapts any batch embedding function, e.g. a sentence-transformers model or an API client"""
+
+    def __init__(self, func: Callable[[List[str]], Sequence[Sequence[float]]], dimension: int):
+        """
+        Initialize the embedder
+
+        Args:
+            func: Callable mapping a list of texts to one vector per text
+            dimension: Length of the vectors the callable returns
+        """
+        self.func = func
+        self._dimension = dimension
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        vectors = np.asarray(self.func(list(texts)), dtype=np.float32).reshape(len(texts), self._dimension)
+        return normalize(vectors)
@@ -0,0 +1,59 @@
+import time
+from typing import Any, Dict
+
+from src.core.tool import Tool
+from src.memory.vector_memory import VectorMemory
+
+
+class MemorySearchTool(Tool):
+    """Tool letting the model look up earlier answers and tool results"""
+
+    def __init__(self, memory: VectorMemory, max_results: int = 5):
+        self.memory = memory
+        self.max_results = max_results
+
+    @property
+    def name(self) -> str:
+        return "search_memory"
+
+    @property
+    def description(self) -> str:
+        return (
+            "Search answers and tool results from earlier requests. "
+            "Check it before running expensive searches again."
+        )
+
+    @property
+    def idempotent(self) -> bool:
+        return True
+
+    @property
+    def input_schema(self) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "What to look for",
+                }
+            },
+            "required": ["query"],
+        }
+
+    def execute(self, query: str) -> Dict[str, Any]:
+        """Search the memory"""
+        now = time.time()
+        hits = self.memory.search(query, top_k=self.max_results)
+        if not hits:
+            return {"results": [], "message": "Nothing relevant remembered"}
+        return {
+            "results": [
+                {
+                    "text": entry.text,
+                    "kind": entry.kind,
+                    "age_seconds": round(now - entry.created_at),
+                    "score": round(score, 3),
+                }
+                for score, entry in hits
+            ]
+        }
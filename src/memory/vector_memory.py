@@ -0,0 +1,355 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.memory.embedders import Embedder, HashingEmbedder
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("`numpy` not installed. Please install using `pip install numpy`")
+
+
+# Recalled notes stand in for tool calls, so they expire after a day by default
+DEFAULT_MAX_AGE = 24 * 3600
+
+
+class MemoryEntry:
+    """A remembered piece of text"""
+
+    __slots__ = ("id", "text", "kind", "metadata", "created_at", "digest")
+
+    def __init__(
+        self,
+        text: str,
+        kind: str = "note",
+        metadata: Optional[Dict[str, Any]] = None,
+        created_at: Optional[float] = None,
+        id: Optional[str] = None,
+    ):
+        self.id = id or uuid.uuid4().hex
+        self.text = text
+        self.kind = kind
+        self.metadata = metadata or {}
+        self.created_at = created_at if created_at is not None else time.time()
+        self.digest = hashlib.sha1(f"{kind}:{text}".encode("utf-8")).hexdigest()
+
+    def __repr__(self) -> str:
+        return f"MemoryEntry(id={self.id!r}, kind={self.kind!r}, text={self.text[:40]!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "text": self.text,
+            "kind": self.kind,
+            "metadata": self.metadata,
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MemoryEntry":
+        return cls(
+            data["text"],
+            kind=data.get("kind", "note"),
+            metadata=data.get("metadata"),
+            created_at=data.get("created_at"),
+            id=data.get("id"),
+        )
+
+
+class VectorMemory:
+    """
+    Local embedding index of earlier answers and tool results
+
+    Vectors live in one float32 matrix searched with a single matrix product.
+    With a `path` the matrix is a memory-mapped .npy file and entries are
+    appended to a JSONL file, so the memory survives restarts without being
+    loaded eagerly. Adding a text that is already stored refreshes it instead
+    of storing a duplicate; a refresh is only logged when its metadata changed
+    or the logged timestamp is older than a tenth of `max_age`. Entries older
+    than `max_age` are ignored and evicted, and the oldest entries are evicted
+    beyond `max_entries`.
+
+    A persisted memory must only be opened by one process at a time.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    ENTRIES_FILE = "entries.jsonl"
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        embedder: Optional[Embedder] = None,
+        max_entries: int = 10000,
+        max_age: Optional[float] = DEFAULT_MAX_AGE,
+        recall_k: int = 3,
+        min_score: float = 0.35,
+        initial_capacity: int = 1024,
+    ):
+        """
+        Initialize the memory
+
+        Args:
+            path: Directory to persist the memory in (None keeps it in memory only)
+            embedder: Embedder for texts and queries (defaults to an offline HashingEmbedder)
+            max_entries: Maximum number of entries kept
+            max_age: Seconds after which entries expire (None keeps them until evicted by size,
+                so recalled results may be arbitrarily stale)
+            recall_k: Number of entries agents recall per prompt
+            min_score: Minimum cosine similarity of a recalled entry
+            initial_capacity: Number of vector rows allocated up front
+        """
+        self.path = path
+        self.embedder = embedder or HashingEmbedder()
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.recall_k = recall_k
+        self.min_score = min_score
+        self._lock = threading.RLock()
+        self._entries: List[MemoryEntry] = []
+        self._rows_by_digest: Dict[str, int] = {}
+        # Timestamp of the latest logged record per digest
+        self._logged_at: Dict[str, float] = {}
+        self._last_sweep = time.time()
+
+        dimension = self.embedder.dimension
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load(max(initial_capacity, 1), dimension)
+        else:
+            self._vectors = np.zeros((max(initial_capacity, 1), dimension), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, self.VECTORS_FILE)
+
+    @property
+    def _entries_path(self) -> str:
+        return os.path.join(self.path, self.ENTRIES_FILE)
+
+    def _load(self, capacity: int, dimension: int) -> None:
+        """Open the persisted vectors and read the entry log"""
+        entries: Dict[int, MemoryEntry] = {}
+        if os.path.exists(self._entries_path):
+            with open(self._entries_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from an interrupted write
+                        continue
+                    # Later records of the same row (refreshes) replace earlier ones
+                    entries[record["row"]] = MemoryEntry.from_dict(record)
+
+        if os.path.exists(self._vectors_path):
+            self._vectors = np.lib.format.open_memmap(self._vectors_path, mode="r+")
+            if self._vectors.shape[1] != dimension:
+                raise ValueError(
+                    f"Memory at {self.path} has {self._vectors.shape[1]}-dimensional vectors, "
+                    f"the embedder produces {dimension}"
+                )
+        else:
+            self._vectors = np.lib.format.open_memmap(
+                self._vectors_path, mode="w+", dtype=np.float32, shape=(capacity, dimension)
+            )
+
+        # Rows without a vector cannot be searched, so the entries stop at the first gap
+        count = 0
+        while count in entries and count < self._vectors.shape[0]:
+            count += 1
+        self._entries = [entries[row] for row in range(count)]
+        self._rows_by_digest = {entry.digest: row for row, entry in enumerate(self._entries)}
+        self._logged_at = {entry.digest: entry.created_at for entry in self._entries}
+
+    def _ensure_capacity(self, size: int) -> None:
+        """Grow the vector matrix to hold at least `size` rows"""
+        capacity, dimension = self._vectors.shape
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        count = len(self._entries)
+
+        if not self.path:
+            vectors = np.zeros((capacity, dimension), dtype=np.float32)
+            vectors[:count] = self._vectors[:count]
+            self._vectors = vectors
+            return
+
+        temp_path = self._vectors_path + ".tmp"
+        vectors = np.lib.format.open_memmap(temp_path, mode="w+", dtype=np.float32, shape=(capacity, dimension))
+        vectors[:count] = self._vectors[:count]
+        vectors.flush()
+        del vectors
+        self._vectors = None
+        os.replace(temp_path, self._vectors_path)
+        self._vectors = np.lib.format.open_memmap(self._vectors_path, mode="r+")
+
+    def _append_record(self, row: int, entry: MemoryEntry) -> None:
+        if not self.path:
+            return
+        self._logged_at[entry.digest] = entry.created_at
+        with open(self._entries_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"row": row, **entry.to_dict()}) + "\n")
+
+    def add(self, text: str, kind: str = "note", metadata: Optional[Dict[str, Any]] = None) -> MemoryEntry:
+        """
+        Remember a text
+
+        Args:
+            text: The text to remember
+            kind: Category of the entry, e.g. "answer" or "tool_result"
+            metadata: JSON-serializable details stored with the entry
+
+        Returns:
+            The stored (or refreshed) entry
+        """
+        entry = MemoryEntry(text, kind=kind, metadata=metadata)
+
+        with self._lock:
+            row = self._rows_by_digest.get(entry.digest)
+            if row is not None:
+                existing = self._entries[row]
+                metadata = entry.metadata or existing.metadata
+                changed = metadata != existing.metadata
+                existing.created_at = entry.created_at
+                existing.metadata = metadata
+                if changed or self._refresh_due(existing):
+                    self._append_record(row, existing)
+                return existing
+
+        vector = self.embedder.embed([text])[0]
+
+        with self._lock:
+            row = len(self._entries)
+            self._ensure_capacity(row + 1)
+            self._vectors[row] = vector
+            if self.path:
+                # The vector is on disk before the log references it
+                self._vectors.flush()
+            self._entries.append(entry)
+            self._rows_by_digest[entry.digest] = row
+            self._append_record(row, entry)
+
+            now = time.time()
+            sweep_due = self.max_age is not None and now - self._last_sweep > self.max_age / 10
+            if len(self._entries) > self.max_entries or sweep_due:
+                self._evict(now)
+
+        return entry
+
+    def _refresh_due(self, entry: MemoryEntry) -> bool:
+        """Whether the logged timestamp of an entry is stale enough to log a refresh"""
+        logged_at = self._logged_at.get(entry.digest)
+        if logged_at is None or self.max_age is None:
+            return logged_at is None
+        return entry.created_at - logged_at > self.max_age / 10
+
+    def search(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+        kind: Optional[str] = None,
+    ) -> List[Tuple[float, MemoryEntry]]:
+        """
+        Find the entries most similar to a query
+
+        Args:
+            query: The text to search for
+            top_k: Maximum number of results (defaults to recall_k)
+            min_score: Minimum cosine similarity (defaults to the memory's min_score)
+            kind: Only return entries of this kind
+
+        Returns:
+            (score, entry) pairs, best first
+        """
+        top_k = top_k or self.recall_k
+        min_score = self.min_score if min_score is None else min_score
+        query_vector = self.embedder.embed([query])[0]
+
+        with self._lock:
+            count = len(self._entries)
+            if count == 0:
+                return []
+            scores = np.asarray(self._vectors[:count] @ query_vector)
+
+            if kind is not None or self.max_age is not None:
+                oldest = time.time() - self.max_age if self.max_age is not None else None
+                excluded = [
+                    row
+                    for row, entry in enumerate(self._entries)
+                    if (kind is not None and entry.kind != kind)
+                    or (oldest is not None and entry.created_at < oldest)
+                ]
+                scores[excluded] = -np.inf
+
+            if top_k < count:
+                candidates = np.argpartition(-scores, top_k)[:top_k]
+            else:
+                candidates = np.arange(count)
+            ranked = candidates[np.argsort(-scores[candidates])]
+            return [
+                (float(scores[row]), self._entries[row])
+                for row in ranked
+                if scores[row] >= min_score
+            ]
+
+    def evict(self) -> int:
+        """
+        Remove expired entries and the oldest entries beyond max_entries
+
+        Returns:
+            The number of removed entries
+        """
+        with self._lock:
+            return self._evict(time.time())
+
+    def _evict(self, now: float) -> int:
+        self._last_sweep = now
+        rows = range(len(self._entries))
+        if self.max_age is not None:
+            rows = [row for row in rows if self._entries[row].created_at >= now - self.max_age]
+        if len(rows) > self.max_entries:
+            # Evict down to 90% so a full memory is not compacted on every add
+            keep_count = max(1, int(self.max_entries * 0.9))
+            rows = sorted(rows, key=lambda row: self._entries[row].created_at)[-keep_count:]
+        keep = sorted(rows)
+
+        removed = len(self._entries) - len(keep)
+        if removed:
+            self._compact(keep)
+        return removed
+
+    def _compact(self, keep: List[int]) -> None:
+        """Move the kept rows to the front and rewrite the entry log"""
+        count = len(keep)
+        self._vectors[:count] = self._vectors[keep]
+        self._entries = [self._entries[row] for row in keep]
+        self._rows_by_digest = {entry.digest: row for row, entry in enumerate(self._entries)}
+
+        if self.path:
+            self._logged_at = {entry.digest: entry.created_at for entry in self._entries}
+            self._vectors.flush()
+            temp_path = self._entries_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for row, entry in enumerate(self._entries):
+                    f.write(json.dumps({"row": row, **entry.to_dict()}) + "\n")
+            os.replace(temp_path, self._entries_path)
+
+    def clear(self) -> None:
+        """Forget all entries"""
+        with self._lock:
+            self._compact([])
+
+    def flush(self) -> None:
+        """Write pending vector changes to disk"""
+        with self._lock:
+            if self.path:
+                self._vectors.flush()
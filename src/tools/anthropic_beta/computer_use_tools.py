@@ -1,10 +1,25 @@
-from typing import Any, Dict, List
+from typing import Any, Dict
 
-from src.core.tool import Tool
+from src.tools.computer_use.computer_tool import ComputerTool
 
 
-class ComputerUseTool(Tool):
-    def __init__(self):
-        super().__init__()
-        self.name = "computer_use"
-        self.description = "Use the computer to perform a task"
+class ComputerUseTool(ComputerTool):
+    """
+    Computer tool exposed through Anthropic's native computer use beta
+
+    The model already knows the action schema of the native tool, so only the
+    display size is sent instead of a full JSON schema. Requires the matching
+    beta flag (e.g. "computer-use-2024-10-22") on the agent.
+    """
+
+    tool_type = "computer_20241022"
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Convert the tool to the native computer use tool definition"""
+        width, height = self.display_size
+        return {
+            "type": self.tool_type,
+            "name": self.name,
+            "display_width_px": width,
+            "display_height_px": height,
+        }
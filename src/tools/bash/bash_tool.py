@@ -1,12 +1,24 @@
+import os
+import signal
 import subprocess
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
+from src.core.deadline import current_deadline
 from src.core.tool import Tool
 
 
 class BashTool(Tool):
     """Tool for executing bash commands"""
 
+    def __init__(self, timeout: Optional[float] = 120.0):
+        """
+        Initialize the bash tool
+
+        Args:
+            timeout: Maximum number of seconds a command may run, capped by the current deadline
+        """
+        self.timeout = timeout
+
     @property
     def name(self) -> str:
         return "bash"
@@ -30,10 +42,44 @@ class BashTool(Tool):
 
     def execute(self, command: str) -> str:
         """Execute a bash command"""
+        deadline = current_deadline()
+        timeout = deadline.timeout(self.timeout) if deadline else self.timeout
+
+        # A new session lets the whole process group be killed, not only the shell
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+        remove_callback = deadline.token.add_callback(lambda: _kill(process)) if deadline else None
         try:
-            result = subprocess.run(
-                command, shell=True, check=True, text=True, capture_output=True
-            )
-            return result.stdout
-        except subprocess.CalledProcessError as e:
-            return f"Error: {e.stderr}"
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill(process)
+            process.communicate()
+            return f"Error: Command timed out after {timeout:.1f}s"
+        finally:
+            if remove_callback:
+                remove_callback()
+
+        if deadline and deadline.token.cancelled:
+            return "Error: Command was cancelled"
+        if process.returncode != 0:
+            return f"Error: {stderr}"
+        return stdout
+
+
+def _kill(process: subprocess.Popen) -> None:
+    """Kill a command together with the processes it started"""
+    if process.poll() is not None:
+        return
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
@@ -1,3 +1,5 @@
+from .backends import Frame, FramebufferBackend, ScreenBackend
 from .computer_tool import ComputerTool
+from .screenshot import ScreenshotPipeline
 
-__all__ = ["ComputerTool"]
+__all__ = ["ComputerTool", "Frame", "FramebufferBackend", "ScreenBackend", "ScreenshotPipeline"]
@@ -0,0 +1,120 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Tuple
+
+
+class Frame:
+    """A captured screen image as packed 8-bit RGB rows"""
+
+    __slots__ = ("width", "height", "pixels")
+
+    def __init__(self, width: int, height: int, pixels: bytes):
+        if len(pixels) != width * height * 3:
+            raise ValueError(f"Expected {width * height * 3} bytes of RGB data, got {len(pixels)}")
+        self.width = width
+        self.height = height
+        self.pixels = pixels
+
+    def row(self, y: int) -> bytes:
+        """Get the RGB bytes of a row"""
+        stride = self.width * 3
+        return self.pixels[y * stride:(y + 1) * stride]
+
+
+class ScreenBackend(ABC):
+    """Abstract screen the computer tool observes and controls"""
+
+    @property
+    @abstractmethod
+    def size(self) -> Tuple[int, int]:
+        """Get the screen size as (width, height) in pixels"""
+        pass
+
+    @abstractmethod
+    def capture(self) -> Frame:
+        """Capture the current screen"""
+        pass
+
+    @abstractmethod
+    def click(self, x: int, y: int, button: str = "left", count: int = 1) -> None:
+        """Click at a screen position"""
+        pass
+
+    @abstractmethod
+    def move(self, x: int, y: int) -> None:
+        """Move the pointer to a screen position"""
+        pass
+
+    def drag(self, start_x: int, start_y: int, end_x: int, end_y: int) -> None:
+        """Press the left button at one screen position and release it at another"""
+        raise NotImplementedError(f"{type(self).__name__} does not support dragging")
+
+    @abstractmethod
+    def type_text(self, text: str) -> None:
+        """Type text at the current focus"""
+        pass
+
+    @abstractmethod
+    def key(self, key: str) -> None:
+        """Press a key or key combination, e.g. "ctrl+s\""""
+        pass
+
+
+class FramebufferBackend(ScreenBackend):
+    """
+    In-memory screen for tests and simulations
+
+    The framebuffer can be drawn on directly and every input action is
+    recorded in `events`.
+    """
+
+    def __init__(self, width: int = 1280, height: int = 800, background: Tuple[int, int, int] = (255, 255, 255)):
+        """
+        Initialize the framebuffer
+
+        Args:
+            width: Screen width in pixels
+            height: Screen height in pixels
+            background: Initial RGB color
+        """
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(bytes(background) * (width * height))
+        self.pointer = (0, 0)
+        self.events: List[Dict[str, Any]] = []
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    def capture(self) -> Frame:
+        return Frame(self.width, self.height, bytes(self.pixels))
+
+    def fill_rect(self, x: int, y: int, width: int, height: int, color: Tuple[int, int, int]) -> None:
+        """Paint a solid rectangle, clipped to the screen"""
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.width, x + width), min(self.height, y + height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        span = bytes(color) * (x1 - x0)
+        stride = self.width * 3
+        for row in range(y0, y1):
+            start = row * stride + x0 * 3
+            self.pixels[start:start + len(span)] = span
+
+    def click(self, x: int, y: int, button: str = "left", count: int = 1) -> None:
+        self.pointer = (x, y)
+        self.events.append({"type": "click", "x": x, "y": y, "button": button, "count": count})
+
+    def move(self, x: int, y: int) -> None:
+        self.pointer = (x, y)
+        self.events.append({"type": "move", "x": x, "y": y})
+
+    def drag(self, start_x: int, start_y: int, end_x: int, end_y: int) -> None:
+        self.pointer = (end_x, end_y)
+        self.events.append({"type": "drag", "x": start_x, "y": start_y, "end_x": end_x, "end_y": end_y})
+
+    def type_text(self, text: str) -> None:
+        self.events.append({"type": "type", "text": text})
+
+    def key(self, key: str) -> None:
+        self.events.append({"type": "key", "key": key})
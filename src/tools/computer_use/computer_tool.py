@@ -1,10 +1,48 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 from src.core.tool import Tool
+from src.tools.computer_use.backends import FramebufferBackend, ScreenBackend
+from src.tools.computer_use.screenshot import ScreenshotPipeline
+
+# Legacy action names accepted for backwards compatibility
+_ACTION_ALIASES = {"click": "left_click"}
+
+_CLICKS = {
+    "left_click": ("left", 1),
+    "right_click": ("right", 1),
+    "middle_click": ("middle", 1),
+    "double_click": ("left", 2),
+}
 
 
 class ComputerTool(Tool):
-    """Computer interaction tool (simplified placeholder implementation)"""
+    """
+    Computer interaction tool backed by a pluggable screen backend
+
+    Follows the computer_20241022 action set: clicks act at the current
+    pointer position, which mouse_move and left_click_drag set and
+    cursor_position reports.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[ScreenBackend] = None,
+        pipeline: Optional[ScreenshotPipeline] = None,
+        screenshot_after_action: bool = True,
+    ):
+        """
+        Initialize the computer tool
+
+        Args:
+            backend: Screen to observe and control (defaults to an in-memory framebuffer)
+            pipeline: Screenshot pipeline (defaults to 1024x768 PNG with change detection)
+            screenshot_after_action: Whether input actions return a screenshot of the result
+        """
+        self.backend = backend or FramebufferBackend()
+        self.pipeline = pipeline or ScreenshotPipeline()
+        self.screenshot_after_action = screenshot_after_action
+        # Pointer position in screen coordinates
+        self._cursor = (0, 0)
 
     @property
     def name(self) -> str:
@@ -12,7 +50,17 @@ class ComputerTool(Tool):
 
     @property
     def description(self) -> str:
-        return "Interact with the computer screen"
+        width, height = self.display_size
+        return (
+            f"Interact with the computer screen ({width}x{height}). Take screenshots, "
+            "move the pointer and click or drag, type text and press keys. Clicks act at the "
+            "current pointer position. Coordinates refer to the screenshot."
+        )
+
+    @property
+    def display_size(self) -> tuple:
+        """Size of the screenshots the model sees, which is also its coordinate space"""
+        return self.pipeline.target_size(*self.backend.size)
 
     @property
     def input_schema(self) -> Dict[str, Any]:
@@ -20,32 +68,104 @@ class ComputerTool(Tool):
             "type": "object",
             "properties": {
                 "action": {
-                    "type": "object",
-                    "properties": {
-                        "type": {
-                            "type": "string",
-                            "enum": ["screenshot", "click", "type"],
-                            "description": "The type of action to perform",
-                        }
-                    },
-                    "required": ["type"],
-                }
+                    "type": "string",
+                    "enum": [
+                        "screenshot",
+                        "cursor_position",
+                        "mouse_move",
+                        "left_click",
+                        "right_click",
+                        "middle_click",
+                        "double_click",
+                        "left_click_drag",
+                        "type",
+                        "key",
+                    ],
+                    "description": "The action to perform",
+                },
+                "coordinate": {
+                    "type": "array",
+                    "items": {"type": "integer"},
+                    "description": "[x, y] screenshot position to move the pointer to (mouse_move) or drag to (left_click_drag)",
+                },
+                "text": {
+                    "type": "string",
+                    "description": "Text to type, or the key combination to press (e.g. 'ctrl+s')",
+                },
             },
             "required": ["action"],
         }
 
-    def execute(self, action: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute a computer action"""
-        action_type = action.get("type", "")
-
-        if action_type == "screenshot":
-            # Implementation for screenshot
-            return {"message": "Screenshot taken"}
-        elif action_type == "click":
-            # Implementation for click
-            return {"message": "Click performed"}
-        elif action_type == "type":
-            # Implementation for type
-            return {"message": "Text typed"}
+    def execute(
+        self,
+        action: Any,
+        coordinate: Optional[List[int]] = None,
+        text: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Execute a computer action and return content blocks"""
+        # Older callers pass the action as {"type": ...}
+        if isinstance(action, dict):
+            coordinate = coordinate or action.get("coordinate")
+            text = text or action.get("text")
+            action = action.get("type", "")
+        action = _ACTION_ALIASES.get(action, action)
+
+        if action == "screenshot":
+            # An explicit request always gets the whole screen, changed or not
+            return self.pipeline.process(self.backend.capture(), force_full=True)
+
+        if action == "cursor_position":
+            x, y = self._to_display(self._cursor)
+            return [{"type": "text", "text": f"X={x},Y={y}"}]
+
+        if action in ("mouse_move", "left_click_drag"):
+            if not coordinate or len(coordinate) != 2:
+                return [{"type": "text", "text": f"Error: {action} requires coordinate [x, y]"}]
+            x, y = self._to_screen(coordinate)
+            if action == "mouse_move":
+                self.backend.move(x, y)
+            else:
+                try:
+                    self.backend.drag(*self._cursor, x, y)
+                except NotImplementedError as e:
+                    return [{"type": "text", "text": f"Error: {e}"}]
+            self._cursor = (x, y)
+            message = f"Performed {action} to {list(coordinate)}."
+        elif action in _CLICKS:
+            if coordinate:
+                # Not part of computer_20241022, but older callers click at a position
+                if len(coordinate) != 2:
+                    return [{"type": "text", "text": "Error: coordinate must be [x, y]"}]
+                self._cursor = self._to_screen(coordinate)
+            button, count = _CLICKS[action]
+            self.backend.click(*self._cursor, button=button, count=count)
+            message = f"Performed {action} at {list(self._to_display(self._cursor))}."
+        elif action in ("type", "key"):
+            if not text:
+                return [{"type": "text", "text": f"Error: {action} requires text"}]
+            if action == "type":
+                self.backend.type_text(text)
+            else:
+                self.backend.key(text)
+            message = f"Performed {action}."
         else:
-            return {"error": f"Unknown action type: {action_type}"}
+            return [{"type": "text", "text": f"Error: Unknown action type: {action}"}]
+
+        blocks = [{"type": "text", "text": message}]
+        if self.screenshot_after_action:
+            blocks.extend(self.pipeline.process(self.backend.capture()))
+        return blocks
+
+    def _to_display(self, position: tuple) -> tuple:
+        """Map backend screen coordinates to screenshot coordinates"""
+        screen_width, screen_height = self.backend.size
+        display_width, display_height = self.display_size
+        return round(position[0] * display_width / screen_width), round(position[1] * display_height / screen_height)
+
+    def _to_screen(self, coordinate: List[int]) -> tuple:
+        """Map screenshot coordinates to backend screen coordinates"""
+        screen_width, screen_height = self.backend.size
+        display_width, display_height = self.display_size
+        x = round(coordinate[0] * screen_width / display_width)
+        y = round(coordinate[1] * screen_height / display_height)
+        return min(max(x, 0), screen_width - 1), min(max(y, 0), screen_height - 1)
@@ -0,0 +1,212 @@
+import hashlib
+import struct
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.serialization import image_block
+from src.tools.computer_use.backends import Frame
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def fit_size(width: int, height: int, max_width: int, max_height: int) -> Tuple[int, int]:
+    """Scale a size down to fit the target box, keeping the aspect ratio"""
+    scale = min(1.0, max_width / width, max_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def downscale(frame: Frame, width: int, height: int) -> Frame:
+    """
+    Resize a frame to a smaller size
+
+    Uses an area-average (box) filter when NumPy is available, which keeps
+    small text legible, and nearest-neighbour sampling otherwise.
+    """
+    if (frame.width, frame.height) == (width, height):
+        return frame
+
+    if np is not None:
+        pixels = np.frombuffer(frame.pixels, dtype=np.uint8).reshape(frame.height, frame.width, 3)
+        integral = np.zeros((frame.height + 1, frame.width + 1, 3), dtype=np.int64)
+        integral[1:, 1:] = pixels.cumsum(axis=0, dtype=np.int64).cumsum(axis=1)
+        ys = (np.arange(height + 1) * frame.height) // height
+        xs = (np.arange(width + 1) * frame.width) // width
+        y0, y1 = ys[:-1, None], ys[1:, None]
+        x0, x1 = xs[None, :-1], xs[None, 1:]
+        sums = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+        area = ((y1 - y0) * (x1 - x0))[..., None]
+        return Frame(width, height, (sums // area).astype(np.uint8).tobytes())
+
+    columns = [(x * frame.width // width) * 3 for x in range(width)]
+    rows = []
+    for y in range(height):
+        source = frame.row(y * frame.height // height)
+        rows.append(bytes(source[offset + channel] for offset in columns for channel in range(3)))
+    return Frame(width, height, b"".join(rows))
+
+
+def crop(frame: Frame, x: int, y: int, width: int, height: int) -> Frame:
+    """Cut a rectangle out of a frame"""
+    rows = [frame.row(row)[x * 3:(x + width) * 3] for row in range(y, y + height)]
+    return Frame(width, height, b"".join(rows))
+
+
+def encode_png(frame: Frame, level: int = 6) -> bytes:
+    """Encode a frame as an 8-bit RGB PNG"""
+    raw = b"".join(b"\x00" + frame.row(y) for y in range(frame.height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", frame.width, frame.height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, level))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _first_difference(a: bytes, b: bytes) -> int:
+    """Index of the first differing byte of two equal-length, unequal byte strings"""
+    low, high = 0, len(a)
+    while low < high:
+        middle = (low + high) // 2
+        if a[:middle + 1] == b[:middle + 1]:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def changed_region(previous: Frame, current: Frame) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Bounding box of the pixels that differ between two frames of the same size
+
+    Returns:
+        (x, y, width, height), or None if the frames are identical
+    """
+    top = bottom = None
+    left, right = current.width, 0
+    for y in range(current.height):
+        before, after = previous.row(y), current.row(y)
+        if before == after:
+            continue
+        if top is None:
+            top = y
+        bottom = y
+        left = min(left, _first_difference(before, after) // 3)
+        right = max(right, current.width - _first_difference(before[::-1], after[::-1]) // 3)
+    if top is None:
+        return None
+    return left, top, right - left, bottom - top + 1
+
+
+class ScreenshotPipeline:
+    """
+    Turns captured frames into compact image content blocks
+
+    Frames are downscaled to the model's target resolution and PNG compressed.
+    A frame identical to the previous one is not sent again, and when only a
+    small region changed just that region is sent, with a full keyframe at a
+    fixed interval.
+    """
+
+    def __init__(
+        self,
+        max_width: int = 1024,
+        max_height: int = 768,
+        max_diff_ratio: float = 0.3,
+        keyframe_interval: int = 5,
+        compression_level: int = 6,
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            max_width: Maximum width of images sent to the model
+            max_height: Maximum height of images sent to the model
+            max_diff_ratio: Largest changed share of the screen still sent as a region
+            keyframe_interval: Send a full frame after this many region updates
+            compression_level: zlib level for PNG encoding
+        """
+        self.max_width = max_width
+        self.max_height = max_height
+        self.max_diff_ratio = max_diff_ratio
+        self.keyframe_interval = keyframe_interval
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self._last_frame: Optional[Frame] = None
+        self._last_digest: Optional[bytes] = None
+        self._updates_since_keyframe = 0
+
+    def target_size(self, width: int, height: int) -> Tuple[int, int]:
+        """Get the size of images sent for a screen of the given size"""
+        return fit_size(width, height, self.max_width, self.max_height)
+
+    def reset(self) -> None:
+        """Forget the previous frame so the next screenshot is sent in full"""
+        with self._lock:
+            self._last_frame = None
+            self._last_digest = None
+            self._updates_since_keyframe = 0
+
+    def process(self, frame: Frame, force_full: bool = False) -> List[Dict[str, Any]]:
+        """
+        Convert a captured frame into content blocks
+
+        Args:
+            frame: The captured screen
+            force_full: Send the whole frame even if it did not change
+
+        Returns:
+            Text and image content blocks
+        """
+        scaled = downscale(frame, *self.target_size(frame.width, frame.height))
+        digest = hashlib.blake2b(scaled.pixels, digest_size=16).digest()
+
+        with self._lock:
+            previous, previous_digest = self._last_frame, self._last_digest
+            self._last_frame, self._last_digest = scaled, digest
+
+            if not force_full and previous is not None and digest == previous_digest:
+                return [{"type": "text", "text": "The screen has not changed since the last screenshot."}]
+
+            region = None
+            if (
+                not force_full
+                and previous is not None
+                and (previous.width, previous.height) == (scaled.width, scaled.height)
+                and self._updates_since_keyframe < self.keyframe_interval
+            ):
+                region = changed_region(previous, scaled)
+                if region and region[2] * region[3] > self.max_diff_ratio * scaled.width * scaled.height:
+                    region = None
+
+            if region is None:
+                self._updates_since_keyframe = 0
+            else:
+                self._updates_since_keyframe += 1
+
+        if region is None:
+            return [
+                {"type": "text", "text": f"Screenshot ({scaled.width}x{scaled.height})."},
+                image_block(encode_png(scaled, self.compression_level)),
+            ]
+
+        x, y, width, height = region
+        return [
+            {
+                "type": "text",
+                "text": (
+                    f"Only part of the screen changed. The image shows the region at x={x}, y={y} "
+                    f"({width}x{height}) of the {scaled.width}x{scaled.height} screen; "
+                    "the rest is unchanged since the previous screenshot."
+                ),
+            },
+            image_block(encode_png(crop(scaled, x, y, width, height), self.compression_level)),
+        ]
@@ -0,0 +1,3 @@
+from .program_tool import ToolProgramError, ToolProgramTool
+
+__all__ = ["ToolProgramError", "ToolProgramTool"]
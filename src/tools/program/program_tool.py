@@ -0,0 +1,262 @@
+import contextvars
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from src.core.tool import Tool
+
+
+# A whole-string reference such as "$geo" or "$geo.results.0.lat"
+_REFERENCE = re.compile(r"^\$([A-Za-z_][\w-]*)((?:\.[\w-]+)*)$")
+# A reference embedded in text such as "Weather in ${geo.name}"
+_EMBEDDED_REFERENCE = re.compile(r"\$\{([A-Za-z_][\w-]*)((?:\.[\w-]+)*)\}")
+
+
+class ToolProgramError(Exception):
+    """Raised when a tool program is invalid or a step cannot be resolved"""
+
+
+def _references(value: Any) -> Set[str]:
+    """Collect the names referenced anywhere in a step input, step IDs or not"""
+    if isinstance(value, str):
+        match = _REFERENCE.match(value)
+        if match:
+            return {match.group(1)}
+        return {match.group(1) for match in _EMBEDDED_REFERENCE.finditer(value)}
+    if isinstance(value, dict):
+        return set().union(*(_references(item) for item in value.values())) if value else set()
+    if isinstance(value, list):
+        return set().union(*(_references(item) for item in value)) if value else set()
+    return set()
+
+
+def _lookup(results: Dict[str, Any], step: str, path: str) -> Any:
+    """Follow a dotted path (keys or list indices) into a step result"""
+    value = results[step]
+    for key in path.split(".")[1:] if path else []:
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        elif isinstance(value, (list, tuple)) and key.lstrip("-").isdigit() and -len(value) <= int(key) < len(value):
+            value = value[int(key)]
+        elif hasattr(value, key) and not key.startswith("_"):
+            value = getattr(value, key)
+        else:
+            raise ToolProgramError(f"${step}{path} not found in the result of step {step}")
+    return value
+
+
+def _substitute(value: Any, results: Dict[str, Any], step_ids: Set[str]) -> Any:
+    """Replace references to steps of the program with values from earlier results"""
+    if isinstance(value, str):
+        match = _REFERENCE.match(value)
+        if match:
+            if match.group(1) not in step_ids:
+                return value
+            return _lookup(results, match.group(1), match.group(2))
+
+        def embed(match: "re.Match[str]") -> str:
+            if match.group(1) not in step_ids:
+                return match.group(0)
+            return str(_lookup(results, match.group(1), match.group(2)))
+
+        return _EMBEDDED_REFERENCE.sub(embed, value)
+    if isinstance(value, dict):
+        return {key: _substitute(item, results, step_ids) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_substitute(item, results, step_ids) for item in value]
+    return value
+
+
+def _failed(result: Any) -> bool:
+    return isinstance(result, dict) and "error" in result
+
+
+class ToolProgramTool(Tool):
+    """
+    Meta-tool running a small plan of dependent tool calls in one turn
+
+    Each step names a tool and its input; input values can reference the
+    result of an earlier step, so a chain such as geocode, weather, convert
+    costs one model round trip instead of one per step. Steps run as soon as
+    the steps they reference are done, independent ones concurrently. A
+    failed step (an exception or an error result) skips the steps that
+    depend on it while the rest of the program still runs. "$name" and
+    "${name}" only refer to a step when the program has a step with that
+    id; anything else, such as a shell variable, is left as it is.
+    """
+
+    NAME = "run_tool_program"
+
+    def __init__(
+        self,
+        registry,
+        execute: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
+        max_steps: int = 20,
+        max_workers: int = 8,
+    ):
+        """
+        Initialize the tool
+
+        Args:
+            registry: Registry holding the tools a program may call
+            execute: Runs one tool call given its name and input (defaults to the registry)
+            max_steps: Maximum number of steps per program
+            max_workers: Maximum number of steps running at the same time
+        """
+        self.registry = registry
+        self._execute = execute or (lambda name, tool_input: registry.execute_tool(name, **tool_input))
+        self.max_steps = max_steps
+        self.max_workers = max_workers
+
+    @property
+    def name(self) -> str:
+        return self.NAME
+
+    @property
+    def description(self) -> str:
+        return (
+            "Run several tool calls in one turn, including calls that need the results of earlier ones. "
+            'Give each step an id, a tool and its input. An input value "$step_id" is replaced by that '
+            'step\'s result and "$step_id.field.0" by a field or list item of it; "${step_id.field}" '
+            "inserts it into a longer string. Other $names, such as shell variables, are left as they are. "
+            "Steps run concurrently unless they reference each other. "
+            "Prefer this over separate turns when the next calls are clear from the plan."
+        )
+
+    @property
+    def input_schema(self) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "steps": {
+                    "type": "array",
+                    "description": "The tool calls to run",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "string", "description": "Unique step id used in references"},
+                            "tool": {"type": "string", "description": "Name of the tool to call"},
+                            "input": {"type": "object", "description": "Tool input, possibly with references"},
+                        },
+                        "required": ["id", "tool", "input"],
+                    },
+                },
+                "outputs": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Step ids whose results to return (all steps when omitted)",
+                },
+            },
+            "required": ["steps"],
+        }
+
+    def execute(self, steps: List[Dict[str, Any]], outputs: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Validate and run a program"""
+        try:
+            dependencies = self._validate(steps, outputs)
+        except ToolProgramError as e:
+            return {"error": f"Invalid tool program: {e}"}
+
+        by_id = {step["id"]: step for step in steps}
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        skipped: List[str] = []
+        remaining = {step_id: set(deps) for step_id, deps in dependencies.items()}
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool-program") as pool:
+            while remaining or running:
+                # Steps depending on a failed or skipped step cannot run
+                blocked = [
+                    step_id for step_id, deps in remaining.items() if deps & (set(errors) | set(skipped))
+                ]
+                for step_id in blocked:
+                    del remaining[step_id]
+                    skipped.append(step_id)
+                if blocked:
+                    continue
+
+                for step_id in [step_id for step_id, deps in remaining.items() if not deps]:
+                    del remaining[step_id]
+                    step = by_id[step_id]
+                    try:
+                        tool_input = _substitute(step["input"], results, set(by_id))
+                    except ToolProgramError as e:
+                        errors[step_id] = str(e)
+                        continue
+                    # The copied context carries the caller's deadline into the step
+                    context = contextvars.copy_context()
+                    running[pool.submit(context.run, self._execute, step["tool"], tool_input)] = step_id
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step_id = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        errors[step_id] = f"{type(e).__name__}: {e}"
+                        continue
+                    if _failed(result):
+                        errors[step_id] = str(result["error"])
+                        continue
+                    results[step_id] = result
+                    for deps in remaining.values():
+                        deps.discard(step_id)
+
+        returned = outputs or [step["id"] for step in steps]
+        report: Dict[str, Any] = {"results": {step_id: results[step_id] for step_id in returned if step_id in results}}
+        if errors:
+            report["errors"] = errors
+        if skipped:
+            report["skipped"] = sorted(skipped, key=list(by_id).index)
+        return report
+
+    def _validate(self, steps: List[Dict[str, Any]], outputs: Optional[List[str]]) -> Dict[str, Set[str]]:
+        """Check the program and return the step IDs each step depends on"""
+        if not steps:
+            raise ToolProgramError("a program needs at least one step")
+        if len(steps) > self.max_steps:
+            raise ToolProgramError(f"at most {self.max_steps} steps are allowed")
+
+        dependencies: Dict[str, Set[str]] = {}
+        for step in steps:
+            if not isinstance(step, dict) or not isinstance(step.get("id"), str) or "tool" not in step:
+                raise ToolProgramError("every step needs an id, a tool and an input")
+            step_id = step["id"]
+            if step_id in dependencies:
+                raise ToolProgramError(f"duplicate step id {step_id}")
+            if step["tool"] == self.name:
+                raise ToolProgramError("programs cannot run other programs")
+            if not self.registry.has_tool(step["tool"]):
+                raise ToolProgramError(f"step {step_id} uses unknown tool {step['tool']}")
+            if not isinstance(step.get("input", {}), dict):
+                raise ToolProgramError(f"the input of step {step_id} must be an object")
+            step.setdefault("input", {})
+            dependencies[step_id] = _references(step["input"])
+
+        # Names that are not steps of the program stay literal text, as in "echo ${HOME}"
+        for deps in dependencies.values():
+            deps.intersection_update(dependencies)
+        for step_id in outputs or []:
+            if step_id not in dependencies:
+                raise ToolProgramError(f"unknown output step {step_id}")
+
+        # Depth-first search for cycles
+        state: Dict[str, int] = {}
+
+        def visit(step_id: str) -> None:
+            if state.get(step_id) == 2:
+                return
+            if state.get(step_id) == 1:
+                raise ToolProgramError(f"steps reference each other in a cycle at {step_id}")
+            state[step_id] = 1
+            for dependency in dependencies[step_id]:
+                visit(dependency)
+            state[step_id] = 2
+
+        for step_id in dependencies:
+            visit(step_id)
+        return dependencies
@@ -1,39 +1,135 @@
-from typing import Any, Dict, List, Type
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
 
+from src.core.execution import get_default_executor
 from src.core.tool import Tool
 
 
+class RegistrySnapshot:
+    """
+    Immutable view of the registered tools at one registry version
+
+    Snapshots are never modified after creation, so any number of threads
+    can read one without locking; the tool payload sent to the API is built
+    once per snapshot.
+    """
+
+    __slots__ = ("version", "tools", "_payload")
+
+    def __init__(self, version: int, tools: Dict[str, Tool]):
+        self.version = version
+        self.tools: Mapping[str, Tool] = MappingProxyType(tools)
+        self._payload: Optional[List[Dict[str, Any]]] = None
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    def __iter__(self) -> Iterator[Tool]:
+        return iter(self.tools.values())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tools
+
+    def get_tool(self, name: str) -> Tool:
+        """Get a tool by name"""
+        tool = self.tools.get(name)
+        if tool is None:
+            raise ValueError(f"Tool {name} not found in registry")
+        return tool
+
+    def get_all_tools(self) -> List[Dict[str, Any]]:
+        """Get all tools as dicts for Claude API"""
+        payload = self._payload
+        if payload is None:
+            # Two threads may build it at once; both build the same list
+            payload = self._payload = [tool.as_dict() for tool in self.tools.values()]
+        return list(payload)
+
+
 class ToolRegistry:
-    """Registry for all available tools"""
+    """
+    Registry for all available tools
+
+    The registered tools are held in an immutable snapshot that registration
+    replaces under a lock (copy-on-write), so lookups, payload builds and tool
+    execution never lock and never see a half-applied change. The snapshot
+    version grows with every change, which lets callers cache anything built
+    from the tool set.
+    """
 
     _instance = None
+    _instance_lock = threading.Lock()
 
     def __new__(cls):
         """Singleton pattern"""
-        if cls._instance is None:
-            cls._instance = super(ToolRegistry, cls).__new__(cls)
-            cls._instance._tools = {}
-        return cls._instance
+        instance = cls._instance
+        if instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(ToolRegistry, cls).__new__(cls)
+                    instance._lock = threading.Lock()
+                    instance._snapshot = RegistrySnapshot(0, {})
+                    cls._instance = instance
+                instance = cls._instance
+        return instance
+
+    @property
+    def version(self) -> int:
+        """Number of changes made to the registry so far"""
+        return self._snapshot.version
+
+    def snapshot(self) -> RegistrySnapshot:
+        """Get the current immutable set of tools"""
+        return self._snapshot
 
     def register(self, tool: Tool) -> None:
         """Register a tool in the registry"""
-        self._tools[tool.name] = tool
+        self.register_all([tool])
+
+    def register_all(self, tools: Iterable[Tool]) -> None:
+        """Register several tools as one change"""
+        tools = list(tools)
+        if not tools:
+            return
+        with self._lock:
+            current = self._snapshot
+            updated = dict(current.tools)
+            for tool in tools:
+                updated[tool.name] = tool
+            self._snapshot = RegistrySnapshot(current.version + 1, updated)
+
+    def unregister(self, name: str) -> bool:
+        """
+        Remove a tool from the registry
+
+        Returns:
+            Whether the tool was registered
+        """
+        with self._lock:
+            current = self._snapshot
+            if name not in current.tools:
+                return False
+            updated = dict(current.tools)
+            del updated[name]
+            self._snapshot = RegistrySnapshot(current.version + 1, updated)
+            return True
 
     def get_tool(self, name: str) -> Tool:
         """Get a tool by name"""
-        if name not in self._tools:
-            raise ValueError(f"Tool {name} not found in registry")
-        return self._tools[name]
+        return self._snapshot.get_tool(name)
 
     def get_all_tools(self) -> List[Dict[str, Any]]:
         """Get all tools as dicts for Claude API"""
-        return [tool.as_dict() for tool in self._tools.values()]
+        return self._snapshot.get_all_tools()
 
     def execute_tool(self, name: str, **kwargs) -> Any:
-        """Execute a tool by name with given parameters"""
+        """Execute a tool by name with given parameters, honoring its execution policy"""
         tool = self.get_tool(name)
-        return tool.execute(**kwargs)
+        return get_default_executor().execute(
+            tool.execute, tool.execution_policy, **kwargs
+        )
 
     def has_tool(self, name: str) -> bool:
         """Check if a tool exists in the registry"""
-        return name in self._tools
+        return name in self._snapshot
@@ -0,0 +1,3 @@
+from .bm25_selector import BM25ToolSelector, ToolSearchTool
+
+__all__ = ["BM25ToolSelector", "ToolSearchTool"]
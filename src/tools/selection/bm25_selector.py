@@ -0,0 +1,226 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.core.tool import Tool
+
+
+_TOKEN_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Za-z][a-z]*|\d+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from get given in is it of on or the this to use "
+    "what when where which with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, breaking snake_case and camelCase identifiers"""
+    return [
+        token
+        for token in (match.lower() for match in _TOKEN_PATTERN.findall(text))
+        if token not in _STOPWORDS
+    ]
+
+
+def _tool_document(tool: Dict[str, Any]) -> List[str]:
+    """Build the indexed terms of a tool definition"""
+    name_terms = tokenize(tool.get("name", ""))
+    schema = tool.get("input_schema") or {}
+    schema_text = " ".join(
+        f"{param} {spec.get('description', '')}" if isinstance(spec, dict) else param
+        for param, spec in (schema.get("properties") or {}).items()
+    )
+    # Names are the strongest signal, so they are counted twice
+    return name_terms * 2 + tokenize(tool.get("description", "")) + tokenize(schema_text)
+
+
+class BM25ToolSelector:
+    """Selects the tools most relevant to a prompt using a local BM25 index"""
+
+    def __init__(
+        self,
+        top_k: int = 8,
+        pinned: Optional[Iterable[str]] = None,
+        min_score: float = 0.0,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        """
+        Initialize the selector
+
+        Args:
+            top_k: Maximum number of ranked tools to send per request
+            pinned: Tool names that are always sent
+            min_score: Minimum BM25 score for a tool to be selected
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.top_k = top_k
+        self.pinned = set(pinned or [])
+        self.min_score = min_score
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._index_key: Optional[Tuple[Tuple[str, str], ...]] = None
+        self._index: Optional[Dict[str, Any]] = None
+
+    def _build_index(self, tools: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        documents = [Counter(_tool_document(tool)) for tool in tools]
+        lengths = [sum(doc.values()) for doc in documents]
+        document_frequency: Counter = Counter()
+        for doc in documents:
+            document_frequency.update(doc.keys())
+
+        count = len(documents)
+        idf = {
+            term: math.log(1 + (count - freq + 0.5) / (freq + 0.5))
+            for term, freq in document_frequency.items()
+        }
+        return {
+            "documents": documents,
+            "lengths": lengths,
+            "average_length": (sum(lengths) / count) if count else 0.0,
+            "idf": idf,
+        }
+
+    def _get_index(self, tools: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        key = tuple((tool["name"], tool.get("description", "")) for tool in tools)
+        with self._lock:
+            if key != self._index_key:
+                self._index = self._build_index(tools)
+                self._index_key = key
+            return self._index
+
+    def rank(self, query: str, tools: Sequence[Dict[str, Any]]) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Score tools against a query
+
+        Args:
+            query: Free text to match (prompt, latest model output, ...)
+            tools: Tool definitions as sent to the API
+
+        Returns:
+            (score, tool) pairs sorted by descending score
+        """
+        if not tools:
+            return []
+
+        index = self._get_index(tools)
+        query_terms = set(tokenize(query))
+        average_length = index["average_length"] or 1.0
+        scored = []
+
+        for tool, doc, length in zip(tools, index["documents"], index["lengths"]):
+            score = 0.0
+            for term in query_terms:
+                frequency = doc.get(term)
+                if not frequency:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                score += index["idf"][term] * frequency * (self.k1 + 1) / (frequency + norm)
+            scored.append((score, tool))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored
+
+    def select(
+        self,
+        query: str,
+        tools: Sequence[Dict[str, Any]],
+        include: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Pick the tools to send for a request
+
+        Args:
+            query: Free text to match
+            tools: All available tool definitions
+            include: Additional tool names to always send (e.g. tools activated on demand)
+
+        Returns:
+            Pinned and included tools followed by the top-k ranked tools, in catalog order
+        """
+        wanted = set(self.pinned)
+        if include:
+            wanted.update(include)
+
+        ranked = 0
+        for score, tool in self.rank(query, tools):
+            if ranked >= self.top_k or score <= self.min_score:
+                break
+            if tool["name"] not in wanted:
+                wanted.add(tool["name"])
+                ranked += 1
+
+        return [tool for tool in tools if tool["name"] in wanted]
+
+
+class ToolSearchTool(Tool):
+    """Meta-tool letting the model pull in tools that were not sent with the request"""
+
+    NAME = "find_tools"
+
+    def __init__(
+        self,
+        selector: BM25ToolSelector,
+        registry,
+        max_results: int = 5,
+        rank: Optional[Callable[[str], Optional[List[Tuple[float, Dict[str, Any]]]]]] = None,
+    ):
+        """
+        Initialize the tool
+
+        Args:
+            selector: Selector ranking the registry's tools when `rank` gives no ranking
+            registry: Registry holding the tool catalog
+            max_results: Maximum number of tools returned per search
+            rank: Ranks the catalog of the calling agent for a query, or returns None
+        """
+        self.selector = selector
+        self.registry = registry
+        self.max_results = max_results
+        self._rank = rank
+
+    @property
+    def name(self) -> str:
+        return self.NAME
+
+    @property
+    def description(self) -> str:
+        return (
+            "Search for additional tools when none of the available tools fits the task. "
+            "Matching tools become available on the next turn."
+        )
+
+    @property
+    def idempotent(self) -> bool:
+        return True
+
+    @property
+    def input_schema(self) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "What the needed tool should do",
+                }
+            },
+            "required": ["query"],
+        }
+
+    def execute(self, query: str) -> Dict[str, Any]:
+        """Search the full tool catalog"""
+        # Rank the same catalog the agent selects from so the cached index is reused
+        ranked = self._rank(query) if self._rank else None
+        if ranked is None:
+            ranked = self.selector.rank(query, self.registry.get_all_tools())
+        matches = [
+            {"name": tool["name"], "description": tool.get("description", "")}
+            for score, tool in ranked
+            if score > 0 and tool["name"] != self.name
+        ][: self.max_results]
+        if not matches:
+            return {"tools": [], "message": "No matching tools found"}
+        return {"tools": matches, "message": "These tools are now available"}
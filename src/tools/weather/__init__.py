@@ -1,3 +1,4 @@
+from .gazetteer import Gazetteer, Place, build_gazetteer, default_gazetteer
 from .weather_tool import WeatherTool
 
-__all__ = ["WeatherTool"]
+__all__ = ["Gazetteer", "Place", "WeatherTool", "build_gazetteer", "default_gazetteer"]
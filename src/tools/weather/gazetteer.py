@@ -0,0 +1,464 @@
+import argparse
+import hashlib
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+DATA_DIR = Path(__file__).parent / "data"
+CITIES_FILE = DATA_DIR / "cities.tsv"
+COUNTRIES_FILE = DATA_DIR / "countries.tsv"
+
+# File layout: header, city records, sorted name keys, sorted country keys, UTF-8 strings
+MAGIC = b"SAGAZ002"
+HEADER = struct.Struct("<8sIIII")
+# Latitude, longitude, population, then offset and length of name, country, region code and region name
+CITY = struct.Struct("<ffIIHIHIHIH")
+# Offset and length of a normalized name, the city it belongs to and whether it is the city's own name
+NAME_KEY = struct.Struct("<IHI?")
+# Offset and length of a normalized country name or code, and the country code
+COUNTRY_KEY = struct.Struct("<IH2s")
+
+# Queries shorter than this are not completed as prefixes or corrected; short
+# names are too often a different real place one letter away (Leon, Lyon)
+MIN_PREFIX_LENGTH = 3
+MIN_FUZZY_LENGTH = 5
+# Upper bound on keys inspected per prefix lookup
+MAX_PREFIX_CANDIDATES = 500
+
+_ABBREVIATIONS = {"st": "saint", "ste": "sainte", "ft": "fort", "mt": "mount"}
+_SEPARATORS = re.compile(r"[\W_]+")
+
+# (name, alternate names, country code, region code, region name, latitude, longitude, population)
+CityRow = Tuple[str, Sequence[str], str, str, str, float, float, int]
+# (country code, name, alternate names)
+CountryRow = Tuple[str, str, Sequence[str]]
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize a place name for lookups
+
+    Accents and punctuation are removed, case is folded and the common
+    abbreviations St, Ste, Ft and Mt are spelled out, so "St. Louis" and
+    "saint louis" or "Zürich" and "Zurich" share a key.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    return " ".join(_ABBREVIATIONS.get(word, word) for word in _SEPARATORS.split(text) if word)
+
+
+def _distance(a: str, b: str, limit: int) -> int:
+    """Edit distance counting transpositions, or limit + 1 once it exceeds the limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before: List[int] = []
+    current = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        previous, current = current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before = previous
+    return current[-1]
+
+
+class Place:
+    """A city found in the gazetteer"""
+
+    __slots__ = ("name", "country", "region_code", "region", "latitude", "longitude", "population", "match")
+
+    def __init__(
+        self,
+        name: str,
+        country: str,
+        region_code: str,
+        region: str,
+        latitude: float,
+        longitude: float,
+        population: int,
+        match: str,
+    ):
+        self.name = name
+        self.country = country
+        self.region_code = region_code
+        self.region = region
+        self.latitude = latitude
+        self.longitude = longitude
+        self.population = population
+        # How the query was matched: "exact", "prefix" or "fuzzy"
+        self.match = match
+
+    def __repr__(self) -> str:
+        region = f", {self.region_code or self.region}" if self.region_code or self.region else ""
+        return f"Place({self.name}{region}, {self.country}, {self.latitude:.4f}, {self.longitude:.4f}, {self.match})"
+
+
+class Gazetteer:
+    """
+    Offline city index used to geocode locations without a network request
+
+    The index is a compact binary file, built once by `build_gazetteer` and
+    memory-mapped, so opening it costs nothing and processes using the same
+    file share its pages. Names are looked up by binary search over sorted
+    normalized keys: an exact name first, then names starting with the
+    query, then city names within one or two typos. A qualifier after a
+    comma, as in "Portland, OR" or "Paris, France", must match the city's
+    region or country. Prefix and typo matches are only returned when they
+    point at a single city, and are marked as such; a small index cannot
+    tell a typo from a place it does not list, so geocoding callers turn
+    them off and leave such queries to a full geocoder. When nothing
+    matches the lookup misses instead of guessing.
+    """
+
+    def __init__(self, source: Union[str, os.PathLike, bytes]):
+        """
+        Open a gazetteer
+
+        Args:
+            source: Path of a file written by build_gazetteer, or its contents
+        """
+        self._file = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._buffer = source
+        else:
+            self._file = open(source, "rb")
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._cities, self._names, self._countries, _ = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("Not a gazetteer file")
+        self._city_offset = HEADER.size
+        self._name_offset = self._city_offset + self._cities * CITY.size
+        self._country_offset = self._name_offset + self._names * NAME_KEY.size
+        self._string_offset = self._country_offset + self._countries * COUNTRY_KEY.size
+
+    def __len__(self) -> int:
+        return self._cities
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._buffer.close()
+            self._file.close()
+            self._file = None
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._string_offset + offset
+        return bytes(self._buffer[start:start + length]).decode("utf-8")
+
+    def _key(self, index: int) -> bytes:
+        offset, length, *_ = NAME_KEY.unpack_from(self._buffer, self._name_offset + index * NAME_KEY.size)
+        start = self._string_offset + offset
+        return bytes(self._buffer[start:start + length])
+
+    def _key_city(self, index: int) -> int:
+        return NAME_KEY.unpack_from(self._buffer, self._name_offset + index * NAME_KEY.size)[2]
+
+    def _key_is_name(self, index: int) -> bool:
+        return NAME_KEY.unpack_from(self._buffer, self._name_offset + index * NAME_KEY.size)[3]
+
+    def _bisect(self, key: bytes) -> int:
+        """Index of the first name key not smaller than key"""
+        low, high = 0, self._names
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _city(self, index: int, match: str) -> Place:
+        lat, lon, population, *strings = CITY.unpack_from(self._buffer, self._city_offset + index * CITY.size)
+        name, country, region_code, region = (
+            self._string(strings[i], strings[i + 1]) for i in range(0, len(strings), 2)
+        )
+        return Place(name, country, region_code, region, round(lat, 4), round(lon, 4), population, match)
+
+    def country_code(self, name: str) -> Optional[str]:
+        """Resolve a country name, alternate name or ISO code to its code"""
+        key = normalize(name).encode("utf-8")
+        low, high = 0, self._countries
+        while low < high:
+            middle = (low + high) // 2
+            offset, length, code = COUNTRY_KEY.unpack_from(self._buffer, self._country_offset + middle * COUNTRY_KEY.size)
+            start = self._string_offset + offset
+            candidate = bytes(self._buffer[start:start + length])
+            if candidate == key:
+                return code.decode("ascii")
+            if candidate < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _exact(self, key: bytes) -> Iterator[int]:
+        index = self._bisect(key)
+        while index < self._names and self._key(index) == key:
+            yield self._key_city(index)
+            index += 1
+
+    def _prefixed(self, key: bytes) -> Iterator[int]:
+        index = self._bisect(key)
+        end = min(self._names, index + MAX_PREFIX_CANDIDATES)
+        while index < end and self._key(index).startswith(key):
+            yield self._key_city(index)
+            index += 1
+
+    def _similar(self, key: str) -> Iterator[Tuple[int, int]]:
+        """
+        Cities with a name within the typo limit that starts with the same letter
+
+        Alternate names are skipped: they include short nicknames and
+        spellings of other places, which make corrections land on the wrong
+        city (Bari on Denpasar through "Bali").
+        """
+        limit = 1 if len(key) < 8 else 2
+        first = key[0].encode("utf-8")
+        start = self._bisect(first)
+        end = self._bisect(first[:-1] + bytes([first[-1] + 1]))
+        for index in range(start, end):
+            if not self._key_is_name(index):
+                continue
+            candidate = self._key(index).decode("utf-8")
+            distance = _distance(key, candidate, limit)
+            if distance <= limit:
+                yield distance, self._key_city(index)
+
+    def _qualifies(self, city: Place, qualifiers: List[str]) -> bool:
+        for qualifier in qualifiers:
+            compact = qualifier.replace(" ", "")
+            if compact in (city.country.lower(), city.region_code.lower()) or qualifier == normalize(city.region):
+                continue
+            if self.country_code(qualifier) == city.country:
+                continue
+            return False
+        return True
+
+    def lookup(self, location: str, approximate: bool = True) -> Optional[Place]:
+        """
+        Find the city a location names
+
+        Args:
+            location: City name, optionally followed by a region and/or country, e.g. "Portland, OR"
+            approximate: Whether to try prefix and typo matches when no name matches exactly
+
+        Returns:
+            The most populous exact match, the only prefix or typo match, or None
+        """
+        name, *rest = location.split(",")
+        key = normalize(name)
+        qualifiers = [qualifier for qualifier in (normalize(part) for part in rest) if qualifier]
+        if not key or self._names == 0:
+            return None
+        encoded = key.encode("utf-8")
+
+        stages = [("exact", ((0, city) for city in self._exact(encoded)))]
+        if approximate and len(key) >= MIN_PREFIX_LENGTH:
+            stages.append(("prefix", ((0, city) for city in self._prefixed(encoded))))
+        if approximate and len(key) >= MIN_FUZZY_LENGTH:
+            stages.append(("fuzzy", self._similar(key)))
+
+        for match, candidates in stages:
+            # Cities at the smallest distance seen, by index
+            best: Dict[int, Place] = {}
+            best_distance = 0
+            for distance, index in candidates:
+                if best and distance > best_distance or index in best:
+                    continue
+                city = self._city(index, match)
+                if qualifiers and not self._qualifies(city, qualifiers):
+                    continue
+                if not best or distance < best_distance:
+                    best, best_distance = {}, distance
+                best[index] = city
+            if not best:
+                continue
+            if len(best) > 1 and match != "exact":
+                # Several cities fit equally well, as for "San"
+                return None
+            return max(best.values(), key=lambda city: city.population)
+        return None
+
+
+def build_gazetteer(
+    cities: Iterable[CityRow],
+    countries: Iterable[CountryRow] = (),
+    path: Optional[Union[str, os.PathLike]] = None,
+) -> bytes:
+    """
+    Build a gazetteer file
+
+    Args:
+        cities: City rows of name, alternate names, country code, region code, region name, latitude, longitude and population
+        countries: Country rows of code, name and alternate names, used to resolve country qualifiers
+        path: Where to write the file; it is replaced atomically
+
+    Returns:
+        The file contents
+    """
+    strings = bytearray()
+    interned: Dict[bytes, int] = {}
+
+    def string(text: str) -> Tuple[int, int]:
+        data = text.encode("utf-8")
+        if data not in interned:
+            interned[data] = len(strings)
+            strings.extend(data)
+        return interned[data], len(data)
+
+    city_records = bytearray()
+    names: List[Tuple[bytes, int, int]] = []
+    count = 0
+    for name, alternates, country, region_code, region, lat, lon, population in cities:
+        fields = [string(value) for value in (name, country.upper(), region_code, region)]
+        city_records += CITY.pack(float(lat), float(lon), int(population), *(item for pair in fields for item in pair))
+        own_name = normalize(name)
+        for key in {normalize(value) for value in (name, *alternates)} - {""}:
+            names.append((key.encode("utf-8"), -int(population), count, key == own_name))
+        count += 1
+    names.sort()
+
+    country_keys: Dict[bytes, str] = {}
+    for code, name, alternates in countries:
+        for key in {normalize(value) for value in (code, name, *alternates)} - {""}:
+            country_keys.setdefault(key.encode("utf-8"), code.upper())
+
+    name_records = bytearray()
+    for key, _, city, is_name in names:
+        offset, length = string(key.decode("utf-8"))
+        name_records += NAME_KEY.pack(offset, length, city, is_name)
+    country_records = bytearray()
+    for key, code in sorted(country_keys.items()):
+        offset, length = string(key.decode("utf-8"))
+        country_records += COUNTRY_KEY.pack(offset, length, code.encode("ascii"))
+
+    data = b"".join(
+        (
+            HEADER.pack(MAGIC, count, len(names), len(country_keys), len(strings)),
+            bytes(city_records),
+            bytes(name_records),
+            bytes(country_records),
+            bytes(strings),
+        )
+    )
+    if path is not None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as handle:
+            handle.write(data)
+        os.replace(handle.name, path)
+    return data
+
+
+def _tsv_rows(path: Union[str, os.PathLike]) -> Iterator[List[str]]:
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip() and not line.startswith("#"):
+                yield line.rstrip("\n").split("\t")
+
+
+def read_cities(path: Union[str, os.PathLike] = CITIES_FILE) -> Iterator[CityRow]:
+    """Read city rows from a TSV file in the format of the bundled cities.tsv"""
+    for name, alternates, country, region_code, region, lat, lon, population in _tsv_rows(path):
+        yield name, [item for item in alternates.split("|") if item], country, region_code, region, float(lat), float(lon), int(population)
+
+
+def read_countries(path: Union[str, os.PathLike] = COUNTRIES_FILE) -> Iterator[CountryRow]:
+    """Read country rows from a TSV file in the format of the bundled countries.tsv"""
+    for code, name, alternates in _tsv_rows(path):
+        yield code, name, [item for item in alternates.split("|") if item]
+
+
+def read_geonames(
+    cities_path: Union[str, os.PathLike],
+    admin1_path: Optional[Union[str, os.PathLike]] = None,
+) -> Iterator[CityRow]:
+    """
+    Read city rows from a GeoNames dump such as cities15000.txt
+
+    Args:
+        cities_path: GeoNames cities file
+        admin1_path: GeoNames admin1CodesASCII.txt, used for region names
+
+    Returns:
+        City rows for build_gazetteer
+    """
+    regions: Dict[str, str] = {}
+    if admin1_path is not None:
+        for code, name, *_ in _tsv_rows(admin1_path):
+            regions[code] = name
+    for row in _tsv_rows(cities_path):
+        name, ascii_name, alternates = row[1], row[2], row[3]
+        country, region_code, population = row[8], row[10], int(row[14] or 0)
+        names = [ascii_name] + [item for item in alternates.split(",") if item]
+        region = regions.get(f"{country}.{region_code}", "")
+        yield name, names, country, region_code, region, float(row[4]), float(row[5]), population
+
+
+_default: Optional[Gazetteer] = None
+_default_lock = threading.Lock()
+
+
+def default_gazetteer() -> Gazetteer:
+    """
+    Get the gazetteer built from the bundled data, shared by the process
+
+    The bundled TSV files are compiled on first use into a cache file named
+    after their hash, so later processes map the compiled file directly; if
+    the cache directory is not writable the index is kept in memory.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            digest = hashlib.sha1(CITIES_FILE.read_bytes() + COUNTRIES_FILE.read_bytes() + MAGIC).hexdigest()[:16]
+            cache_dir = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "simple-agents"
+            path = cache_dir / f"gazetteer-{digest}.bin"
+            try:
+                if not path.exists():
+                    build_gazetteer(read_cities(), read_countries(), path)
+                _default = Gazetteer(path)
+            except OSError:
+                _default = Gazetteer(build_gazetteer(read_cities(), read_countries()))
+        return _default
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.tools.weather.gazetteer", description="Build or query an offline gazetteer")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Compile a gazetteer file")
+    build.add_argument("output", help="Path of the gazetteer file to write")
+    build.add_argument("--cities", default=str(CITIES_FILE), help="City TSV in the bundled format")
+    build.add_argument("--geonames", help="GeoNames cities file (e.g. cities15000.txt), used instead of --cities")
+    build.add_argument("--admin1", help="GeoNames admin1CodesASCII.txt for region names")
+    build.add_argument("--countries", default=str(COUNTRIES_FILE), help="Country TSV in the bundled format")
+
+    lookup = commands.add_parser("lookup", help="Look up locations")
+    lookup.add_argument("locations", nargs="+")
+    lookup.add_argument("--gazetteer", help="Gazetteer file (defaults to the bundled data)")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        cities = read_geonames(args.geonames, args.admin1) if args.geonames else read_cities(args.cities)
+        data = build_gazetteer(cities, read_countries(args.countries), args.output)
+        print(f"Wrote {len(Gazetteer(data))} cities ({len(data) / 1024:.0f} KiB) to {args.output}")
+    else:
+        gazetteer = Gazetteer(args.gazetteer) if args.gazetteer else default_gazetteer()
+        for location in args.locations:
+            print(f"{location}: {gazetteer.lookup(location)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,88 @@
 import requests
-from typing import Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from src.core.deadline import DeadlineExceeded, remaining_timeout
+from src.tools.weather.gazetteer import Gazetteer, default_gazetteer, normalize
 
 class WeatherAPI:
     GEO_URL = "https://nominatim.openstreetmap.org/search"
     WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
 
+    # Nominatim's usage policy allows at most one request per second per application
+    NOMINATIM_INTERVAL = 1.0
+    # Nominatim results kept per process, keyed by normalized location
+    NOMINATIM_CACHE_SIZE = 256
+
+    _nominatim_lock = threading.Lock()
+    _nominatim_last = 0.0
+    _nominatim_cache: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+
+    def __init__(self, timeout: float = 10.0, gazetteer: Optional[Gazetteer] = None, offline_geocoding: bool = True):
+        """
+        Initialize the weather API client
+
+        Args:
+            timeout: Timeout of each HTTP request in seconds, capped by the current deadline
+            gazetteer: Offline city index tried before Nominatim (defaults to the bundled one)
+            offline_geocoding: Whether to look locations up in the gazetteer at all
+        """
+        self.timeout = timeout
+        self.gazetteer = (gazetteer or default_gazetteer()) if offline_geocoding else None
+
     def get_coordinates(self, location: str) -> Dict[str, float]:
-        """Convert location name to latitude and longitude"""
+        """
+        Convert location name to latitude and longitude
+
+        Only exact gazetteer matches are used: a prefix or typo match may be a
+        place the gazetteer does not list (Frankfort is not Frankfurt), so
+        anything else is left to Nominatim.
+        """
+        if self.gazetteer is not None:
+            place = self.gazetteer.lookup(location, approximate=False)
+            if place is not None:
+                return {"latitude": place.latitude, "longitude": place.longitude}
+        return self._nominatim(location)
+
+    def _nominatim(self, location: str) -> Dict[str, float]:
+        """Geocode a location with Nominatim, throttled process-wide"""
+        key = normalize(location)
+        cache = WeatherAPI._nominatim_cache
+        with WeatherAPI._nominatim_lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return dict(cache[key])
+
         headers = {"User-Agent": "Mozilla/5.0"}
         params = {"q": location, "format": "json", "limit": 1}
 
+        # Requests queue on the lock so that they leave at most one per interval; running
+        # out of time is raised to the caller rather than reported as a lookup failure
+        with WeatherAPI._nominatim_lock:
+            wait = WeatherAPI._nominatim_last + self.NOMINATIM_INTERVAL - time.monotonic()
+            if wait > 0:
+                timeout = remaining_timeout(None)
+                if timeout is not None and timeout <= wait:
+                    raise DeadlineExceeded("Deadline passes before Nominatim accepts another request")
+                time.sleep(wait)
+            WeatherAPI._nominatim_last = time.monotonic()
+
         try:
-            response = requests.get(self.GEO_URL, params=params, headers=headers)
+            response = requests.get(
+                self.GEO_URL, params=params, headers=headers, timeout=remaining_timeout(self.timeout)
+            )
             response.raise_for_status()
             data = response.json()
 
             if data:
-                return {"latitude": float(data[0]["lat"]), "longitude": float(data[0]["lon"])}
+                coords = {"latitude": float(data[0]["lat"]), "longitude": float(data[0]["lon"])}
+                with WeatherAPI._nominatim_lock:
+                    cache[key] = coords
+                    if len(cache) > self.NOMINATIM_CACHE_SIZE:
+                        cache.popitem(last=False)
+                return dict(coords)
             else:
                 return {"error": f"Location '{location}' not found"}
 
@@ -37,7 +103,7 @@ class WeatherAPI:
             "timezone": "auto"
         }
         try:
-            response = requests.get(self.WEATHER_URL, params=params)
+            response = requests.get(self.WEATHER_URL, params=params, timeout=remaining_timeout(self.timeout))
             response.raise_for_status()
             weather_data = response.json().get("current_weather", {})
 
@@ -1,11 +1,22 @@
-from typing import Any, Dict, Literal
+from typing import Any, Dict, Literal, Optional
 
 from src.core.tool import Tool
+from src.tools.weather.gazetteer import Gazetteer
 from src.tools.weather.weather_api import WeatherAPI
 
 class WeatherTool(Tool):
     """Tool for getting weather information"""
 
+    def __init__(self, gazetteer: Optional[Gazetteer] = None, offline_geocoding: bool = True):
+        """
+        Initialize the weather tool
+
+        Args:
+            gazetteer: Offline city index tried before Nominatim (defaults to the bundled one)
+            offline_geocoding: Whether to geocode locations offline before asking Nominatim
+        """
+        self.weather_api = WeatherAPI(gazetteer=gazetteer, offline_geocoding=offline_geocoding)
+
     @property
     def name(self) -> str:
         return "get_weather"
@@ -14,6 +25,10 @@ class WeatherTool(Tool):
     def description(self) -> str:
         return "Get the current weather in a given location"
 
+    @property
+    def idempotent(self) -> bool:
+        return True
+
     @property
     def input_schema(self) -> Dict[str, Any]:
         return {
@@ -34,6 +49,4 @@ class WeatherTool(Tool):
 
     def execute(self, location: str, unit: str = "celsius") -> Dict[str, Any]:
         """Get weather for the specified location"""
-        # In a real implementation, this would call a weather API
-        weather_api = WeatherAPI()
-        return weather_api.execute(location, unit)
+        return self.weather_api.execute(location, unit)
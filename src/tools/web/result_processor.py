@@ -0,0 +1,302 @@
+import hashlib
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from src.core.tokens import estimate_tokens
+from src.tools.selection.bm25_selector import tokenize
+
+
+# Whole lines that are site chrome rather than content: copyright footers, cookie banners,
+# calls to action. Matched against the entire line, so prose mentioning these words stays
+_BOILERPLATE_LINE = re.compile(
+    r"(?:copyright\s*)?(?:©|\(c\))\s*.{0,100}|copyright\s+\d{4}\b.{0,100}|.{0,100}\ball rights reserved\W*|"
+    r"(?:we|this (?:web)?site) uses? cookies\b.*|(?:accept|reject|allow|manage)(?: all)? cookies(?: settings)?\W*|"
+    r"cookie (?:settings|preferences|policy)\W*|"
+    r"(?:subscribe|sign up|sign in|log in|register)(?: now| today| here| for free)?\W*|"
+    r"(?:subscribe|sign up) (?:to|for) (?:our|the) newsletter\b.*|newsletter\W*|advertisement\W*|"
+    r"privacy policy\W*|terms of (?:use|service)\W*|share (?:this(?: article| story)?|on \w+)\W*|"
+    r"click here\b.*|read more\W*|skip to (?:main )?content\W*|follow us(?: on \w+)?\W*|"
+    r"related (?:articles|stories)\W*|(?:please )?enable javascript\b.*",
+    re.IGNORECASE,
+)
+# Menu entries, and breadcrumb trails such as "Home > News > World" made only of short segments
+# without digits, so table rows and values such as "2023 / 2024" stay
+_NAVIGATION_LINE = re.compile(
+    r"(home|menu|main menu|(toggle )?navigation|search|contact( us)?|about( us)?|back( to top)?|top|"
+    r"next|prev(ious)?|more|close|share|print|email|tweet)\W*"
+    r"|[^\s\d›»/>]+(?: [^\s\d›»/>]+){0,2}(?: [›»/>] [^\s\d›»/>]+(?: [^\s\d›»/>]+){0,2})+",
+    re.IGNORECASE,
+)
+_MARKDOWN_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_MARKDOWN_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_BARE_URL = re.compile(r"https?://\S+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WHITESPACE = re.compile(r"[ \t]+")
+
+# Mersenne prime used for the MinHash permutations
+_PRIME = (1 << 61) - 1
+
+
+class _Passage:
+    __slots__ = ("result", "position", "text", "terms", "tokens", "score", "matches")
+
+    def __init__(self, result: int, position: int, text: str):
+        self.result = result
+        self.position = position
+        self.text = text
+        self.terms = tokenize(text)
+        self.tokens = estimate_tokens(text)
+        self.score = 0.0
+        self.matches = False
+
+
+class ResultPostProcessor:
+    """
+    Condenses web search results into the passages most worth their tokens
+
+    Boilerplate lines (navigation, cookie banners, repeats of short lines
+    already seen in an earlier result) that do not mention the query are
+    removed, the remaining text is split into passages, near duplicates from
+    syndicated copies are dropped with MinHash over word shingles, and
+    passages are ranked by BM25 overlap with the query plus the search
+    engine's own score. The best passages are then packed into the token
+    budget, grouped back under their source.
+    """
+
+    def __init__(
+        self,
+        passage_words: int = 120,
+        shingle_size: int = 3,
+        num_perm: int = 32,
+        bands: int = 8,
+        duplicate_threshold: float = 0.6,
+        result_score_weight: float = 1.0,
+        k1: float = 1.2,
+        b: float = 0.75,
+        min_fragment_tokens: int = 30,
+    ):
+        """
+        Initialize the post-processor
+
+        Args:
+            passage_words: Target maximum number of words per passage
+            shingle_size: Number of words per shingle for duplicate detection
+            num_perm: Number of MinHash permutations
+            bands: Number of LSH bands (num_perm must be divisible by it)
+            duplicate_threshold: Estimated Jaccard similarity above which passages are duplicates
+            result_score_weight: Weight of the search engine's relevance score in the ranking
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+            min_fragment_tokens: Smallest leftover budget filled with the leading sentences of a passage
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.passage_words = passage_words
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.bands = bands
+        self.duplicate_threshold = duplicate_threshold
+        self.result_score_weight = result_score_weight
+        self.k1 = k1
+        self.b = b
+        self.min_fragment_tokens = min_fragment_tokens
+        # Fixed permutation coefficients keep signatures comparable across calls
+        self._permutations = [
+            (
+                int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % (_PRIME - 1) + 1,
+                int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _PRIME,
+            )
+            for i in range(num_perm)
+        ]
+
+    def process(self, query: str, results: Sequence[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
+        """
+        Select and condense results to fit a token budget
+
+        Args:
+            query: The search query
+            results: Raw results with title, url, content and optional score
+            max_tokens: Token budget for all returned results, titles and URLs included
+
+        Returns:
+            Results with title, url, condensed content and score, most relevant first
+        """
+        cleaned = self._remove_boilerplate([result.get("content") or "" for result in results], set(tokenize(query)))
+        passages = [
+            _Passage(index, position, text)
+            for index, content in enumerate(cleaned)
+            for position, text in enumerate(self._split_passages(content))
+        ]
+        passages = self._remove_duplicates(passages)
+        self._rank(query, passages, results)
+        # Passages sharing no term with the query are only kept when nothing matches
+        if any(passage.matches for passage in passages):
+            passages = [passage for passage in passages if passage.matches]
+        chosen = self._pack(passages, results, max_tokens)
+
+        best_by_result: Dict[int, float] = {}
+        for passage in chosen:
+            best_by_result[passage.result] = max(best_by_result.get(passage.result, -math.inf), passage.score)
+
+        processed = []
+        for index in sorted(best_by_result, key=best_by_result.get, reverse=True):
+            result = results[index]
+            selected = sorted((p for p in chosen if p.result == index), key=lambda p: p.position)
+            parts = [selected[0].text]
+            for previous, passage in zip(selected, selected[1:]):
+                # Mark gaps where passages in between were left out
+                parts.append(" " if passage.position == previous.position + 1 else " ... ")
+                parts.append(passage.text)
+            processed.append(
+                {
+                    "title": result.get("title", ""),
+                    "url": result.get("url", ""),
+                    "content": "".join(parts),
+                    "score": result.get("score", 0),
+                }
+            )
+        return processed
+
+    def _remove_boilerplate(self, contents: List[str], query_terms: Set[str]) -> List[str]:
+        """Strip markup clutter and drop boilerplate lines, keeping every line that mentions the query"""
+        documents = []
+        for content in contents:
+            content = _MARKDOWN_IMAGE.sub("", content)
+            content = _MARKDOWN_LINK.sub(r"\1", content)
+            content = _BARE_URL.sub("", content)
+            lines = [_WHITESPACE.sub(" ", line).strip(" |*#>-") for line in content.splitlines()]
+            documents.append([line for line in lines if line])
+
+        cleaned = []
+        # Short lines from earlier results; a repeat is kept only where it first appears,
+        # since sources agreeing on a fact state it the same way
+        seen: Set[str] = set()
+        for lines in documents:
+            kept = []
+            for line in lines:
+                if len(line.split()) < 20 and query_terms.isdisjoint(tokenize(line)):
+                    key = line.lower()
+                    if key in seen or _BOILERPLATE_LINE.fullmatch(line) or _NAVIGATION_LINE.fullmatch(line):
+                        continue
+                    seen.add(key)
+                kept.append(line)
+            cleaned.append("\n".join(kept))
+        return cleaned
+
+    def _split_passages(self, content: str) -> List[str]:
+        """Split content into paragraph-based passages of bounded length"""
+        passages = []
+        for paragraph in content.split("\n"):
+            current: List[str] = []
+            length = 0
+            for sentence in _SENTENCE_END.split(paragraph):
+                words = len(sentence.split())
+                if current and length + words > self.passage_words:
+                    passages.append(" ".join(current))
+                    current, length = [], 0
+                current.append(sentence)
+                length += words
+            if current:
+                passages.append(" ".join(current))
+        return passages
+
+    def _signature(self, terms: List[str]) -> Optional[tuple]:
+        """MinHash signature of the word shingles of a passage"""
+        size = min(self.shingle_size, len(terms))
+        if size == 0:
+            return None
+        shingles: Set[int] = {
+            int.from_bytes(
+                hashlib.blake2b(" ".join(terms[i:i + size]).encode(), digest_size=8).digest(), "big"
+            )
+            for i in range(len(terms) - size + 1)
+        }
+        return tuple(min((a * value + b) % _PRIME for value in shingles) for a, b in self._permutations)
+
+    def _remove_duplicates(self, passages: List[_Passage]) -> List[_Passage]:
+        """Drop passages that nearly repeat an earlier one, using LSH banding to find candidates"""
+        rows = self.num_perm // self.bands
+        buckets: Dict[tuple, List[tuple]] = {}
+        kept = []
+        for passage in passages:
+            signature = self._signature(passage.terms)
+            if signature is None:
+                continue
+            keys = [(band, signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+            candidates = {id(other): other for key in keys for other in buckets.get(key, ())}
+            if any(
+                sum(x == y for x, y in zip(signature, other)) / self.num_perm >= self.duplicate_threshold
+                for other in candidates.values()
+            ):
+                continue
+            for key in keys:
+                buckets.setdefault(key, []).append(signature)
+            kept.append(passage)
+        return kept
+
+    def _rank(self, query: str, passages: List[_Passage], results: Sequence[Dict[str, Any]]) -> None:
+        """Score passages with BM25 against the query plus the result's own relevance"""
+        query_terms = set(tokenize(query))
+        if not passages:
+            return
+        document_frequency = Counter(term for passage in passages for term in set(passage.terms) & query_terms)
+        average_length = sum(len(passage.terms) for passage in passages) / len(passages) or 1.0
+        count = len(passages)
+
+        for passage in passages:
+            frequencies = Counter(passage.terms)
+            length_norm = 1 - self.b + self.b * len(passage.terms) / average_length
+            score = 0.0
+            for term in query_terms:
+                frequency = frequencies.get(term)
+                if not frequency:
+                    continue
+                idf = math.log(1 + (count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                score += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+            passage.matches = score > 0
+            passage.score = score + self.result_score_weight * float(results[passage.result].get("score") or 0)
+
+    def _pack(
+        self, passages: List[_Passage], results: Sequence[Dict[str, Any]], max_tokens: int
+    ) -> List[_Passage]:
+        """Greedily take the best passages that still fit the budget"""
+        chosen = []
+        used = 0
+        included: Set[int] = set()
+        for passage in sorted(passages, key=lambda p: p.score, reverse=True):
+            overhead = 2
+            if passage.result not in included:
+                result = results[passage.result]
+                # Title, URL and heading markup are paid once per source
+                overhead += estimate_tokens(f"{result.get('title', '')} {result.get('url', '')}") + 8
+            available = max_tokens - used - overhead
+            if passage.tokens > available:
+                # Keep the leading sentences of a passage that does not fit as a whole
+                passage = self._truncate(passage, available)
+                if passage is None:
+                    continue
+            used += passage.tokens + overhead
+            included.add(passage.result)
+            chosen.append(passage)
+        return chosen
+
+    def _truncate(self, passage: _Passage, max_tokens: int) -> Optional[_Passage]:
+        """Shorten a passage to its leading sentences within a token budget"""
+        if max_tokens < self.min_fragment_tokens:
+            return None
+        sentences = _SENTENCE_END.split(passage.text)
+        kept = []
+        tokens = 0
+        for sentence in sentences:
+            sentence_tokens = estimate_tokens(sentence)
+            if tokens + sentence_tokens > max_tokens:
+                break
+            kept.append(sentence)
+            tokens += sentence_tokens
+        if not kept:
+            return None
+        truncated = _Passage(passage.result, passage.position, " ".join(kept))
+        truncated.score = passage.score
+        return truncated
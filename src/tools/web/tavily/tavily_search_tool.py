@@ -1,6 +1,8 @@
 import requests
 import json
+from src.core.tokens import estimate_tokens
 from src.core.tool import Tool
+from src.tools.web.result_processor import ResultPostProcessor
 from typing import Dict, Any, Literal, Optional, List, Union
 
 import os
@@ -17,11 +19,12 @@ class TavilySearchTool(Tool):
         self,
         api_key: Optional[str] = None,
         search_mode: Literal["detailed", "context"] = "detailed",
-        max_tokens: int = 6000,
+        max_tokens: Optional[int] = None,
         include_answer: bool = True,
         search_depth: Literal["basic", "advanced"] = "advanced",
         format: Literal["json", "markdown"] = "markdown",
         max_results: int = 5,
+        post_processor: Optional[ResultPostProcessor] = None,
     ):
         """
         Initialize the Tavily search tool.
@@ -29,11 +32,13 @@ class TavilySearchTool(Tool):
         Args:
             api_key: Tavily API key (defaults to TAVILY_API_KEY environment variable)
             search_mode: Use "detailed" for structured results or "context" for raw search context
-            max_tokens: Maximum tokens in response
+            max_tokens: Maximum tokens in response (defaults to 1500 in detailed mode, about the
+                former limit of 6000 characters, and to 6000 in context mode)
             include_answer: Whether to include AI-generated answer summary
             search_depth: Search depth ("basic" or "advanced")
             format: Response format ("json" or "markdown")
             max_results: Maximum number of results to return in detailed mode
+            post_processor: Condenses detailed results into the best passages within max_tokens
         """
         # Initialize basic properties
         self._name = "tavily_search"
@@ -47,10 +52,13 @@ class TavilySearchTool(Tool):
         
         # Store configuration options
         self.search_depth = search_depth
+        if max_tokens is None:
+            max_tokens = 1500 if search_mode == "detailed" else 6000
         self.max_tokens = max_tokens
         self.include_answer = include_answer
         self.format = format
         self.max_results = max_results
+        self.post_processor = post_processor or ResultPostProcessor()
 
     @property
     def name(self) -> str:
@@ -65,6 +73,10 @@ class TavilySearchTool(Tool):
         else:
             return "Search the web for information and return raw context"
     
+    @property
+    def idempotent(self) -> bool:
+        return True
+
     @property
     def input_schema(self) -> Dict[str, Any]:
         """Get the input schema for the tool"""
@@ -163,8 +175,9 @@ class TavilySearchTool(Tool):
         if "answer" in response and self.include_answer:
             clean_response["answer"] = response["answer"]
 
-        # Process results with token limit
-        clean_results = self._process_results_with_token_limit(response.get("results", []))
+        # Process results with the token budget left after the summary
+        budget = self.max_tokens - estimate_tokens(clean_response.get("answer") or "")
+        clean_results = self._process_results_with_token_limit(query, response.get("results", []), budget)
         clean_response["results"] = clean_results
 
         # Format according to the specified output format
@@ -175,35 +188,21 @@ class TavilySearchTool(Tool):
         else:
             return json.dumps(clean_response)
 
-    def _process_results_with_token_limit(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _process_results_with_token_limit(
+        self, query: str, results: List[Dict[str, Any]], max_tokens: int
+    ) -> List[Dict[str, Any]]:
         """
         Process results while respecting token limit.
         
         Args:
+            query: The original search query
             results: List of raw result items
+            max_tokens: Token budget for the results
             
         Returns:
             List of processed result items within token limit
         """
-        clean_results = []
-        current_token_count = 0
-        
-        for result in results:
-            clean_result = {
-                "title": result["title"],
-                "url": result["url"],
-                "content": result["content"],
-                "score": result.get("score", 0),
-            }
-            
-            result_tokens = len(json.dumps(clean_result))
-            if current_token_count + result_tokens > self.max_tokens:
-                break
-                
-            current_token_count += result_tokens
-            clean_results.append(clean_result)
-            
-        return clean_results
+        return self.post_processor.process(query, results, max(max_tokens, 0))
 
     def _convert_to_markdown(self, query: str, data: Dict[str, Any]) -> str:
         """
@@ -216,20 +215,18 @@ class TavilySearchTool(Tool):
         Returns:
             Markdown formatted string
         """
-        markdown = f"# Search Results: {query}\n\n"
+        parts = [f"# Search Results: {query}\n\n"]
         
         # Add summary if available
         if "answer" in data:
-            markdown += "## Summary\n"
-            markdown += f"{data['answer']}\n\n"
+            parts.append(f"## Summary\n{data['answer']}\n\n")
             
         # Add individual results
         if data["results"]:
-            markdown += "## Sources\n\n"
+            parts.append("## Sources\n\n")
             for idx, result in enumerate(data["results"], 1):
-                markdown += f"### {idx}. [{result['title']}]({result['url']})\n"
-                markdown += f"{result['content']}\n\n"
+                parts.append(f"### {idx}. [{result['title']}]({result['url']})\n{result['content']}\n\n")
         else:
-            markdown += "No results found."
+            parts.append("No results found.")
             
-        return markdown
+        return "".join(parts)
@@ -0,0 +1,14 @@
+from .analysis import slowest_iterations, slowest_tools, tool_summary, trace_summary
+from .reader import TraceBlock, TraceReader
+from .recorder import TraceRecorder, current_run
+
+__all__ = [
+    "TraceBlock",
+    "TraceReader",
+    "TraceRecorder",
+    "current_run",
+    "slowest_iterations",
+    "slowest_tools",
+    "tool_summary",
+    "trace_summary",
+]
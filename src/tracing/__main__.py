@@ -0,0 +1,95 @@
+import argparse
+import json
+from datetime import datetime
+
+from src.tracing.analysis import slowest_iterations, slowest_tools, tool_summary, trace_summary
+from src.tracing.reader import TraceReader
+
+
+def _time(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def main(argv=None) -> None:
+    """
+    Trace file command line
+
+    Usage:
+        python -m src.tracing summary traces.bin
+        python -m src.tracing iterations traces.bin --limit 20
+        python -m src.tracing tools traces.bin [--by-name]
+        python -m src.tracing run traces.bin RUN_ID
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.tracing", description="Inspect agent run traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    summary = commands.add_parser("summary", help="Count records, runs and dropped events")
+    summary.add_argument("path")
+
+    iterations = commands.add_parser("iterations", help="List the slowest model calls")
+    iterations.add_argument("path")
+    iterations.add_argument("--limit", type=int, default=10)
+
+    tools = commands.add_parser("tools", help="List the slowest tool calls")
+    tools.add_argument("path")
+    tools.add_argument("--limit", type=int, default=10)
+    tools.add_argument("--by-name", action="store_true", help="Summarize latency per tool instead")
+
+    run = commands.add_parser("run", help="Print every record of a run")
+    run.add_argument("path")
+    run.add_argument("run_id")
+
+    for command in (summary, iterations, tools, run):
+        command.add_argument("--json", action="store_true", help="Print JSON")
+
+    args = parser.parse_args(argv)
+
+    with TraceReader(args.path) as reader:
+        if args.command == "summary":
+            result = trace_summary(reader)
+            if args.json:
+                print(json.dumps(result, indent=2))
+            else:
+                print(f"Blocks: {result['blocks']}, records: {result['records']}, runs: {result['runs']}")
+                if result["first_ts"] is not None:
+                    print(f"From {_time(result['first_ts'])} to {_time(result['last_ts'])}")
+                print(f"Records by kind: {result['kinds']}")
+                if result["dropped"]:
+                    print(f"Dropped events: {result['dropped']}")
+        elif args.command == "iterations":
+            records = slowest_iterations(reader, args.limit)
+            if args.json:
+                print(json.dumps(records, indent=2))
+            for record in [] if args.json else records:
+                usage = record.get("usage") or {}
+                print(
+                    f"{record.get('duration', 0.0):8.3f}s  run {record['run']}  iteration {record.get('iteration')}  "
+                    f"{record.get('model')}  {record.get('stop_reason')}  "
+                    f"in {usage.get('input_tokens')} / out {usage.get('output_tokens')} tokens"
+                )
+        elif args.command == "tools" and args.by_name:
+            rows = tool_summary(reader)
+            if args.json:
+                print(json.dumps(rows, indent=2))
+            for row in [] if args.json else rows:
+                print(
+                    f"{row['name']:<30} {row['calls']:6d} calls  {row['errors']:4d} errors  total {row['total']:8.3f}s  "
+                    f"p50 {row['p50']:.3f}s  p95 {row['p95']:.3f}s  max {row['max']:.3f}s"
+                )
+        elif args.command == "tools":
+            records = slowest_tools(reader, args.limit)
+            if args.json:
+                print(json.dumps(records, indent=2))
+            for record in [] if args.json else records:
+                status = " (error)" if record.get("error") else ""
+                print(
+                    f"{record.get('duration', 0.0):8.3f}s  run {record['run']}  {record['name']}{status}  "
+                    f"{json.dumps(record.get('input'))[:120]}"
+                )
+        elif args.command == "run":
+            for record in reader.records(run=args.run_id):
+                print(json.dumps(record) if args.json else f"{_time(record['ts'])}  {record['kind']:<10} {json.dumps(record)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import math
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from src.tracing.reader import TraceReader
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a sorted list"""
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def slowest_iterations(reader: TraceReader, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Find the model calls that took longest
+
+    Args:
+        reader: Trace to analyse
+        limit: Number of calls to return
+
+    Returns:
+        Response records, slowest first
+    """
+    responses = list(reader.records(kind="response"))
+    responses.sort(key=lambda record: record.get("duration", 0.0), reverse=True)
+    return responses[:limit]
+
+
+def slowest_tools(reader: TraceReader, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Find the tool calls that took longest
+
+    Args:
+        reader: Trace to analyse
+        limit: Number of calls to return
+
+    Returns:
+        Tool records, slowest first
+    """
+    calls = list(reader.records(kind="tool"))
+    calls.sort(key=lambda record: record.get("duration", 0.0), reverse=True)
+    return calls[:limit]
+
+
+def tool_summary(reader: TraceReader) -> List[Dict[str, Any]]:
+    """
+    Summarize tool latency by tool name
+
+    Returns:
+        Per tool: calls, errors, total, p50, p95 and max duration, by total time spent
+    """
+    durations: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    for record in reader.records(kind="tool"):
+        durations[record["name"]].append(record.get("duration", 0.0))
+        if record.get("error"):
+            errors[record["name"]] += 1
+
+    summary = []
+    for name, values in durations.items():
+        values.sort()
+        summary.append(
+            {
+                "name": name,
+                "calls": len(values),
+                "errors": errors[name],
+                "total": sum(values),
+                "p50": _percentile(values, 0.50),
+                "p95": _percentile(values, 0.95),
+                "max": values[-1],
+            }
+        )
+    summary.sort(key=lambda item: item["total"], reverse=True)
+    return summary
+
+
+def trace_summary(reader: TraceReader) -> Dict[str, Any]:
+    """Count blocks, records by kind, runs and dropped events"""
+    kinds: Dict[str, int] = defaultdict(int)
+    runs = set()
+    dropped = 0
+    first_ts = last_ts = None
+    for record in reader.records():
+        kinds[record["kind"]] += 1
+        if record.get("run"):
+            runs.add(record["run"])
+        if record["kind"] == "dropped":
+            dropped += record.get("count", 0)
+        first_ts = record["ts"] if first_ts is None else min(first_ts, record["ts"])
+        last_ts = record["ts"] if last_ts is None else max(last_ts, record["ts"])
+    return {
+        "blocks": len(reader.blocks),
+        "records": sum(kinds.values()),
+        "kinds": dict(kinds),
+        "runs": len(runs),
+        "dropped": dropped,
+        "first_ts": first_ts,
+        "last_ts": last_ts,
+    }
@@ -0,0 +1,48 @@
+import struct
+import zlib
+from typing import Iterator, Tuple
+
+
+# Written once at the start of a trace file
+FILE_MAGIC = b"SATRACE1"
+
+# Block header: magic, codec, payload length, record count, first and last timestamp
+BLOCK_HEADER = struct.Struct("<4sBIIdd")
+BLOCK_MAGIC = b"TBLK"
+
+# Length prefix of each record inside a block payload
+RECORD_LENGTH = struct.Struct("<I")
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+
+
+def compress(payload: bytes, codec: int, level: int = 1) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.compress(payload, level)
+    return payload
+
+
+def decompress(payload: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload)
+    if codec == CODEC_NONE:
+        return payload
+    raise ValueError(f"Unknown trace codec: {codec}")
+
+
+def scan_blocks(buffer, offset: int = len(FILE_MAGIC)) -> Iterator[Tuple[int, int, int, int, float, float]]:
+    """
+    Walk the block headers of a trace buffer, stopping at the first incomplete block
+
+    Yields:
+        Payload offset, codec, payload length, record count, first and last timestamp
+    """
+    size = len(buffer)
+    while offset + BLOCK_HEADER.size <= size:
+        magic, codec, length, count, first_ts, last_ts = BLOCK_HEADER.unpack_from(buffer, offset)
+        start = offset + BLOCK_HEADER.size
+        if magic != BLOCK_MAGIC or start + length > size:
+            return
+        yield start, codec, length, count, first_ts, last_ts
+        offset = start + length
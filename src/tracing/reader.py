@@ -0,0 +1,132 @@
+import json
+import mmap
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from src.tracing.format import FILE_MAGIC, RECORD_LENGTH, decompress, scan_blocks
+
+
+class TraceBlock:
+    """Index entry of one compressed block of a trace file"""
+
+    __slots__ = ("offset", "codec", "length", "count", "first_ts", "last_ts")
+
+    def __init__(self, offset: int, codec: int, length: int, count: int, first_ts: float, last_ts: float):
+        self.offset = offset
+        self.codec = codec
+        self.length = length
+        self.count = count
+        self.first_ts = first_ts
+        self.last_ts = last_ts
+
+
+class TraceReader:
+    """
+    Reader of trace files written by TraceRecorder
+
+    The file is memory-mapped and indexed by walking the block headers, which
+    needs no decompression; blocks are only decompressed when their records
+    are read, and blocks outside a requested time range are skipped. A block
+    cut short by a crash ends the trace.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open and index a trace file
+
+        Args:
+            path: Trace file path
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        self._map: Optional[mmap.mmap] = None
+        self.blocks: List[TraceBlock] = []
+        self._runs: Optional[Dict[str, Set[int]]] = None
+
+        size = self._file.seek(0, 2)
+        if size == 0:
+            return
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(FILE_MAGIC)] != FILE_MAGIC:
+            self.close()
+            raise ValueError(f"Not a trace file: {path}")
+        self.blocks = [TraceBlock(*entry) for entry in scan_blocks(self._map)]
+
+    def __enter__(self) -> "TraceReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return sum(block.count for block in self.blocks)
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def read_block(self, index: int) -> List[Dict[str, Any]]:
+        """Decode the records of a block"""
+        block = self.blocks[index]
+        payload = decompress(self._map[block.offset:block.offset + block.length], block.codec)
+        records = []
+        position = 0
+        while position < len(payload):
+            (length,) = RECORD_LENGTH.unpack_from(payload, position)
+            position += RECORD_LENGTH.size
+            records.append(json.loads(payload[position:position + length]))
+            position += length
+        return records
+
+    def records(
+        self,
+        kind: Optional[str] = None,
+        run: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over records in file order
+
+        Args:
+            kind: Only records of this kind
+            run: Only records of this run
+            since: Only records at or after this Unix time
+            until: Only records at or before this Unix time
+
+        Yields:
+            The matching records
+        """
+        candidates = range(len(self.blocks))
+        if run is not None:
+            candidates = sorted(self.run_index().get(run, ()))
+        for index in candidates:
+            block = self.blocks[index]
+            if (since is not None and block.last_ts < since) or (until is not None and block.first_ts > until):
+                continue
+            for record in self.read_block(index):
+                if kind is not None and record.get("kind") != kind:
+                    continue
+                if run is not None and record.get("run") != run:
+                    continue
+                if since is not None and record["ts"] < since:
+                    continue
+                if until is not None and record["ts"] > until:
+                    continue
+                yield record
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.records()
+
+    def run_index(self) -> Dict[str, Set[int]]:
+        """Get the blocks holding records of each run, built on first use"""
+        if self._runs is None:
+            runs: Dict[str, Set[int]] = defaultdict(set)
+            for index in range(len(self.blocks)):
+                for record in self.read_block(index):
+                    if record.get("run"):
+                        runs[record["run"]].add(index)
+            self._runs = dict(runs)
+        return self._runs
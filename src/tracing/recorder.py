@@ -0,0 +1,224 @@
+import atexit
+import contextvars
+import mmap
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from src.core.serialization import ResultSerializer
+from src.tracing.format import (
+    BLOCK_HEADER,
+    BLOCK_MAGIC,
+    CODEC_NONE,
+    CODEC_ZLIB,
+    FILE_MAGIC,
+    RECORD_LENGTH,
+    compress,
+    scan_blocks,
+)
+
+
+_current_run: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_run", default=None)
+
+
+def current_run() -> Optional[str]:
+    """Get the ID of the traced run in progress, if any"""
+    return _current_run.get()
+
+
+class TraceRecorder:
+    """
+    Append-only recorder of agent run traces
+
+    Recording only appends the event to a bounded ring buffer; a background
+    thread serializes buffered events, compresses them in blocks of
+    length-prefixed JSON records and appends the blocks to the trace file.
+    When the writer falls behind, the oldest buffered events are overwritten
+    and the number lost is written to the trace, so the agent loop never
+    waits on the disk.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        capacity: int = 65536,
+        block_records: int = 1024,
+        flush_interval: float = 0.5,
+        compression: bool = True,
+        level: int = 1,
+    ):
+        """
+        Initialize the recorder and start its writer thread
+
+        Args:
+            path: Trace file, appended to when it exists
+            capacity: Maximum number of buffered events
+            block_records: Maximum number of events per compressed block
+            flush_interval: Seconds between writes of buffered events
+            compression: Whether blocks are compressed with zlib
+            level: zlib compression level
+        """
+        self.path = path
+        self.capacity = capacity
+        self.block_records = block_records
+        self.flush_interval = flush_interval
+        self.codec = CODEC_ZLIB if compression else CODEC_NONE
+        self.level = level
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._drain_lock = threading.Lock()
+        # Held briefly around buffer updates, so drops are counted exactly
+        self._buffer_lock = threading.Lock()
+        self._serializer = ResultSerializer()
+        self.recorded = 0
+        self.dropped = 0
+        self._reported_drops = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(FILE_MAGIC)
+            self._file.flush()
+        else:
+            try:
+                self._truncate_incomplete_block()
+            except Exception:
+                self._file.close()
+                raise
+
+        self._thread = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _truncate_incomplete_block(self) -> None:
+        """Cut off a block left incomplete by a crash, which would hide everything appended after it"""
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[: len(FILE_MAGIC)] != FILE_MAGIC:
+                raise ValueError(f"Not a trace file: {self.path}")
+            end = len(FILE_MAGIC)
+            for start, _, length, _, _, _ in scan_blocks(data):
+                end = start + length
+            size = len(data)
+        if end < size:
+            self._file.truncate(end)
+
+    def __enter__(self) -> "TraceRecorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def record(self, kind: str, **data: Any) -> None:
+        """
+        Record an event of the current run
+
+        Values are serialized later by the writer thread, so they must not be
+        mutated after recording.
+
+        Args:
+            kind: Event kind, e.g. "request", "response" or "tool"
+            **data: Event fields
+        """
+        if self._stopped.is_set():
+            return
+        event = {"ts": time.time(), "kind": kind, "run": _current_run.get(), **data}
+        with self._buffer_lock:
+            if len(self._buffer) >= self.capacity:
+                self.dropped += 1
+            self._buffer.append(event)
+            self.recorded += 1
+            full = len(self._buffer) >= self.block_records
+        if full:
+            self._wake.set()
+
+    @contextmanager
+    def run(self, agent: str, **data: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Trace a run, recording its start and end
+
+        Runs started inside the block (e.g. by team members) record this run
+        as their parent.
+
+        Args:
+            agent: Name of the agent
+            **data: Fields of the run_start event
+
+        Yields:
+            A dict whose contents are added to the run_end event
+        """
+        run_id = uuid.uuid4().hex[:16]
+        parent = _current_run.get()
+        token = _current_run.set(run_id)
+        summary: Dict[str, Any] = {}
+        started = time.perf_counter()
+        self.record("run_start", agent=agent, parent=parent, **data)
+        try:
+            yield summary
+        except BaseException as e:
+            summary["error"] = type(e).__name__
+            raise
+        finally:
+            self.record("run_end", agent=agent, duration=time.perf_counter() - started, **summary)
+            _current_run.reset(token)
+
+    def flush(self) -> None:
+        """Write everything buffered so far"""
+        self._drain()
+
+    def close(self) -> None:
+        """Write the remaining events and stop the writer"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join()
+        self._drain()
+        self._file.close()
+        atexit.unregister(self.close)
+
+    def stats(self) -> Dict[str, int]:
+        with self._buffer_lock:
+            return {"recorded": self.recorded, "dropped": self.dropped, "buffered": len(self._buffer)}
+
+    def _write_loop(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+    def _drain(self) -> None:
+        with self._drain_lock:
+            while True:
+                with self._buffer_lock:
+                    count = min(len(self._buffer), self.block_records)
+                    events: List[Dict[str, Any]] = [self._buffer.popleft() for _ in range(count)]
+                    dropped = self.dropped - self._reported_drops
+                    self._reported_drops += dropped
+                if not events and not dropped:
+                    break
+                if dropped:
+                    events.append({"ts": time.time(), "kind": "dropped", "run": None, "count": dropped})
+                self._write_block(events)
+
+    def _write_block(self, events: List[Dict[str, Any]]) -> None:
+        records = []
+        for event in events:
+            try:
+                data = self._serializer.dumps(event).encode("utf-8")
+            except Exception as e:
+                data = self._serializer.dumps(
+                    {"ts": event["ts"], "kind": "unserializable", "run": event["run"], "error": str(e)}
+                ).encode("utf-8")
+            records.append(RECORD_LENGTH.pack(len(data)))
+            records.append(data)
+        payload = compress(b"".join(records), self.codec, self.level)
+        timestamps = [event["ts"] for event in events]
+        header = BLOCK_HEADER.pack(BLOCK_MAGIC, self.codec, len(payload), len(events), min(timestamps), max(timestamps))
+        self._file.write(header + payload)
+        self._file.flush()
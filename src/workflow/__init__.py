@@ -0,0 +1,3 @@
+from .workflow import AgentNode, FunctionNode, Node, ToolNode, Workflow, WorkflowError
+
+__all__ = ["AgentNode", "FunctionNode", "Node", "ToolNode", "Workflow", "WorkflowError"]
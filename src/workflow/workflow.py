@@ -0,0 +1,376 @@
+import contextvars
+import dataclasses
+import hashlib
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, InvalidStateError, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from src.core.deadline import Cancelled, Deadline, DeadlineExceeded, current_deadline
+from src.core.delegation import DelegationResult
+from src.core.execution import get_default_executor
+from src.core.tool import Tool
+
+
+INPUT_PREFIX = "input:"
+
+
+class WorkflowError(Exception):
+    """Raised when a workflow is invalid or one of its nodes fails"""
+
+    def __init__(self, message: str, node: Optional[str] = None, results: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.node = node
+        self.results = results or {}
+
+
+class Node(ABC):
+    """A workflow step whose arguments are wired to upstream outputs or workflow inputs"""
+
+    def __init__(self, name: str, inputs: Optional[Dict[str, str]] = None, cache: bool = True):
+        """
+        Initialize the node
+
+        Args:
+            name: Unique node name, also used to reference its output
+            inputs: Argument name to source, where a source is a node name or "input:<key>"
+            cache: Whether results are memoized on the node's resolved arguments
+        """
+        self.name = name
+        self.inputs = dict(inputs or {})
+        self.cache = cache
+
+    @property
+    def dependencies(self) -> Set[str]:
+        """Names of the upstream nodes"""
+        return {source for source in self.inputs.values() if not source.startswith(INPUT_PREFIX)}
+
+    @abstractmethod
+    def run(self, **kwargs) -> Any:
+        """Execute the node with its resolved arguments"""
+        pass
+
+
+class FunctionNode(Node):
+    """Node running a plain Python callable"""
+
+    def __init__(self, name: str, func: Callable[..., Any], inputs: Optional[Dict[str, str]] = None, cache: bool = True):
+        super().__init__(name, inputs, cache)
+        self.func = func
+
+    def run(self, **kwargs) -> Any:
+        return self.func(**kwargs)
+
+
+class ToolNode(Node):
+    """Node executing a tool under its execution policy, with fixed arguments merged with wired ones"""
+
+    def __init__(
+        self,
+        name: str,
+        tool: Tool,
+        inputs: Optional[Dict[str, str]] = None,
+        arguments: Optional[Dict[str, Any]] = None,
+        cache: bool = True,
+    ):
+        super().__init__(name, inputs, cache)
+        self.tool = tool
+        self.arguments = dict(arguments or {})
+
+    def run(self, **kwargs) -> Any:
+        return get_default_executor().execute(
+            self.tool.execute, self.tool.execution_policy, **{**self.arguments, **kwargs}
+        )
+
+
+class AgentNode(Node):
+    """Node invoking an agent with a prompt template filled from its arguments"""
+
+    def __init__(
+        self,
+        name: str,
+        agent,
+        prompt: str,
+        inputs: Optional[Dict[str, str]] = None,
+        cache: bool = True,
+    ):
+        """
+        Initialize the agent node
+
+        Args:
+            name: Unique node name
+            agent: The agent to invoke
+            prompt: Prompt template formatted with the node's arguments, e.g. "Summarize {notes}"
+            inputs: Argument name to source mapping
+            cache: Whether results are memoized on the rendered prompt
+        """
+        super().__init__(name, inputs, cache)
+        self.agent = agent
+        self.prompt = prompt
+
+    def run(self, **kwargs) -> DelegationResult:
+        rendered = {
+            key: value.text if isinstance(value, DelegationResult) and value.text is not None else value
+            for key, value in kwargs.items()
+        }
+        response = self.agent.invoke(self.prompt.format(**rendered))
+        return DelegationResult.from_response(
+            getattr(self.agent, "agent_name", self.name),
+            response,
+            structured=bool(getattr(self.agent, "output_format", None)),
+        )
+
+
+def _fingerprint(node: Node, kwargs: Dict[str, Any]) -> Optional[str]:
+    """
+    Hash a node's identity and resolved arguments for memoization
+
+    Returns:
+        The fingerprint, or None when an argument has no stable encoding and the call cannot be cached
+    """
+    if isinstance(node, AgentNode):
+        kwargs = {"__prompt__": node.prompt, **kwargs}
+    try:
+        encoded = json.dumps(kwargs, sort_keys=True, default=_encode_value)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(f"{node.name}\x00{encoded}".encode()).hexdigest()
+
+
+def _encode_value(value: Any) -> Any:
+    """Encode a value JSON cannot, so that equal values and only equal values encode alike"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {"__dataclass__": type(value).__qualname__, **dataclasses.asdict(value)}
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": hashlib.sha256(value).hexdigest()}
+    if hasattr(value, "tobytes") and hasattr(value, "shape"):
+        # Array reprs elide elements, so the contents are hashed
+        return {"__array__": [str(getattr(value, "dtype", "")), list(value.shape), hashlib.sha256(value.tobytes()).hexdigest()]}
+    # A repr naming a memory address differs per object and says nothing about equality
+    if type(value).__repr__ is not object.__repr__:
+        text = repr(value)
+        if " at 0x" not in text:
+            return {"__repr__": f"{type(value).__module__}.{type(value).__qualname__}", "value": text}
+    raise TypeError(f"{type(value).__name__} has no stable encoding")
+
+
+class Workflow:
+    """
+    Declarative DAG of agents, tools and functions
+
+    Independent branches run concurrently. Node results are memoized on their
+    resolved arguments, so re-running with a changed input only re-executes the
+    nodes downstream of the change. Arguments without a stable encoding, such
+    as objects identified only by their address, are never served from the
+    cache.
+    """
+
+    def __init__(
+        self,
+        nodes: Optional[Iterable[Node]] = None,
+        max_workers: int = 8,
+        verbose: bool = False,
+        cache_size: int = 256,
+    ):
+        """
+        Initialize the workflow
+
+        Args:
+            nodes: Initial nodes
+            max_workers: Maximum number of nodes running at the same time
+            verbose: Whether to print verbose output
+            cache_size: Maximum number of memoized node results, least recently used dropped first
+        """
+        self.nodes: Dict[str, Node] = {}
+        self.max_workers = max_workers
+        self.verbose = verbose
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        for node in nodes or []:
+            self.add(node)
+
+    def add(self, node: Node) -> Node:
+        """Add a node to the workflow"""
+        if node.name in self.nodes:
+            raise WorkflowError(f"Duplicate node name: {node.name}", node=node.name)
+        self.nodes[node.name] = node
+        return node
+
+    def function(self, name: Optional[str] = None, inputs: Optional[Dict[str, str]] = None, cache: bool = True):
+        """
+        Decorator adding a function as a node
+
+        Usage:
+            @workflow.function(inputs={"city": "input:city"})
+            def normalize(city: str) -> str:
+                ...
+        """
+
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            self.add(FunctionNode(name or func.__name__, func, inputs, cache))
+            return func
+
+        return decorator
+
+    def clear_cache(self) -> None:
+        """Drop all memoized node results"""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def _execution_order(self, targets: Optional[Iterable[str]]) -> List[str]:
+        """Validate the graph and return the nodes needed for the targets in topological order"""
+        for node in self.nodes.values():
+            for dependency in node.dependencies:
+                if dependency not in self.nodes:
+                    raise WorkflowError(f"Node {node.name} depends on unknown node {dependency}", node=node.name)
+
+        needed: Set[str] = set()
+        stack = list(targets) if targets is not None else list(self.nodes)
+        while stack:
+            name = stack.pop()
+            if name not in self.nodes:
+                raise WorkflowError(f"Unknown node: {name}", node=name)
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.nodes[name].dependencies)
+
+        order: List[str] = []
+        state: Dict[str, int] = {}
+
+        def visit(name: str) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise WorkflowError(f"Cycle detected at node {name}", node=name)
+            state[name] = 1
+            for dependency in sorted(self.nodes[name].dependencies):
+                visit(dependency)
+            state[name] = 2
+            order.append(name)
+
+        for name in sorted(needed):
+            visit(name)
+        return order
+
+    def _resolve(self, node: Node, inputs: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
+        kwargs = {}
+        for argument, source in node.inputs.items():
+            if source.startswith(INPUT_PREFIX):
+                key = source[len(INPUT_PREFIX):]
+                if key not in inputs:
+                    raise WorkflowError(f"Missing workflow input {key} for node {node.name}", node=node.name)
+                kwargs[argument] = inputs[key]
+            else:
+                kwargs[argument] = results[source]
+        return kwargs
+
+    def _run_node(self, node: Node, kwargs: Dict[str, Any]) -> Any:
+        if not node.cache:
+            return node.run(**kwargs)
+
+        key = _fingerprint(node, kwargs)
+        if key is None:
+            return node.run(**kwargs)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                if self.verbose:
+                    print(f"--- Workflow node {node.name}: cached ---")
+                return self._cache[key]
+
+        if self.verbose:
+            print(f"--- Workflow node {node.name}: running ---")
+        result = node.run(**kwargs)
+        with self._cache_lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def run(self, inputs: Optional[Dict[str, Any]] = None, targets: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Execute the workflow
+
+        Args:
+            inputs: Workflow inputs referenced as "input:<key>"
+            targets: Nodes whose results are needed (all nodes when omitted)
+
+        Returns:
+            Results of every executed node, keyed by node name
+
+        Raises:
+            WorkflowError: If the graph is invalid or a node fails; nodes that have not
+                started are cancelled and running ones are not waited for
+            DeadlineExceeded: If the current deadline passes before the workflow finishes
+            Cancelled: If the current work is cancelled
+        """
+        inputs = inputs or {}
+        deadline = current_deadline()
+        order = self._execution_order(targets)
+        remaining = {name: set(self.nodes[name].dependencies) for name in order}
+        results: Dict[str, Any] = {}
+        running: Dict[Future, str] = {}
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="workflow")
+        try:
+            while remaining or running:
+                ready = [name for name in order if name in remaining and not remaining[name]]
+                for name in ready:
+                    del remaining[name]
+                    node = self.nodes[name]
+                    kwargs = self._resolve(node, inputs, results)
+                    # The copied context carries the caller's deadline and trace run into the node
+                    context = contextvars.copy_context()
+                    running[pool.submit(context.run, self._run_node, node, kwargs)] = name
+
+                if not running:
+                    raise WorkflowError("Workflow is stuck: unresolved dependencies", results=results)
+
+                if deadline is None:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                else:
+                    done = self._wait_within(deadline, running)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except (DeadlineExceeded, Cancelled):
+                        raise
+                    except Exception as e:
+                        raise WorkflowError(f"Node {name} failed: {e}", node=name, results=results) from e
+                    for dependencies in remaining.values():
+                        dependencies.discard(name)
+        except BaseException:
+            # Running nodes cannot be interrupted; they finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+        return results
+
+    @staticmethod
+    def _wait_within(deadline: Deadline, running: Dict[Future, str]) -> Set[Future]:
+        """Wait for the first running node to finish, raising once the deadline ends"""
+        aborted: Future = Future()
+
+        def abort() -> None:
+            try:
+                aborted.set_result(None)
+            except InvalidStateError:
+                # The token and the expiry timer both fired
+                pass
+
+        remove_abort = deadline.on_abort(abort)
+        try:
+            done, _ = wait([*running, aborted], return_when=FIRST_COMPLETED)
+        finally:
+            remove_abort()
+        deadline.check()
+        done.discard(aborted)
+        return done
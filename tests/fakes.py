@@ -0,0 +1,100 @@
+"""Fake tools and a fake Messages API shared by the tests"""
+import json
+
+import anthropic
+import httpx
+
+from src.core.tool import Tool
+
+
+class RecordingTool(Tool):
+    """Tool recording its calls, idempotent or not"""
+
+    def __init__(self, name: str, idempotent: bool):
+        self._name = name
+        self._idempotent = idempotent
+        self.calls = []
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def description(self) -> str:
+        return "Records its calls"
+
+    @property
+    def idempotent(self) -> bool:
+        return self._idempotent
+
+    @property
+    def input_schema(self):
+        return {"type": "object", "properties": {"value": {"type": "string"}}}
+
+    def execute(self, value: str = ""):
+        self.calls.append(value)
+        return {"ok": value}
+
+
+def message(content, stop_reason):
+    """Message dict as returned by the API"""
+    return {
+        "id": "msg_1",
+        "type": "message",
+        "role": "assistant",
+        "model": "test-model",
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5},
+    }
+
+
+def _events(message):
+    """Server-sent events streaming a message"""
+    events = [{"type": "message_start", "message": {**message, "content": [], "stop_reason": None}}]
+    for index, block in enumerate(message["content"]):
+        if block["type"] == "tool_use":
+            events.append({"type": "content_block_start", "index": index, "content_block": {**block, "input": {}}})
+            events.append({
+                "type": "content_block_delta",
+                "index": index,
+                "delta": {"type": "input_json_delta", "partial_json": json.dumps(block["input"])},
+            })
+        else:
+            events.append({"type": "content_block_start", "index": index, "content_block": {"type": "text", "text": ""}})
+            events.append({
+                "type": "content_block_delta", "index": index, "delta": {"type": "text_delta", "text": block["text"]},
+            })
+        events.append({"type": "content_block_stop", "index": index})
+    events.append({
+        "type": "message_delta",
+        "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+        "usage": {"output_tokens": 5},
+    })
+    events.append({"type": "message_stop"})
+    return "".join(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events).encode()
+
+
+def client(messages, requests=None):
+    """Anthropic client answering with the given messages in turn, always streamed"""
+    remaining = list(messages)
+
+    def handler(request):
+        if requests is not None:
+            requests.append(json.loads(request.content))
+        return httpx.Response(
+            200, content=_events(remaining.pop(0)), headers={"content-type": "text/event-stream"}
+        )
+
+    return anthropic.Anthropic(api_key="test", http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+
+
+def text(value: str = "Done"):
+    """Final message answering with text"""
+    return message([{"type": "text", "text": value}], "end_turn")
+
+
+def tool_use(name: str, tool_input, id: str = "tu_1"):
+    """Tool use block"""
+    return {"type": "tool_use", "id": id, "name": name, "input": tool_input}
@@ -0,0 +1,22 @@
+from anthropic.types.beta import BetaMessage
+
+from fakes import message
+from src.agents.aws import AnthropicAgent, Backend, BackendPool
+
+
+def test_pool_creates_messages_on_backends_that_cannot_stream(monkeypatch):
+    bedrock = Backend.bedrock(models={"test-model": "anthropic.claude-3-5-haiku-20241022-v1:0"})
+    requests = []
+
+    def create(**request):
+        requests.append(request)
+        return BetaMessage.model_validate(message([{"type": "text", "text": "Hello"}], "end_turn"))
+
+    monkeypatch.setattr(bedrock.client.beta.messages, "create", create)
+    pool = BackendPool([bedrock])
+    agent = AnthropicAgent(agent_name="pool-test", model_id="test-model", backend_pool=pool)
+    response = agent.invoke("Hi")
+
+    assert response.content[0].text == "Hello"
+    assert [request["model"] for request in requests] == ["anthropic.claude-3-5-haiku-20241022-v1:0"]
+    assert bedrock.failures == 0
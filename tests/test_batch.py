@@ -0,0 +1,124 @@
+import io
+import json
+import threading
+import time
+
+from src.batch import BatchRunner, JsonlWriter, completed_ids, read_items
+from src.batch.__main__ import main
+
+
+class FakeAgent:
+    """Agent answering after a delay given in the prompt, e.g. "slow 0.2", or failing on "fail" """
+
+    agent_name = "fake"
+    output_format = None
+    last_stop_reason = None
+    prompts = []
+
+    def invoke(self, prompt, deadline=None, cancel_token=None):
+        FakeAgent.prompts.append(prompt)
+        if prompt == "fail":
+            raise RuntimeError("model unavailable")
+        words = prompt.split()
+        if len(words) == 2 and words[0] == "slow":
+            time.sleep(float(words[1]))
+        self.last_stop_reason = "end_turn"
+        return f"Answer to {prompt}"
+
+
+def build_fake_agent():
+    """Factory loaded by the command line test"""
+    return FakeAgent
+
+
+def _lines(*records):
+    return [record if isinstance(record, str) else json.dumps(record) for record in records]
+
+
+def _run(lines, **options):
+    written = []
+    stats = BatchRunner(FakeAgent, **options).run(read_items(lines), written.append)
+    return written, stats
+
+
+def test_ordered_output_follows_the_input():
+    lines = _lines({"id": "a", "prompt": "slow 0.3"}, {"id": "b", "prompt": "slow 0.1"}, {"id": "c", "prompt": "quick"})
+    written, stats = _run(lines, concurrency=3, ordered=True)
+    assert [record["id"] for record in written] == ["a", "b", "c"]
+    assert written[0]["text"] == "Answer to slow 0.3"
+    assert stats["completed"] == 3
+
+    written, _ = _run(lines, concurrency=3)
+    assert [record["id"] for record in written] == ["c", "b", "a"]
+
+
+def test_failures_and_unreadable_lines_are_recorded():
+    lines = _lines({"id": "a", "prompt": "fail"}, "{not json", {"id": "c"}, json.dumps("Bare prompt"), {"prompt": "x", "metadata": [1]})
+    written, stats = _run(lines, ordered=True)
+
+    assert [record["id"] for record in written] == ["a", "2", "c", "4", "5"]
+    assert written[0]["error"] == "RuntimeError: model unavailable"
+    assert written[1]["input_error"] and written[1]["error"].startswith("Invalid JSON on line 2")
+    assert written[2]["error"] == "Line 3 has no prompt"
+    assert written[3]["text"] == "Answer to Bare prompt"
+    assert written[4]["metadata"] == [1]
+    assert (stats["completed"], stats["failed"]) == (2, 3)
+
+
+def test_input_is_read_only_as_the_window_allows():
+    read = []
+    lock = threading.Lock()
+    written = []
+
+    def items():
+        for item in read_items(_lines(*({"id": str(i), "prompt": "slow 0.01"} for i in range(20)))):
+            with lock:
+                read.append(item.id)
+                # Items read but not yet written stay within the window
+                assert len(read) - len(written) <= 4
+            yield item
+
+    def write(record):
+        with lock:
+            written.append(record)
+
+    BatchRunner(FakeAgent, concurrency=2, window=4, ordered=True).run(items(), write)
+    assert [record["id"] for record in written] == [str(i) for i in range(20)]
+
+
+def test_resume_skips_answered_items_and_drops_a_torn_line(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text(
+        "\n".join(
+            _lines(
+                {"id": "a", "status": "completed", "text": "Answer"},
+                {"id": "b", "status": "error", "error": "RuntimeError: model unavailable"},
+                {"id": "3", "status": "error", "error": "Invalid JSON", "input_error": True},
+            )
+        )
+        + '\n{"id": "d", "sta',
+        encoding="utf-8",
+    )
+    assert completed_ids(output) == {"a", "3"}
+    assert output.read_text(encoding="utf-8").endswith("true}\n")
+
+    source = tmp_path / "in.jsonl"
+    source.write_text(
+        "\n".join(_lines({"id": "a", "prompt": "one"}, {"id": "b", "prompt": "two"}, "{bad", {"id": "d", "prompt": "four"})),
+        encoding="utf-8",
+    )
+    FakeAgent.prompts = []
+    main([str(source), "-o", str(output), "--agent", "test_batch:build_fake_agent", "--resume", "--ordered"])
+
+    assert FakeAgent.prompts == ["two", "four"]
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [record["id"] for record in records] == ["a", "b", "3", "b", "d"]
+    assert completed_ids(output) == {"a", "b", "3", "d"}
+
+
+def test_writer_flushes_each_record():
+    stream = io.StringIO()
+    writer = JsonlWriter(stream)
+    writer.write({"id": "a", "text": "Grüße"})
+    assert stream.getvalue() == '{"id": "a", "text": "Grüße"}\n'
+    assert writer.written == 1
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from fakes import RecordingTool, client, message, text, tool_use
+from src.agents.aws import AnthropicAgent
+from src.core.budget import BudgetController
+
+
+def _response(stop_reason, output_tokens):
+    return SimpleNamespace(stop_reason=stop_reason, usage=SimpleNamespace(output_tokens=output_tokens))
+
+
+def _trained(controller, output_tokens=100):
+    for _ in range(controller.min_samples):
+        controller.observe(1, _response("tool_use", output_tokens))
+    return controller
+
+
+def test_full_budget_uses_the_agent_limit():
+    controller = BudgetController()
+    assert controller.plan(1, limit=16000).max_tokens == 16000
+    assert controller.escalate(_trained(controller).plan(1, limit=16000), limit=16000).max_tokens == 16000
+    assert BudgetController(max_tokens=8000).full(limit=2000).max_tokens == 2000
+
+
+def test_truncated_tight_calls_raise_later_budgets():
+    controller = _trained(BudgetController())
+    budget = controller.plan(1, limit=16000)
+    assert budget.tight and budget.max_tokens == 256
+
+    for _ in range(controller.min_samples):
+        controller.observe(1, _response("max_tokens", budget.max_tokens), budget)
+    assert controller.stats()["truncations"] == controller.min_samples
+    assert controller.stats()["tool_turn_share"]["initial"] == 1.0
+    assert controller.plan(1, limit=16000).max_tokens > budget.max_tokens
+
+
+def test_agent_retries_a_truncated_tight_call_up_to_its_own_limit():
+    controller = _trained(BudgetController())
+    agent = AnthropicAgent(
+        agent_name="budget-test",
+        model_id="test-model",
+        api_key="test",
+        tools=[RecordingTool("read_value", idempotent=True)],
+        max_tokens=16000,
+        budget_controller=controller,
+    )
+    requests = []
+    agent.client = client(
+        [message([{"type": "text", "text": "Cut"}], "max_tokens"), message([tool_use("read_value", {})], "tool_use"), text()],
+        requests,
+    )
+    agent.invoke("Go")
+
+    assert [request["max_tokens"] for request in requests[:2]] == [256, 16000]
+    assert controller.stats()["retries"] == 1
+    assert controller.stats()["truncations"] == 1
@@ -0,0 +1,35 @@
+from fakes import RecordingTool, client, message
+from src.agents.aws import AnthropicAgent
+from src.core.cascade import CascadePolicy
+
+
+def test_small_model_tool_calls_wait_for_the_cascade_check():
+    reader = RecordingTool("read_value", idempotent=True)
+    cascade = CascadePolicy("small-model", criteria=[lambda response: "rejected"])
+    agent = AnthropicAgent(
+        agent_name="cascade-test", model_id="test-model", api_key="test", tools=[reader], cascade=cascade
+    )
+    call = {"type": "tool_use", "id": "tu_1", "name": "read_value", "input": {"value": "a"}}
+    agent.client = client([message([call], "tool_use"), message([{"type": "text", "text": "Done"}], "end_turn")])
+    response = agent.invoke("Go")
+
+    assert response.content[0].text == "Done"
+    assert reader.calls == []
+
+
+def test_accepted_small_model_tool_calls_run_once():
+    reader = RecordingTool("read_value", idempotent=True)
+    cascade = CascadePolicy("small-model")
+    agent = AnthropicAgent(
+        agent_name="cascade-test", model_id="test-model", api_key="test", tools=[reader], cascade=cascade
+    )
+    requests = []
+    call = {"type": "tool_use", "id": "tu_1", "name": "read_value", "input": {"value": "a"}}
+    agent.client = client(
+        [message([call], "tool_use"), message([{"type": "text", "text": "Done"}], "end_turn")], requests
+    )
+    agent.invoke("Go")
+
+    assert reader.calls == ["a"]
+    assert [request["model"] for request in requests] == ["small-model", "small-model"]
+    assert cascade.stats()["small_calls"] == 2
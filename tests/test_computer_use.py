@@ -0,0 +1,90 @@
+import base64
+import struct
+import zlib
+
+from src.tools.computer_use import ComputerTool, FramebufferBackend
+from src.tools.computer_use.backends import Frame
+from src.tools.computer_use.screenshot import ScreenshotPipeline, changed_region, downscale
+
+
+def _png(block):
+    """Decode the size and pixels of an 8-bit RGB PNG image block"""
+    data = base64.b64decode(block["source"]["data"])
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    width, height = struct.unpack(">II", data[16:24])
+    (length,) = struct.unpack(">I", data[33:37])
+    raw = zlib.decompress(data[41:41 + length])
+    rows = [raw[y * (width * 3 + 1) + 1:(y + 1) * (width * 3 + 1)] for y in range(height)]
+    return width, height, b"".join(rows)
+
+
+def test_coordinates_map_between_screenshot_and_screen():
+    backend = FramebufferBackend(width=2048, height=1536)
+    computer = ComputerTool(backend, screenshot_after_action=False)
+    assert computer.display_size == (1024, 768)
+
+    computer.execute("mouse_move", coordinate=[100, 50])
+    computer.execute("double_click")
+    computer.execute("left_click_drag", coordinate=[2000, 2000])
+
+    assert backend.events == [
+        {"type": "move", "x": 200, "y": 100},
+        {"type": "click", "x": 200, "y": 100, "button": "left", "count": 2},
+        {"type": "drag", "x": 200, "y": 100, "end_x": 2047, "end_y": 1535},
+    ]
+    assert computer.execute("cursor_position") == [{"type": "text", "text": "X=1024,Y=768"}]
+
+
+def test_invalid_actions_return_errors_without_acting():
+    backend = FramebufferBackend(width=200, height=100)
+    computer = ComputerTool(backend)
+    assert computer.execute("mouse_move")[0]["text"].startswith("Error: mouse_move requires coordinate")
+    assert computer.execute("type")[0]["text"] == "Error: type requires text"
+    assert computer.execute("scroll")[0]["text"] == "Error: Unknown action type: scroll"
+    assert backend.events == []
+
+
+def test_screenshots_send_only_what_changed():
+    backend = FramebufferBackend(width=200, height=100)
+    computer = ComputerTool(backend, pipeline=ScreenshotPipeline(max_width=100, max_height=100))
+
+    full = computer.execute("screenshot")
+    assert full[0]["text"] == "Screenshot (100x50)."
+    assert _png(full[1])[:2] == (100, 50)
+
+    unchanged = computer.execute("key", text="ctrl+s")
+    assert unchanged[1]["text"] == "The screen has not changed since the last screenshot."
+
+    backend.fill_rect(20, 20, 20, 10, (0, 0, 0))
+    region = computer.execute("type", text="hello")
+    assert "region at x=10, y=10 (10x5)" in region[1]["text"]
+    width, height, pixels = _png(region[2])
+    assert (width, height) == (10, 5)
+    assert pixels == bytes(10 * 5 * 3)
+
+    # An explicit screenshot is always the whole screen
+    assert computer.execute("screenshot")[0]["text"] == "Screenshot (100x50)."
+
+
+def test_full_frame_after_keyframe_interval():
+    pipeline = ScreenshotPipeline(max_width=40, max_height=40, keyframe_interval=2)
+    backend = FramebufferBackend(width=40, height=40)
+    pipeline.process(backend.capture())
+    texts = []
+    for step in range(3):
+        backend.fill_rect(step, 0, 1, 1, (0, 0, 0))
+        texts.append(pipeline.process(backend.capture())[0]["text"])
+    assert [text.startswith("Only part") for text in texts] == [True, True, False]
+
+
+def test_downscale_averages_pixel_blocks():
+    frame = Frame(2, 2, bytes([0, 0, 0, 200, 200, 200, 100, 100, 100, 100, 100, 100]))
+    assert downscale(frame, 1, 1).pixels == bytes([100, 100, 100])
+
+
+def test_changed_region_bounds_the_differing_pixels():
+    before = FramebufferBackend(width=10, height=10)
+    after = FramebufferBackend(width=10, height=10)
+    after.fill_rect(3, 4, 2, 3, (1, 2, 3))
+    assert changed_region(before.capture(), after.capture()) == (3, 4, 2, 3)
+    assert changed_region(before.capture(), before.capture()) is None
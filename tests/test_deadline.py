@@ -0,0 +1,53 @@
+import threading
+import time
+
+import anthropic
+import httpx
+import pytest
+
+from fakes import text
+from src.agents.aws import AnthropicAgent
+from src.core.deadline import CancellationToken, Cancelled, Deadline, resolved_deadline
+
+
+def _agent(handler):
+    agent = AnthropicAgent(agent_name="deadline-test", model_id="test-model", api_key="test", stream=False)
+    agent.client = anthropic.Anthropic(api_key="test", http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+    return agent
+
+
+def test_token_without_time_limit_keeps_the_client_timeout():
+    timeouts = []
+
+    def handler(request):
+        timeouts.append(request.extensions["timeout"])
+        return httpx.Response(200, json=text("Hello"))
+
+    _agent(handler).invoke("Hi", cancel_token=CancellationToken())
+    assert timeouts[0]["read"] is not None
+
+
+def test_cancelling_releases_a_non_streaming_request():
+    def handler(request):
+        time.sleep(2)
+        return httpx.Response(200, json=text("Hello"))
+
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel, args=("user abort",)).start()
+    started = time.monotonic()
+    with pytest.raises(Cancelled):
+        _agent(handler).invoke("Hi", cancel_token=token)
+    assert time.monotonic() - started < 1.5
+
+
+def test_resolved_children_do_not_accumulate_on_a_long_lived_token():
+    token = CancellationToken()
+    parent = Deadline(token=token)
+    for _ in range(50):
+        with resolved_deadline(parent.child(timeout=5), CancellationToken()) as deadline:
+            assert deadline is not None
+    assert len(token._callbacks) == 0
+
+    with resolved_deadline(parent, CancellationToken()) as deadline:
+        token.cancel("stop")
+        assert deadline.token.cancelled
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+
+import pytest
+
+from src.core.execution import ExecutionPolicy, ToolExecutionInterrupted, ToolExecutor, ToolTimeoutError
+
+
+def _sleep(seconds: float) -> int:
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def _fail() -> None:
+    raise ValueError("bad input")
+
+
+@pytest.fixture
+def executor():
+    executor = ToolExecutor(max_processes=2)
+    yield executor
+    executor.shutdown()
+
+
+def test_process_calls_return_results_and_raise_errors(executor):
+    policy = ExecutionPolicy("process")
+    assert executor.execute(_sleep, policy, seconds=0) != os.getpid()
+    with pytest.raises(ValueError, match="bad input"):
+        executor.execute(_fail, policy)
+
+
+def test_timeout_only_stops_the_slow_call(executor):
+    results = {}
+
+    def run_innocent():
+        results["innocent"] = executor.execute(_sleep, ExecutionPolicy("process", timeout=5), seconds=1)
+
+    innocent = threading.Thread(target=run_innocent)
+    innocent.start()
+    time.sleep(0.2)
+    with pytest.raises(ToolTimeoutError):
+        executor.execute(_sleep, ExecutionPolicy("process", timeout=0.3), seconds=10)
+    innocent.join()
+
+    assert isinstance(results["innocent"], int)
+    # The killed worker is replaced on the next call
+    assert isinstance(executor.execute(_sleep, ExecutionPolicy("process"), seconds=0), int)
+
+
+def test_idle_workers_are_reused(executor):
+    policy = ExecutionPolicy("process")
+    assert executor.execute(_sleep, policy, seconds=0) == executor.execute(_sleep, policy, seconds=0)
+
+
+def test_waiting_for_a_busy_worker_counts_toward_the_timeout():
+    executor = ToolExecutor(max_processes=1)
+    try:
+        busy = threading.Thread(
+            target=executor.execute, args=(_sleep, ExecutionPolicy("process")), kwargs={"seconds": 1}
+        )
+        busy.start()
+        time.sleep(0.3)
+        with pytest.raises(ToolTimeoutError):
+            executor.execute(_sleep, ExecutionPolicy("process", timeout=0.2), seconds=0)
+        busy.join()
+        # Without a timeout the call waits for the worker to free up
+        assert isinstance(executor.execute(_sleep, ExecutionPolicy("process"), seconds=0), int)
+    finally:
+        executor.shutdown()
+
+
+def test_shutdown_interrupts_running_calls(executor):
+    errors = []
+
+    def run():
+        try:
+            executor.execute(_sleep, ExecutionPolicy("process"), seconds=10)
+        except ToolExecutionInterrupted as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    time.sleep(0.3)
+    executor.shutdown()
+    thread.join(5)
+    assert len(errors) == 1
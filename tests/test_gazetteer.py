@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+import pytest
+
+from src.tools.weather import weather_api
+from src.tools.weather.gazetteer import Gazetteer, build_gazetteer, read_cities, read_countries
+from src.tools.weather.weather_api import WeatherAPI
+
+CITIES = [
+    ("Portland", [], "US", "OR", "Oregon", 45.5234, -122.6762, 632309),
+    ("Portland", [], "US", "ME", "Maine", 43.6615, -70.2553, 66881),
+    ("Zürich", ["Zurich"], "CH", "ZH", "Zurich", 47.3667, 8.55, 341730),
+    ("Saint Louis", [], "US", "MO", "Missouri", 38.627, -90.1994, 315685),
+    ("Frankfurt am Main", ["Frankfurt"], "DE", "HE", "Hesse", 50.1155, 8.6842, 650000),
+    ("San Diego", [], "US", "CA", "California", 32.7157, -117.1647, 1394928),
+    ("San Jose", [], "US", "CA", "California", 37.3394, -121.895, 945942),
+    ("Leon", [], "MX", "GUA", "Guanajuato", 21.1221, -101.684, 1238962),
+]
+COUNTRIES = [("US", "United States", ["USA"]), ("CH", "Switzerland", []), ("DE", "Germany", [])]
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    path = tmp_path / "gazetteer.bin"
+    build_gazetteer(CITIES, COUNTRIES, path)
+    index = Gazetteer(path)
+    yield index
+    index.close()
+
+
+def test_exact_names_and_qualifiers(gazetteer):
+    assert gazetteer.lookup("Portland").region_code == "OR"
+    assert gazetteer.lookup("Portland, ME").region_code == "ME"
+    assert gazetteer.lookup("portland, maine, usa").latitude == 43.6615
+    assert gazetteer.lookup("Portland, Germany") is None
+    assert gazetteer.lookup("zurich, Switzerland").name == "Zürich"
+    place = gazetteer.lookup("St. Louis")
+    assert (place.name, place.match) == ("Saint Louis", "exact")
+
+
+def test_approximate_matches_only_when_unambiguous(gazetteer):
+    assert gazetteer.lookup("San Die").match == "prefix"
+    assert gazetteer.lookup("San") is None
+    place = gazetteer.lookup("Frankfrt am Main")
+    assert (place.name, place.match) == ("Frankfurt am Main", "fuzzy")
+    # Short names are too often another real place one letter away
+    assert gazetteer.lookup("Lyon") is None
+    assert gazetteer.lookup("San Die", approximate=False) is None
+
+
+def test_bundled_data_builds_and_resolves_countries():
+    index = Gazetteer(build_gazetteer(read_cities(), read_countries()))
+    assert len(index) > 0
+    assert index.country_code("United States") == "US"
+    assert index.lookup("Paris, France").country == "FR"
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+@pytest.fixture
+def nominatim(monkeypatch):
+    queries = []
+
+    def get(url, params=None, headers=None, timeout=None):
+        queries.append(params["q"])
+        return _Response([{"lat": "50.2", "lon": "-84.9"}])
+
+    monkeypatch.setattr(weather_api.requests, "get", get)
+    monkeypatch.setattr(WeatherAPI, "NOMINATIM_INTERVAL", 0.0)
+    monkeypatch.setattr(WeatherAPI, "_nominatim_cache", OrderedDict())
+    return queries
+
+
+def test_exact_matches_skip_nominatim(gazetteer, nominatim):
+    api = WeatherAPI(gazetteer=gazetteer)
+    assert api.get_coordinates("Frankfurt") == {"latitude": 50.1155, "longitude": 8.6842}
+    assert nominatim == []
+
+
+def test_approximate_matches_fall_back_to_nominatim_once(gazetteer, nominatim):
+    api = WeatherAPI(gazetteer=gazetteer)
+    # A typo match could be a place the gazetteer does not list
+    assert api.get_coordinates("Frankfort") == {"latitude": 50.2, "longitude": -84.9}
+    assert api.get_coordinates("frankfort") == {"latitude": 50.2, "longitude": -84.9}
+    assert nominatim == ["Frankfort"]
+
+    assert WeatherAPI(offline_geocoding=False).get_coordinates("Frankfurt")["latitude"] == 50.2
+    assert nominatim == ["Frankfort", "Frankfurt"]
@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+
+from src.core.deadline import Cancelled
+from src.core.delegation import record_usage
+from src.jobs import LeaseLostError, SQLiteJobQueue, Worker
+
+
+class Usage:
+    def __init__(self, input_tokens, output_tokens):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+
+class Response:
+    stop_reason = "end_turn"
+
+    def __init__(self, text):
+        self.content = [type("Block", (), {"type": "text", "text": text})()]
+        self.usage = Usage(10, 5)
+
+
+class FakeAgent:
+    """Agent answering after the given number of model calls, optionally waiting to be cancelled"""
+
+    agent_name = "fake"
+    output_format = None
+
+    def __init__(self, calls=1, block=False, fail=False):
+        self.calls = calls
+        self.block = block
+        self.fail = fail
+        self.tokens = []
+
+    def invoke(self, prompt, deadline=None, cancel_token=None):
+        self.tokens.append(cancel_token)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        if self.block:
+            if not cancel_token.wait(5):
+                raise AssertionError("job was not aborted")
+            raise Cancelled(cancel_token.reason)
+        for _ in range(self.calls):
+            record_usage(Usage(10, 5))
+        return Response(f"Answer to {prompt}")
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / "jobs.db"))
+
+
+def test_lease_hides_a_job_until_it_expires(queue):
+    job_id = queue.enqueue({"prompt": "hi"})
+    job = queue.lease("worker-1", visibility_timeout=0.2)
+
+    assert job.id == job_id and job.attempts == 1 and job.status == "leased"
+    assert queue.lease("worker-2", visibility_timeout=0.2) is None
+    time.sleep(0.3)
+    taken_over = queue.lease("worker-2", visibility_timeout=10)
+    assert taken_over.id == job_id and taken_over.attempts == 2
+
+    with pytest.raises(LeaseLostError):
+        queue.complete(job_id, "worker-1", {"text": "late"})
+    queue.complete(job_id, "worker-2", {"text": "done"})
+    assert queue.get(job_id).result == {"text": "done"}
+
+
+def test_failed_jobs_are_retried_until_attempts_run_out(queue):
+    job_id = queue.enqueue({"prompt": "hi"}, max_attempts=2)
+    queue.fail(queue.lease("w", 10).id, "w", "first")
+    assert queue.get(job_id).status == "queued"
+    queue.fail(queue.lease("w", 10).id, "w", "second")
+
+    job = queue.get(job_id)
+    assert job.status == "failed" and job.error == "second"
+    assert queue.stats() == {"queued": 0, "leased": 0, "completed": 0, "failed": 1}
+
+
+def test_expired_lease_without_attempts_left_fails_the_job(queue):
+    job_id = queue.enqueue({"prompt": "hi"}, max_attempts=1)
+    queue.lease("w", visibility_timeout=0.1)
+    time.sleep(0.2)
+
+    assert queue.lease("w", visibility_timeout=10) is None
+    assert queue.get(job_id).status == "failed"
+
+
+def test_worker_completes_jobs_with_the_usage_of_the_whole_run(queue):
+    job_id = queue.enqueue({"prompt": "hi"})
+    worker = Worker(queue, lambda: FakeAgent(calls=3))
+
+    assert worker.run_forever(exit_when_empty=True) == 1
+    job = queue.get(job_id)
+    assert job.status == "completed"
+    assert job.result["text"] == "Answer to hi"
+    assert job.result["usage"] == {"input_tokens": 30, "output_tokens": 15}
+
+
+def test_worker_schedules_failed_jobs_for_retry(queue):
+    job_id = queue.enqueue({"prompt": "hi"}, max_attempts=2)
+    worker = Worker(queue, lambda: FakeAgent(fail=True), retry_delay=60)
+    worker.process_one()
+
+    job = queue.get(job_id)
+    assert job.status == "queued"
+    assert job.error == "RuntimeError: model unavailable"
+    # The retry is delayed
+    assert queue.lease("w", 10) is None
+
+
+def test_worker_aborts_a_job_whose_lease_is_lost(queue):
+    job_id = queue.enqueue({"prompt": "hi"})
+    agent = FakeAgent(block=True)
+    worker = Worker(queue, lambda: agent, visibility_timeout=0.3)
+
+    def steal():
+        # Let the lease expire under the worker and take the job over
+        queue._connection().execute("UPDATE jobs SET lease_owner = 'thief' WHERE id = ?", (job_id,))
+        queue._connection().commit()
+
+    threading.Timer(0.05, steal).start()
+    started = time.monotonic()
+    worker.process_one()
+
+    assert agent.tokens[0].cancelled
+    assert "Lost lease" in agent.tokens[0].reason
+    assert time.monotonic() - started < 2
+    assert queue.get(job_id).lease_owner == "thief"
+
+
+def test_worker_aborts_a_job_when_the_heartbeat_fails(queue, capsys):
+    queue.enqueue({"prompt": "hi"})
+    agent = FakeAgent(block=True)
+    worker = Worker(queue, lambda: agent, visibility_timeout=0.3)
+
+    def broken_extend(*args):
+        raise OSError("disk full")
+
+    queue.extend = broken_extend
+    worker.process_one()
+
+    assert "Heartbeat failed: OSError: disk full" == agent.tokens[0].reason
+    assert "Heartbeat of job" in capsys.readouterr().err
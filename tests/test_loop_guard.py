@@ -0,0 +1,84 @@
+from fakes import RecordingTool, client, message, text, tool_use
+from src.agents.aws import AnthropicAgent
+from src.core.loop_guard import ToolCallGuard
+from src.tools.computer_use import ComputerTool, FramebufferBackend
+
+
+def _turns(*calls):
+    """One tool use turn per call, then a final answer"""
+    turns = [message([tool_use(name, tool_input, f"tu_{i}")], "tool_use") for i, (name, tool_input) in enumerate(calls)]
+    return turns + [text()]
+
+
+def _tool_results(request):
+    return [block for block in request["messages"][-1]["content"] if block["type"] == "tool_result"]
+
+
+def test_repeated_idempotent_call_is_answered_from_the_earlier_result():
+    reader = RecordingTool("read_value", idempotent=True)
+    agent = AnthropicAgent(agent_name="guard-test", model_id="test-model", api_key="test", tools=[reader])
+    requests = []
+    agent.client = client(_turns(("read_value", {"value": "a"}), ("read_value", {"value": "a"})), requests)
+    agent.invoke("Go")
+
+    assert reader.calls == ["a"]
+    repeated = _tool_results(requests[2])[0]["content"]
+    assert repeated.startswith('{"ok":"a"}')
+    assert "You already called read_value" in repeated
+
+
+def test_side_effecting_calls_always_run():
+    backend = FramebufferBackend(width=200, height=100)
+    computer = ComputerTool(backend, screenshot_after_action=False)
+    agent = AnthropicAgent(agent_name="guard-test", model_id="test-model", api_key="test", tools=[computer])
+    requests = []
+    agent.client = client(
+        _turns(
+            ("computer", {"action": "mouse_move", "coordinate": [10, 10]}),
+            ("computer", {"action": "left_click"}),
+            ("computer", {"action": "mouse_move", "coordinate": [10, 10]}),
+            ("computer", {"action": "left_click"}),
+            ("computer", {"action": "screenshot"}),
+            ("computer", {"action": "screenshot"}),
+        ),
+        requests,
+    )
+    agent.invoke("Click twice")
+
+    assert [event["type"] for event in backend.events] == ["move", "click", "move", "click"]
+    assert agent.last_stop_reason == "end_turn"
+    # A repeated screenshot is taken again and stays a native image block
+    content = _tool_results(requests[-1])[0]["content"]
+    assert "image" in [block["type"] for block in content]
+
+
+def test_consecutive_side_effecting_repeats_stop_the_run():
+    writer = RecordingTool("write_value", idempotent=False)
+    agent = AnthropicAgent(
+        agent_name="guard-test", model_id="test-model", api_key="test", tools=[writer], max_repeated_tool_calls=2
+    )
+    agent.client = client(_turns(*[("write_value", {"value": "b"})] * 4))
+    agent.invoke("Go")
+
+    assert writer.calls == ["b"] * 4
+    assert agent.last_stop_reason.startswith("Stopped after 3 repeats of the same write_value call")
+
+
+def test_interleaved_side_effecting_repeats_do_not_stop_the_run():
+    guard = ToolCallGuard(max_repeats=1)
+    for _ in range(3):
+        for action in ("mouse_move", "left_click"):
+            assert guard.lookup("computer", {"action": action}) == (False, None)
+            guard.record("computer", {"action": action}, "ok")
+    assert not guard.exceeded
+
+
+def test_idempotent_repeats_count_across_the_run():
+    guard = ToolCallGuard(max_repeats=1)
+    guard.lookup("read_value", {"value": "a"}, reuse=True)
+    guard.record("read_value", {"value": "a"}, "a")
+    for value in ("b", "a", "b", "a"):
+        guard.lookup("read_value", {"value": value}, reuse=True)
+        guard.record("read_value", {"value": value}, value)
+    assert guard.lookup("read_value", {"value": "b"}, reuse=True) == (True, "b")
+    assert guard.exceeded
@@ -0,0 +1,38 @@
+import time
+
+from src.memory import VectorMemory
+
+
+def _log_lines(memory):
+    with open(memory._entries_path, encoding="utf-8") as f:
+        return f.readlines()
+
+
+def test_unchanged_refreshes_are_not_logged(tmp_path):
+    memory = VectorMemory(path=str(tmp_path))
+    for _ in range(5):
+        memory.add("Oslo is sunny", kind="answer")
+    assert len(memory) == 1
+    assert len(_log_lines(memory)) == 1
+
+    memory.add("Oslo is sunny", kind="answer", metadata={"source": "weather"})
+    assert len(_log_lines(memory)) == 2
+    assert VectorMemory(path=str(tmp_path)).search("Oslo sunny")[0][1].metadata == {"source": "weather"}
+
+
+def test_stale_refreshes_are_logged(tmp_path):
+    memory = VectorMemory(path=str(tmp_path), max_age=100)
+    entry = memory.add("Oslo is sunny", kind="answer")
+    entry.created_at -= 50
+    memory._logged_at[entry.digest] -= 50
+    memory.add("Oslo is sunny", kind="answer")
+    assert len(_log_lines(memory)) == 2
+
+
+def test_entries_expire_by_default():
+    memory = VectorMemory()
+    assert memory.max_age is not None
+    entry = memory.add("Oslo is sunny", kind="answer")
+    assert memory.search("Oslo sunny")
+    entry.created_at = time.time() - memory.max_age - 1
+    assert memory.search("Oslo sunny") == []
@@ -0,0 +1,56 @@
+from src.tools.web.result_processor import ResultPostProcessor
+
+
+def _clean(query, *contents):
+    return ResultPostProcessor()._remove_boilerplate(list(contents), set(query.split()))
+
+
+def test_site_chrome_lines_are_removed():
+    content = "\n".join(
+        [
+            "Home > News > World",
+            "Accept all cookies",
+            "We use cookies to improve your experience.",
+            "Subscribe now!",
+            "© 2024 Example Media Inc.",
+            "Copyright 2023 Example Media. All rights reserved.",
+            "Skip to main content",
+            "The river flooded the valley overnight.",
+        ]
+    )
+    assert _clean("flood", content) == ["The river flooded the valley overnight."]
+
+
+def test_prose_mentioning_boilerplate_words_is_kept():
+    lines = [
+        "The court ruled in the copyright case on Monday.",
+        "The CEO resigned after the board vote / investors cheered.",
+        "Readers can subscribe to the print edition at any newsstand.",
+        "Population / 2.1M",
+    ]
+    assert _clean("weather", "\n".join(lines)) == ["\n".join(lines)]
+
+
+def test_lines_matching_the_query_are_never_dropped():
+    cleaned = _clean("cookies", "Accept all cookies\nOther text here.", "Accept all cookies")
+    assert cleaned == ["Accept all cookies\nOther text here.", "Accept all cookies"]
+
+
+def test_repeated_short_lines_are_kept_where_they_first_appear():
+    assert _clean("height", "Built in 1889.", "Built in 1889.\nIt is 330 m tall.") == [
+        "Built in 1889.",
+        "It is 330 m tall.",
+    ]
+
+
+def test_process_keeps_the_ruling_for_a_copyright_query():
+    results = [
+        {
+            "title": "Ruling",
+            "url": "https://example.com/ruling",
+            "content": "News > Courts\nThe court ruled in the copyright case on Monday.\n© 2024 Example News",
+            "score": 0.9,
+        }
+    ]
+    processed = ResultPostProcessor().process("copyright case ruling", results, max_tokens=200)
+    assert processed[0]["content"] == "The court ruled in the copyright case on Monday."
@@ -0,0 +1,34 @@
+from fakes import client, message, text, tool_use
+from src.agents.aws import AnthropicAgent
+from src.core.router import TeamRouter
+
+
+def _team(router):
+    weather = AnthropicAgent(agent_name="weather", model_id="test-model", api_key="test", system_prompt="Forecasts.")
+    trains = AnthropicAgent(agent_name="trains", model_id="test-model", api_key="test", system_prompt="Timetables.")
+    manager = AnthropicAgent(
+        agent_name="manager", model_id="test-model", api_key="test", team=[weather, trains], router=router
+    )
+    return manager, weather, trains
+
+
+def test_rules_match_whole_words_only():
+    router = TeamRouter(rules={"weather": ["rain"], "trains": ["train"]})
+    manager, _, _ = _team(router)
+    assert router.route("Will it rain in Oslo?", manager) == 0
+    assert router.route("When does the next train leave?", manager) == 1
+    assert router._match_rules("Is the training over?", manager) is None
+
+
+def test_delegations_train_on_the_user_prompt():
+    router = TeamRouter(threshold=1.1)
+    manager, weather, _ = _team(router)
+    weather.client = client([text("Sunny")])
+    manager.client = client([
+        message([tool_use("delegate_to_team", {"task": "Give the forecast for Oslo", "agent_idx": 0})], "tool_use"),
+        text(),
+    ])
+    manager.invoke("Umbrella needed tomorrow?")
+
+    assert router._term_counts[0]["umbrella"] == 1
+    assert router._term_counts[0]["forecast"] == 0
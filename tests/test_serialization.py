@@ -0,0 +1,71 @@
+import dataclasses
+import json
+
+from fakes import client, message, text, tool_use
+from src.agents.aws import AnthropicAgent
+from src.core.serialization import TRUNCATION_MARKER, ResultSerializer, image_block, text_block
+from src.core.tool import Tool
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+
+def test_scalars_blocks_and_objects():
+    serializer = ResultSerializer()
+    assert serializer.serialize("plain") == "plain"
+    assert serializer.serialize(True) == "True"
+    assert serializer.serialize(3) == "3"
+
+    blocks = [text_block("Chart"), image_block(b"png")]
+    assert serializer.serialize(blocks) is blocks
+
+    encoded = serializer.serialize({"point": Point(1, 2), "tags": {"a"}, "raw": b"\xff"})
+    assert json.loads(encoded) == {"point": {"x": 1, "y": 2}, "tags": ["a"], "raw": "/w=="}
+
+
+def test_large_results_are_cut_at_the_limit():
+    serializer = ResultSerializer(max_chars=50, stream_threshold=10)
+    result = serializer.serialize(list(range(10000)))
+    assert result.endswith(TRUNCATION_MARKER)
+    assert len(result) == 50 + len(TRUNCATION_MARKER)
+    assert serializer.serialize("x" * 60) == "x" * 50 + TRUNCATION_MARKER
+
+
+def test_registered_converters_apply_to_subclasses():
+    class Special(Point):
+        pass
+
+    serializer = ResultSerializer()
+    serializer.register(Point, lambda point: [text_block(f"{point.x},{point.y}")])
+    assert serializer.serialize(Special(3, 4)) == [{"type": "text", "text": "3,4"}]
+
+
+class ChartTool(Tool):
+    @property
+    def name(self) -> str:
+        return "chart"
+
+    @property
+    def description(self) -> str:
+        return "Draws a chart"
+
+    @property
+    def input_schema(self):
+        return {"type": "object", "properties": {}}
+
+    def execute(self):
+        return [text_block("Chart"), image_block(b"png")]
+
+
+def test_content_block_results_are_sent_natively():
+    agent = AnthropicAgent(agent_name="serializer-test", model_id="test-model", api_key="test", tools=[ChartTool()])
+    requests = []
+    agent.client = client([message([tool_use("chart", {})], "tool_use"), text()], requests)
+    agent.invoke("Draw")
+
+    result = requests[1]["messages"][-1]["content"][0]
+    assert result["type"] == "tool_result"
+    assert [block["type"] for block in result["content"]] == ["text", "image"]
@@ -0,0 +1,45 @@
+import anthropic
+from anthropic.types.beta import BetaMessage
+
+from fakes import RecordingTool, client, message
+from src.agents.aws import AnthropicAgent, AnthropicBedrockAgent
+
+
+def test_bedrock_agent_falls_back_to_create_without_beta_stream(monkeypatch):
+    agent = AnthropicBedrockAgent(agent_name="bedrock-test", model_id="anthropic.claude-3-5-haiku-20241022-v1:0")
+    assert isinstance(agent.client, anthropic.AnthropicBedrock)
+    assert agent.stream
+    assert not hasattr(agent.client.beta.messages, "stream")
+
+    requests = []
+
+    def create(**request):
+        requests.append(request)
+        return BetaMessage.model_validate(message([{"type": "text", "text": "Hello"}], "end_turn"))
+
+    monkeypatch.setattr(agent.client.beta.messages, "create", create)
+    response = agent.invoke("Hi")
+
+    assert response.content[0].text == "Hello"
+    assert len(requests) == 1
+
+
+def test_side_effecting_tools_wait_for_tool_use_stop_reason():
+    reader = RecordingTool("read_value", idempotent=True)
+    writer = RecordingTool("write_value", idempotent=False)
+    agent = AnthropicAgent(agent_name="stream-test", model_id="test-model", api_key="test", tools=[reader, writer])
+    calls = [
+        {"type": "tool_use", "id": "tu_1", "name": "read_value", "input": {"value": "a"}},
+        {"type": "tool_use", "id": "tu_2", "name": "write_value", "input": {"value": "b"}},
+    ]
+    # A turn cut short by max_tokens must not run the side-effecting call
+    agent.client = client([message(calls, "max_tokens")])
+    agent.invoke("Go")
+    assert writer.calls == []
+
+    reader.calls.clear()
+    agent.client = client([message(calls, "tool_use"), message([{"type": "text", "text": "Done"}], "end_turn")])
+    response = agent.invoke("Go")
+    assert response.content[0].text == "Done"
+    assert reader.calls == ["a"]
+    assert writer.calls == ["b"]
@@ -0,0 +1,65 @@
+import pytest
+
+from fakes import RecordingTool, client, text
+from src.agents.aws import AgentTemplate
+from src.tools.registry import ToolRegistry
+
+
+def _template(**options):
+    return AgentTemplate(
+        agent_name="template-test",
+        model_id="test-model",
+        api_key="test",
+        system_prompt="You read values.",
+        tools=[RecordingTool("read_value", idempotent=True)],
+        **options,
+    )
+
+
+def test_overrides_and_assignments_stay_on_their_agent():
+    template = _template()
+    small = template.create(max_tokens=256, agent_name="small")
+    default = template.create()
+    assert (small.max_tokens, small.agent_name) == (256, "small")
+    assert (default.max_tokens, default.agent_name) == (4096, "template-test")
+
+    small.verbose = True
+    small.max_iterations = 1
+    assert not default.verbose
+    assert default.max_iterations == 10
+    assert template.create().max_iterations == 10
+
+
+def test_options_that_need_recompiling_cannot_be_overridden():
+    with pytest.raises(ValueError, match="system_prompt"):
+        _template().create(system_prompt="Other")
+
+
+def test_agents_share_the_client_and_the_compiled_payload():
+    requests = []
+    shared = client([text("One"), text("Two")], requests)
+    template = AgentTemplate(
+        agent_name="template-test",
+        model_id="test-model",
+        client=shared,
+        system_prompt="You read values.",
+        tools=[RecordingTool("read_value", idempotent=True)],
+    )
+    first, second = template.create(), template.create(max_tokens=512)
+    assert first.client is second.client is template.client is shared
+    assert first._compiled_payload() == second._compiled_payload()
+
+    # Tools registered afterwards do not change the template's payload
+    names = [tool["name"] for tool in first._compiled_payload()[1]]
+    ToolRegistry().register(RecordingTool("template_late_tool", idempotent=False))
+    try:
+        assert [tool["name"] for tool in first._compiled_payload()[1]] == names
+        assert [tool["name"] for tool in template.create()._compiled_payload()[1]] == names
+    finally:
+        ToolRegistry().unregister("template_late_tool")
+
+    assert first.invoke("Hi").content[0].text == "One"
+    assert second.invoke("Hi").content[0].text == "Two"
+    assert [request["max_tokens"] for request in requests] == [4096, 512]
+    assert requests[0]["messages"][0] == requests[1]["messages"][0]
+    assert [tool["name"] for tool in requests[1]["tools"]] == names
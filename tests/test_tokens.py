@@ -0,0 +1,82 @@
+import base64
+import struct
+
+import pytest
+
+from fakes import client, text
+from src.agents.aws import AnthropicAgent
+from src.core.serialization import image_block
+from src.core.tokens import (
+    DEFAULT_IMAGE_TOKENS,
+    MAX_IMAGE_PIXELS,
+    IMAGE_PIXELS_PER_TOKEN,
+    ContextWindowExceeded,
+    TokenEstimator,
+    estimate_tokens,
+    image_size,
+    image_tokens,
+    truncate_to_tokens,
+)
+from src.tools.computer_use.backends import Frame
+from src.tools.computer_use.screenshot import encode_png
+
+
+def test_estimate_tokens_by_piece():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("The cat sat.") == 4
+    # Long words split into pieces of about four characters, digits into threes
+    assert estimate_tokens("internationalization") == 5
+    assert estimate_tokens("1234567") == 3
+    assert estimate_tokens("日本語です") == 5
+    assert truncate_to_tokens("one two three four", 2) == "one two"
+    assert truncate_to_tokens("short", 10) == "short"
+
+
+def test_image_sizes_are_read_from_headers():
+    png = encode_png(Frame(30, 20, bytes(30 * 20 * 3)))
+    gif = b"GIF89a" + struct.pack("<HH", 640, 480) + b"\x00" * 8
+    jpeg = b"\xff\xd8" + b"\xff\xe0\x00\x04\x00\x00" + b"\xff\xc0\x00\x11\x08" + struct.pack(">HH", 600, 800) + b"\x00" * 8
+    assert image_size(png) == (30, 20)
+    assert image_size(gif) == (640, 480)
+    assert image_size(jpeg) == (800, 600)
+    assert image_size(b"not an image") is None
+
+
+def test_images_are_scaled_before_counting():
+    assert image_tokens(200, 200) == 54
+    # Large images are scaled down to the pixel and edge limits first
+    assert image_tokens(4000, 4000) == image_tokens(8000, 8000) == -(-MAX_IMAGE_PIXELS // IMAGE_PIXELS_PER_TOKEN)
+    # A long strip is scaled to the edge limit, 1568 by 15.68 pixels
+    assert image_tokens(10000, 100) == 33
+
+    estimator = TokenEstimator()
+    png = encode_png(Frame(300, 300, bytes(300 * 300 * 3)))
+    assert estimator.image(image_block(png)["source"]) == 120
+    assert estimator.image({"type": "url", "url": "https://example.com/a.png"}) == DEFAULT_IMAGE_TOKENS
+    assert estimator.image({"type": "base64", "data": base64.b64encode(b"junk").decode()}) == DEFAULT_IMAGE_TOKENS
+
+
+def test_estimates_are_calibrated_per_model():
+    estimator = TokenEstimator(min_samples=3)
+    request = {"model": "test-model", "messages": [{"role": "user", "content": "The cat sat."}]}
+    raw = estimator.raw(request)
+    assert estimator.estimate(request) == raw
+    assert estimator.upper_bound(request) == -(-raw * 5 // 4)
+
+    for actual in (2 * raw, 2 * raw, 3 * raw):
+        estimator.observe("test-model", raw, {"input_tokens": actual})
+    assert estimator.estimate(request) == 2 * raw
+    assert estimator.upper_bound(request) == 3 * raw
+    assert estimator.estimate({**request, "model": "other-model"}) == raw
+
+
+def test_agent_limits_output_to_the_context_window():
+    estimator = TokenEstimator(context_window=2000)
+    agent = AnthropicAgent(agent_name="tokens-test", model_id="test-model", api_key="test", token_estimator=estimator)
+    requests = []
+    agent.client = client([text()], requests)
+    agent.invoke("Hi")
+    assert requests[0]["max_tokens"] < 2000
+
+    with pytest.raises(ContextWindowExceeded):
+        agent.invoke("word " * 5000)
@@ -0,0 +1,99 @@
+import json
+
+from fakes import RecordingTool, client, message, text, tool_use
+from src.agents.aws import AnthropicAgent
+from src.tools.program import ToolProgramTool
+
+
+class FakeRegistry:
+    """Registry of plain functions, recording the calls in order"""
+
+    def __init__(self, **tools):
+        self.tools = tools
+        self.calls = []
+
+    def has_tool(self, name):
+        return name in self.tools
+
+    def execute_tool(self, name, **tool_input):
+        self.calls.append((name, tool_input))
+        return self.tools[name](**tool_input)
+
+
+def _registry():
+    return FakeRegistry(
+        geocode=lambda city: {"results": [{"name": city, "lat": 59.9}]},
+        weather=lambda lat, label: {"temp": 4, "label": label, "lat": lat},
+        fail=lambda: {"error": "service down"},
+        echo=lambda value: value,
+    )
+
+
+def test_steps_receive_the_results_they_reference():
+    registry = _registry()
+    program = ToolProgramTool(registry)
+    report = program.execute(
+        [
+            {"id": "forecast", "tool": "weather", "input": {"lat": "$geo.results.0.lat", "label": "In ${geo.results.0.name}"}},
+            {"id": "geo", "tool": "geocode", "input": {"city": "Oslo"}},
+        ],
+        outputs=["forecast"],
+    )
+
+    assert report == {"results": {"forecast": {"temp": 4, "label": "In Oslo", "lat": 59.9}}}
+    assert [name for name, _ in registry.calls] == ["geocode", "weather"]
+
+
+def test_failed_steps_skip_their_dependents_only():
+    program = ToolProgramTool(_registry())
+    report = program.execute([
+        {"id": "down", "tool": "fail", "input": {}},
+        {"id": "after", "tool": "echo", "input": {"value": "$down"}},
+        {"id": "later", "tool": "echo", "input": {"value": "${after}"}},
+        {"id": "other", "tool": "echo", "input": {"value": "ok"}},
+        {"id": "missing", "tool": "echo", "input": {"value": "$other.nothing"}},
+    ])
+
+    assert report["results"] == {"other": "ok"}
+    assert report["errors"] == {"down": "service down", "missing": "$other.nothing not found in the result of step other"}
+    assert report["skipped"] == ["after", "later"]
+
+
+def test_invalid_programs_are_rejected_before_running():
+    registry = _registry()
+    program = ToolProgramTool(registry)
+    cycle = program.execute([
+        {"id": "a", "tool": "echo", "input": {"value": "$b"}},
+        {"id": "b", "tool": "echo", "input": {"value": "$a"}},
+    ])
+    assert cycle["error"].startswith("Invalid tool program: steps reference each other in a cycle")
+    unknown = program.execute([{"id": "a", "tool": "nope", "input": {}}])
+    assert unknown == {"error": "Invalid tool program: step a uses unknown tool nope"}
+    nested = program.execute([{"id": "a", "tool": ToolProgramTool.NAME, "input": {}}])
+    assert nested == {"error": "Invalid tool program: programs cannot run other programs"}
+    assert registry.calls == []
+
+
+def test_names_that_are_not_steps_stay_literal():
+    program = ToolProgramTool(_registry())
+    report = program.execute([{"id": "a", "tool": "echo", "input": {"value": "echo ${HOME} $PATH"}}])
+    assert report == {"results": {"a": "echo ${HOME} $PATH"}}
+
+
+def test_agent_runs_program_steps_with_its_own_tools():
+    reader = RecordingTool("read_value", idempotent=True)
+    agent = AnthropicAgent(
+        agent_name="program-test", model_id="test-model", api_key="test", tools=[reader], tool_programs=True
+    )
+    steps = [
+        {"id": "first", "tool": "read_value", "input": {"value": "a"}},
+        {"id": "second", "tool": "read_value", "input": {"value": "$first.ok"}},
+    ]
+    requests = []
+    agent.client = client([message([tool_use(ToolProgramTool.NAME, {"steps": steps})], "tool_use"), text()], requests)
+    agent.invoke("Read twice")
+
+    assert ToolProgramTool.NAME in [tool["name"] for tool in requests[0]["tools"]]
+    assert reader.calls == ["a", "a"]
+    result = requests[1]["messages"][-1]["content"][0]["content"]
+    assert json.loads(result)["results"] == {"first": {"ok": "a"}, "second": {"ok": "a"}}
@@ -0,0 +1,52 @@
+import json
+
+from fakes import RecordingTool, client, message, text, tool_use
+from src.agents.aws import AnthropicAgent
+from src.tools.program import ToolProgramTool
+from src.tools.selection import BM25ToolSelector, ToolSearchTool
+
+
+class RecordingSelector(BM25ToolSelector):
+    """Selector recording the catalogs it ranks"""
+
+    def __init__(self):
+        super().__init__(top_k=2)
+        self.ranked = []
+
+    def rank(self, query, tools):
+        self.ranked.append([tool["name"] for tool in tools])
+        return super().rank(query, tools)
+
+
+def test_find_tools_is_only_sent_to_agents_with_a_selector():
+    searching = AnthropicAgent(
+        agent_name="search-test", model_id="test-model", api_key="test", tool_selector=BM25ToolSelector()
+    )
+    plain = AnthropicAgent(agent_name="plain-test", model_id="test-model", api_key="test")
+
+    assert ToolSearchTool.NAME in [tool["name"] for tool in searching.tool_catalog()]
+    assert ToolSearchTool.NAME not in [tool["name"] for tool in plain.tool_catalog()]
+
+
+def test_find_tools_searches_with_the_calling_agents_selector():
+    reader = RecordingTool("read_value", idempotent=True)
+    own, other = RecordingSelector(), RecordingSelector()
+    agent = AnthropicAgent(
+        agent_name="search-test", model_id="test-model", api_key="test", tools=[reader], tool_selector=own
+    )
+    # Registered last, so the shared search tool used to search with its selector
+    AnthropicAgent(agent_name="other-test", model_id="test-model", api_key="test", tool_selector=other)
+
+    requests = []
+    agent.client = client(
+        [message([tool_use(ToolSearchTool.NAME, {"query": "read a value"})], "tool_use"), text()], requests
+    )
+    AnthropicAgent(agent_name="program-test", model_id="test-model", api_key="test", tool_programs=True)
+    agent.invoke("Find a tool to read values")
+
+    result = json.loads(requests[1]["messages"][-1]["content"][0]["content"])
+    assert "read_value" in [tool["name"] for tool in result["tools"]]
+    # The search ranks the calling agent's catalog, which excludes meta-tools it was not given
+    searched = own.ranked[-1]
+    assert other.ranked == []
+    assert ToolProgramTool.NAME not in searched
@@ -0,0 +1,39 @@
+from src.tracing import TraceReader, TraceRecorder
+from src.tracing.format import BLOCK_HEADER, BLOCK_MAGIC, CODEC_NONE
+
+
+def test_recorded_events_read_back_after_a_torn_block(tmp_path):
+    path = str(tmp_path / "trace.bin")
+    with TraceRecorder(path, block_records=2) as recorder:
+        with recorder.run("agent", prompt="Hi") as summary:
+            recorder.record("tool", name="read_value", duration=0.1)
+            summary["stop_reason"] = "end_turn"
+
+    # A crash in the middle of a block leaves a header without its payload
+    with open(path, "ab") as f:
+        f.write(BLOCK_HEADER.pack(BLOCK_MAGIC, CODEC_NONE, 1000, 3, 0.0, 0.0) + b"torn")
+
+    with TraceRecorder(path, compression=False) as recorder:
+        recorder.record("note", text="after restart")
+
+    with TraceReader(path) as reader:
+        records = list(reader)
+        assert [record["kind"] for record in records] == ["run_start", "tool", "run_end", "note"]
+        run = records[0]["run"]
+        assert records[2]["stop_reason"] == "end_turn"
+        assert [record["kind"] for record in reader.records(run=run)] == ["run_start", "tool", "run_end"]
+        assert list(reader.records(kind="note"))[0]["text"] == "after restart"
+
+
+def test_dropped_events_are_counted_exactly(tmp_path):
+    path = str(tmp_path / "trace.bin")
+    recorder = TraceRecorder(path, capacity=10, block_records=1000, flush_interval=60)
+    for index in range(25):
+        recorder.record("tick", index=index)
+    assert recorder.stats() == {"recorded": 25, "dropped": 15, "buffered": 10}
+    recorder.close()
+
+    with TraceReader(path) as reader:
+        records = list(reader)
+    assert [record["index"] for record in records if record["kind"] == "tick"] == list(range(15, 25))
+    assert [record["count"] for record in records if record["kind"] == "dropped"] == [15]
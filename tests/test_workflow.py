@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+
+from src.core.deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope
+from src.core.execution import ExecutionPolicy, ToolTimeoutError
+from src.core.tool import Tool
+from src.workflow import FunctionNode, ToolNode, Workflow, WorkflowError
+
+
+class SlowTool(Tool):
+    """Tool sleeping for the given time in the thread pool, with a short timeout"""
+
+    @property
+    def name(self) -> str:
+        return "slow_tool"
+
+    @property
+    def description(self) -> str:
+        return "Sleeps"
+
+    @property
+    def input_schema(self):
+        return {"type": "object", "properties": {"seconds": {"type": "number"}}}
+
+    @property
+    def execution_policy(self) -> ExecutionPolicy:
+        return ExecutionPolicy("thread", timeout=0.2)
+
+    def execute(self, seconds: float) -> float:
+        time.sleep(seconds)
+        return seconds
+
+
+def _diamond(calls):
+    def node(name, inputs, func):
+        def run(**kwargs):
+            calls.append(name)
+            return func(**kwargs)
+
+        return FunctionNode(name, run, inputs)
+
+    return Workflow(
+        [
+            node("total", {"left": "double", "right": "square"}, lambda left, right: left + right),
+            node("double", {"x": "source"}, lambda x: 2 * x),
+            node("square", {"x": "source"}, lambda x: x * x),
+            node("source", {"x": "input:x"}, lambda x: x),
+            node("unrelated", {"y": "input:y"}, lambda y: y),
+        ]
+    )
+
+
+def test_nodes_run_after_their_dependencies():
+    calls = []
+    results = _diamond(calls).run({"x": 3}, targets=["total"])
+
+    assert results == {"source": 3, "double": 6, "square": 9, "total": 15}
+    assert calls[0] == "source" and calls[-1] == "total"
+    assert "unrelated" not in calls
+
+
+def test_cycles_and_unknown_nodes_are_rejected():
+    workflow = Workflow([FunctionNode("a", lambda x: x, {"x": "b"}), FunctionNode("b", lambda x: x, {"x": "a"})])
+    with pytest.raises(WorkflowError, match="Cycle"):
+        workflow.run()
+    with pytest.raises(WorkflowError, match="unknown node"):
+        Workflow([FunctionNode("a", lambda x: x, {"x": "missing"})]).run()
+
+
+def test_a_failing_node_stops_its_downstream_nodes():
+    calls = []
+
+    def fail(x):
+        raise ValueError("broken")
+
+    workflow = Workflow(
+        [
+            FunctionNode("source", lambda x: x, {"x": "input:x"}),
+            FunctionNode("broken", fail, {"x": "source"}),
+            FunctionNode("after", lambda x: calls.append(x), {"x": "broken"}),
+        ]
+    )
+    with pytest.raises(WorkflowError) as error:
+        workflow.run({"x": 1})
+
+    assert error.value.node == "broken"
+    assert error.value.results == {"source": 1}
+    assert calls == []
+
+
+def test_rerun_only_executes_nodes_downstream_of_a_changed_input():
+    calls = []
+    workflow = _diamond(calls)
+    workflow.run({"x": 3, "y": 1})
+    calls.clear()
+
+    workflow.run({"x": 3, "y": 2})
+    assert calls == ["unrelated"]
+
+    calls.clear()
+    workflow.run({"x": 4, "y": 2})
+    assert sorted(calls) == ["double", "source", "square", "total"]
+
+
+def test_arguments_without_a_stable_encoding_are_not_cached():
+    calls = []
+    workflow = Workflow([FunctionNode("node", lambda value: calls.append(value), {"value": "input:value"})])
+    value = object()
+    workflow.run({"value": value})
+    workflow.run({"value": value})
+    assert len(calls) == 2
+
+
+def test_cache_keeps_the_most_recently_used_results():
+    calls = []
+    workflow = Workflow([FunctionNode("node", lambda x: calls.append(x), {"x": "input:x"})], cache_size=2)
+    for x in (1, 2, 1, 3, 1, 2):
+        workflow.run({"x": x})
+    # 2 was dropped when 3 was added, while 1 stayed in use
+    assert calls == [1, 2, 3, 2]
+
+
+def test_tool_nodes_run_under_the_tools_execution_policy():
+    workflow = Workflow([ToolNode("slow", SlowTool(), {"seconds": "input:seconds"})])
+    assert workflow.run({"seconds": 0})["slow"] == 0
+    with pytest.raises(WorkflowError) as error:
+        workflow.run({"seconds": 1})
+    assert isinstance(error.value.__cause__, ToolTimeoutError)
+
+
+def test_nodes_see_the_callers_deadline():
+    seen = []
+    release = threading.Event()
+
+    def wait_for_release():
+        seen.append(current_deadline())
+        release.wait(2)
+
+    workflow = Workflow([FunctionNode("wait", wait_for_release, cache=False)])
+    deadline = Deadline(timeout=0.3)
+    started = time.monotonic()
+    with deadline_scope(deadline), pytest.raises(DeadlineExceeded):
+        workflow.run()
+    release.set()
+
+    assert seen == [deadline]
+    assert time.monotonic() - started < 1.5